@@ -1,15 +1,41 @@
+import logging
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from auth import auth_bp
 from colleges import colleges_bp
 from programs import programs_bp
 from students import students_bp
+from stats import stats_bp
+from system import system_bp
 from flask_mail import Mail, Message
 from config import Config
+import db
+import json_provider
+import logs
+import migrate
+from search_index import search_indexes
+from response_cache import response_cache
+from mail_queue import mail_queue
+from metrics import metrics
+from slow_queries import slow_queries
+from auth import sessions
+from compression import compression
 
 app = Flask(__name__)
 app.config.from_object(Config)
+logs.init_app(app)
+migrate.init_app(app)
+json_provider.init_app(app)
+# First after_request handler, so it runs last, on the final body
+compression.init_app(app)
 mail = Mail(app)
+mail_queue.init_app(app, mail)
+db.init_app(app)
+search_indexes.init_app(app)
+response_cache.init_app(app)
+sessions.init_app(app)
+metrics.init_app(app)
+slow_queries.init_app(app)
 
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 
@@ -17,11 +43,14 @@ app.register_blueprint(auth_bp)
 app.register_blueprint(colleges_bp)
 app.register_blueprint(programs_bp)
 app.register_blueprint(students_bp)
+app.register_blueprint(stats_bp)
+app.register_blueprint(system_bp)
 
 @app.route("/")
 def home():
     return "Flask is running!"
 
+# Development server only; production runs `gunicorn -c gunicorn.conf.py app:app`
 if __name__ == "__main__":
-    print("Starting Flask server...")
+    logging.getLogger(__name__).info("Starting Flask server...")
     app.run(debug=True, port=5000)
\ No newline at end of file
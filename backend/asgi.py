@@ -0,0 +1,509 @@
+"""Async (ASGI) entry point serving the /api JSON routes on an asyncpg pool.
+
+    uvicorn asgi:app --workers 4          (or: hypercorn asgi:app)
+
+Same paths, parameters, status codes and response bodies as app.py for
+the list (with ?fields= and ?format=compact), students/expanded, search,
+count, stats, add/update/delete, users, signup, login and logout routes, so
+the two servers can be load-tested against each other. ?stream=, the
+export, import, batch and mail routes, and the response cache, search
+index and ETag layers, are only served by app.py.
+"""
+import asyncio
+from functools import wraps
+
+import asyncpg
+from quart import Quart, g, jsonify, request
+
+import asyncdb
+from auth import sessions
+from auth.sessions import (REVOKE_TOKENS_SQL, TOKEN_VERSION_SQL, SessionError, check_version,
+                           decode_token, issue_token, parse_bearer, token_cache)
+from config import Config
+from counts import (COUNT_MODES, COUNTED_TABLES, ESTIMATE_COUNTS_SQL, EXACT_COUNTS_SQL,
+                    SUMMARY_COUNTS_SQL, USER_COUNTS_SQL)
+from pagination import PaginationError, build_page_query, parse_page_args, render_page, wants_all
+from passwords import hash_password, needs_rehash, verify_password
+from projection import ProjectionError, parse_projection
+from search import SearchError, build_search, search_limit
+from students.expanded import EXPANDED_VIEW, StudentFilterError, build_expanded_query, parse_filters
+
+try:
+    from quart_cors import cors
+except ImportError:  # optional, same CORS policy as app.py when installed
+    cors = None
+
+app = Quart(__name__)
+app.config.from_object(Config)
+sessions.init_app(app)
+if cors is not None:
+    app = cors(app, allow_origin="*")
+
+
+@app.before_serving
+async def open_pool():
+    app.pool = await asyncdb.create_pool()
+
+
+@app.after_serving
+async def close_pool():
+    await app.pool.close()
+
+
+@app.route("/")
+async def home():
+    return "Quart is running!"
+
+
+#============================ SESSIONS ============================#
+
+_token_version_available = True
+
+
+async def _current_version(userid):
+    global _token_version_available
+    if not _token_version_available:
+        return 0
+    try:
+        async with app.pool.acquire() as conn:
+            return await asyncdb.fetchval(conn, TOKEN_VERSION_SQL, (userid,))
+    except asyncpg.UndefinedColumnError:
+        # migrations/0004_users_token_version.sql not applied: nothing to revoke
+        _token_version_available = False
+        return 0
+
+
+async def verify_token(token):
+    """Return the userid for a valid token, or raise SessionError."""
+    payload = decode_token(token, app.config["SECRET_KEY"], app.config["SESSION_TOKEN_MAX_AGE"])
+
+    userid = token_cache.get(token)
+    if userid is not None:
+        return userid
+
+    return check_version(token, payload, await _current_version(payload["uid"]))
+
+
+def require_auth(view):
+    """Same check as auth.sessions.require_auth, for async views."""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        token = parse_bearer(request.headers.get("Authorization", ""))
+        g.userid = None
+        if token is None:
+            if app.config.get("AUTH_REQUIRED"):
+                return jsonify({"error": "Authentication required"}), 401
+            return await view(*args, **kwargs)
+
+        try:
+            g.userid = await verify_token(token)
+        except SessionError as e:
+            return jsonify({"error": str(e)}), 401
+        return await view(*args, **kwargs)
+    return wrapper
+
+
+#============================ SHARED HANDLERS ============================#
+
+async def _list(table, key, filters=(), everything=None):
+    """A keyset page, or every row with ?all=true (`everything(columns)` builds that query)."""
+    try:
+        projection = parse_projection(table, request.args)
+        unbounded = wants_all(request.args)
+        if not unbounded:
+            limit, after = parse_page_args(request.args)
+
+        async with app.pool.acquire() as conn:
+            if unbounded:
+                columns = projection.select()
+                query, params = everything(columns) if everything else (f"SELECT {columns} FROM {table};", ())
+                rows, names = await asyncdb.fetch_columns(conn, query, params, tuples=projection.compact)
+                result = projection.render(rows, names)
+            else:
+                query, params = build_page_query(table, key, limit, after, projection.select("created_on", key), filters)
+                rows, names = await asyncdb.fetch_columns(conn, query, params, tuples=projection.compact)
+                result = render_page(rows, names, key, limit, projection)
+
+        return jsonify(result), 200
+    except (PaginationError, ProjectionError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+async def _search(table, keyword):
+    try:
+        projection = parse_projection(table, request.args)
+        query, params = build_search(table, keyword, search_limit(request.args), projection.select())
+        async with app.pool.acquire() as conn:
+            rows, names = await asyncdb.fetch_columns(conn, query, params, tuples=projection.compact)
+        return jsonify(projection.render(rows, names)), 200
+    except (ProjectionError, SearchError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+async def _in_thread(fn, *args):
+    # bcrypt work blocks, so keep it off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+async def _overall_counts(conn, mode="exact"):
+    if mode == "estimate":
+        rows = await conn.fetch(ESTIMATE_COUNTS_SQL)
+        return {table: 0 for table in COUNTED_TABLES} | {r[0]: r[1] for r in rows}
+
+    try:
+        counts = {r[0]: r[1] for r in await conn.fetch(SUMMARY_COUNTS_SQL)}
+        if all(table in counts for table in COUNTED_TABLES):
+            return {table: counts[table] for table in COUNTED_TABLES}
+    except asyncpg.UndefinedTableError:
+        # migrations/0002_table_counts.sql not applied yet
+        pass
+    return await asyncdb.fetchrow(conn, EXACT_COUNTS_SQL)
+
+
+async def _count(table):
+    try:
+        async with app.pool.acquire() as conn:
+            counts = await _overall_counts(conn)
+        return jsonify({"count": counts[table]}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+async def _delete(table, key, value, child, message):
+    try:
+        async with app.pool.acquire() as conn:
+            async with conn.transaction():
+                if child:
+                    child_table, column = child
+                    await asyncdb.execute(conn, f"UPDATE {child_table} SET {column} = NULL WHERE {column} = %s;", (value,))
+                await asyncdb.execute(conn, f"DELETE FROM {table} WHERE {key} = %s;", (value,))
+        return jsonify({"message": message}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+#============================ STUDENTS ============================#
+
+@app.route("/api/add_student", methods=["POST"])
+@require_auth
+async def add_student():
+    data = await request.get_json()
+    fields = [data.get(f) for f in ("profile", "idnum", "firstname", "lastname", "sex", "yearlevel", "programcode")]
+    if not all(fields[1:]):
+        return jsonify({"error": "Missing required fields"}), 400
+
+    try:
+        fields[5] = int(fields[5])
+        async with app.pool.acquire() as conn:
+            await asyncdb.execute(conn, """
+                INSERT INTO students (profile, idnum, firstname, lastname, sex, yearlevel, programcode)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """, fields)
+        return jsonify({"message": "Student added successfully"}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/student_list", methods=["GET"])
+async def get_students():
+    return await _list("students", "idnum")
+
+
+# students with programname, collegecode and collegename joined in; same filters as app.py
+@app.route("/api/students/expanded", methods=["GET"])
+async def get_students_expanded():
+    try:
+        filters = parse_filters(request.args)
+    except StudentFilterError as e:
+        return jsonify({"error": str(e)}), 400
+    return await _list(EXPANDED_VIEW, "idnum", filters, lambda columns: build_expanded_query(filters, columns))
+
+
+@app.route("/api/students/<string:idnum>", methods=["PUT"])
+@require_auth
+async def update_student(idnum):
+    try:
+        data = await request.get_json()
+        fields = [data.get(f) for f in ("profile", "idnum", "firstname", "lastname", "sex", "yearlevel", "programcode")]
+        if not all(fields[1:]):
+            return jsonify({"error": "Missing required fields"}), 400
+
+        fields[5] = int(fields[5])
+        async with app.pool.acquire() as conn:
+            updated = await asyncdb.fetchval(conn, """
+                UPDATE students
+                SET profile = %s, idnum = %s, firstname = %s, lastname = %s, sex = %s, yearlevel = %s, programcode = %s
+                WHERE idnum = %s
+                RETURNING idnum;
+            """, fields + [idnum])
+
+        if not updated:
+            return jsonify({"error": "Student not found"}), 404
+        return jsonify({"message": "Student updated successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/delete_student<string:idnum>", methods=["DELETE"])
+@require_auth
+async def delete_student(idnum):
+    return await _delete("students", "idnum", idnum, None,
+                         f"Student '{idnum}' deleted successfully.")
+
+
+@app.route("/api/search_student/<string:keyword>", methods=["GET"])
+async def search_student(keyword):
+    return await _search("students", keyword)
+
+
+@app.route("/api/student_count", methods=["GET"])
+async def get_student_count():
+    return await _count("students")
+
+
+#============================ PROGRAMS ============================#
+
+@app.route("/api/add_program", methods=["POST"])
+@require_auth
+async def add_program():
+    try:
+        data = await request.get_json()
+        collegecode, programcode, programname = (data.get(f) for f in ("collegecode", "programcode", "programname"))
+        if not collegecode or not programcode or not programname:
+            return jsonify({"error": "Missing required fields"}), 400
+
+        async with app.pool.acquire() as conn:
+            await asyncdb.execute(conn, """
+                INSERT INTO programs (collegecode, programcode, programname)
+                VALUES (%s, %s, %s);
+            """, (collegecode, programcode, programname))
+        return jsonify({"message": "Program added successfully!"}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/program_list", methods=["GET"])
+async def get_programs():
+    return await _list("programs", "programcode")
+
+
+@app.route("/api/programs/<string:programcode>", methods=["PUT"])
+@require_auth
+async def update_program(programcode):
+    try:
+        data = await request.get_json()
+        new_college, new_code, new_name = (data.get(f) for f in ("collegecode", "programcode", "programname"))
+        if not new_college or not new_code or not new_name:
+            return jsonify({"error": "Missing required fields"}), 400
+
+        async with app.pool.acquire() as conn:
+            updated = await asyncdb.fetchval(conn, """
+                UPDATE programs
+                SET collegecode = %s, programcode = %s, programname = %s
+                WHERE programcode = %s
+                RETURNING programcode;
+            """, (new_college, new_code, new_name, programcode))
+
+        if not updated:
+            return jsonify({"error": "Program not found"}), 404
+        return jsonify({"message": "Program updated successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/delete_program/<string:programcode>", methods=["DELETE"])
+@require_auth
+async def delete_program(programcode):
+    return await _delete("programs", "programcode", programcode, ("students", "programcode"),
+                         f"Program '{programcode}' deleted successfully.")
+
+
+@app.route("/api/search_program/<string:keyword>", methods=["GET"])
+async def search_program(keyword):
+    return await _search("programs", keyword)
+
+
+@app.route("/api/program_count", methods=["GET"])
+async def get_program_count():
+    return await _count("programs")
+
+
+#============================ COLLEGES ============================#
+
+@app.route("/api/add_college", methods=["POST"])
+@require_auth
+async def add_college():
+    try:
+        data = await request.get_json()
+        collegecode, collegename = data.get("collegecode"), data.get("collegename")
+        if not collegecode or not collegename:
+            return jsonify({"error": "Missing required fields"}), 400
+
+        async with app.pool.acquire() as conn:
+            async with conn.transaction():
+                if await asyncdb.fetchval(conn, "SELECT 1 FROM colleges WHERE collegecode = %s", (collegecode,)):
+                    return jsonify({"error": "College code already exists"}), 409
+                new_code = await asyncdb.fetchval(conn, """
+                    INSERT INTO colleges (collegecode, collegename)
+                    VALUES (%s, %s)
+                    RETURNING collegecode;
+                """, (collegecode, collegename))
+
+        return jsonify({"message": "College registered successfully!", "collegecode": new_code}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/college_list", methods=["GET"])
+async def get_colleges():
+    return await _list("colleges", "collegecode")
+
+
+@app.route("/api/colleges/<string:collegecode>", methods=["PUT"])
+@require_auth
+async def update_college(collegecode):
+    try:
+        data = await request.get_json()
+        new_code, new_name = data.get("collegecode"), data.get("collegename")
+        if not new_code or not new_name:
+            return jsonify({"error": "Missing required fields"}), 400
+
+        async with app.pool.acquire() as conn:
+            updated = await asyncdb.fetchval(conn, """
+                UPDATE colleges
+                SET collegecode = %s, collegename = %s
+                WHERE collegecode = %s
+                RETURNING collegecode;
+            """, (new_code, new_name, collegecode))
+
+        if not updated:
+            return jsonify({"error": "College not found"}), 404
+        return jsonify({"message": "College updated successfully"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/delete_college/<string:collegecode>", methods=["DELETE"])
+@require_auth
+async def delete_college(collegecode):
+    return await _delete("colleges", "collegecode", collegecode, ("programs", "collegecode"),
+                         f"College '{collegecode}' deleted successfully. Related programs now have no college.")
+
+
+@app.route("/api/search_college/<string:keyword>", methods=["GET"])
+async def search_college(keyword):
+    return await _search("colleges", keyword)
+
+
+@app.route("/api/college_count", methods=["GET"])
+async def get_college_count():
+    return await _count("colleges")
+
+
+#============================ STATS ============================#
+
+@app.route("/api/stats", methods=["GET"])
+async def get_stats():
+    try:
+        mode = request.args.get("mode", "exact").lower()
+        userid = request.args.get("userid", type=int)
+        if mode not in COUNT_MODES:
+            return jsonify({"error": f"mode must be one of: {', '.join(COUNT_MODES)}"}), 400
+
+        async with app.pool.acquire() as conn:
+            stats = {"mode": mode, "overall": await _overall_counts(conn, mode)}
+            if userid is not None:
+                stats["userid"] = userid
+                stats["user"] = await asyncdb.fetchrow(conn, USER_COUNTS_SQL, {"userid": userid})
+
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+#============================ AUTH ============================#
+
+@app.route("/api/users", methods=["GET"])
+async def get_users():
+    try:
+        async with app.pool.acquire() as conn:
+            users = await asyncdb.fetch(conn, "SELECT * FROM users;")
+        return jsonify(users), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/signup", methods=["POST"])
+async def register_user():
+    try:
+        data = await request.get_json()
+        username, useremail, userpass = data.get("username"), data.get("email"), data.get("password")
+        if not username or not useremail or not userpass:
+            return jsonify({"error": "Missing required fields"}), 400
+
+        hashed_pass = await _in_thread(hash_password, userpass)
+
+        async with app.pool.acquire() as conn:
+            user_id = await asyncdb.fetchval(conn, """
+                INSERT INTO users (username, useremail, userpass)
+                VALUES (%s, %s, %s)
+                RETURNING userid;
+            """, (username, useremail, hashed_pass))
+
+        return jsonify({"message": "User registered successfully!", "userid": user_id}), 201
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route("/api/login", methods=["POST"])
+async def login_user():
+    try:
+        data = await request.get_json()
+        username, userpass = data.get("username"), data.get("password")
+        if not username or not userpass:
+            return jsonify({"error": "Missing username or password"}), 400
+
+        async with app.pool.acquire() as conn:
+            user = await asyncdb.fetchrow(conn, "SELECT * FROM users WHERE username = %s;", (username,))
+
+        if not user:
+            return jsonify({"error": "User not found"}), 404
+        if not await _in_thread(verify_password, userpass, user["userpass"]):
+            return jsonify({"error": "Invalid password"}), 401
+
+        if needs_rehash(user["userpass"]):
+            new_hash = await _in_thread(hash_password, userpass)
+            async with app.pool.acquire() as conn:
+                await asyncdb.execute(conn, "UPDATE users SET userpass = %s WHERE userid = %s;",
+                                      (new_hash, user["userid"]))
+
+        return jsonify({
+            "message": "Login successful",
+            "token": issue_token(user, app.config["SECRET_KEY"]),
+            "user": {
+                "userid": user["userid"],
+                "username": user["username"],
+                "email": user["useremail"]
+            }
+        }), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+# LOGOUT (revokes every session token of the caller)
+@app.route("/api/logout", methods=["POST"])
+@require_auth
+async def logout_user():
+    if g.userid is None:
+        return jsonify({"error": "Authentication required"}), 401
+    try:
+        async with app.pool.acquire() as conn:
+            await asyncdb.fetchval(conn, REVOKE_TOKENS_SQL, (g.userid,))
+        token_cache.drop_user(g.userid)
+        return jsonify({"message": "Logged out"}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,81 @@
+import re
+
+import asyncpg
+
+from config import SupabaseConfig, PoolConfig
+
+
+# The query builders shared with the WSGI app (pagination, search, counts)
+# use psycopg2 placeholders; asyncpg wants $1, $2, ...
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+
+def to_asyncpg(query, params=()):
+    """Rewrite a psycopg2-style query and its params for asyncpg."""
+    args = []
+    named = {}
+    positional = iter(params) if not isinstance(params, dict) else None
+
+    def replace(match):
+        if match.group(0) == "%%":
+            return "%"
+        name = match.group(1)
+        if name is None:
+            args.append(next(positional))
+            return f"${len(args)}"
+        if name not in named:
+            args.append(params[name])
+            named[name] = len(args)
+        return f"${named[name]}"
+
+    return _PLACEHOLDER.sub(replace, query), args
+
+
+async def create_pool():
+    return await asyncpg.create_pool(
+        host=SupabaseConfig["host"],
+        port=SupabaseConfig["port"],
+        database=SupabaseConfig["dbname"],
+        user=SupabaseConfig["user"],
+        password=SupabaseConfig["password"],
+        ssl=SupabaseConfig.get("sslmode", "prefer"),
+        min_size=PoolConfig["minconn"],
+        max_size=PoolConfig["maxconn"],
+        max_inactive_connection_lifetime=PoolConfig["max_lifetime"],
+        timeout=PoolConfig["timeout"],
+    )
+
+
+async def fetch(conn, query, params=()):
+    query, args = to_asyncpg(query, params)
+    return [dict(row) for row in await conn.fetch(query, *args)]
+
+
+async def fetch_columns(conn, query, params=(), tuples=False):
+    """(rows, column names), like a psycopg2 cursor's fetchall() and description.
+
+    Rows are dicts, or plain tuples with `tuples` (for ?format=compact).
+    """
+    query, args = to_asyncpg(query, params)
+    stmt = await conn.prepare(query)
+    columns = [attribute.name for attribute in stmt.get_attributes()]
+    records = await stmt.fetch(*args)
+    if tuples:
+        return [tuple(record) for record in records], columns
+    return [dict(record) for record in records], columns
+
+
+async def fetchrow(conn, query, params=()):
+    query, args = to_asyncpg(query, params)
+    row = await conn.fetchrow(query, *args)
+    return dict(row) if row is not None else None
+
+
+async def fetchval(conn, query, params=()):
+    query, args = to_asyncpg(query, params)
+    return await conn.fetchval(query, *args)
+
+
+async def execute(conn, query, params=()):
+    query, args = to_asyncpg(query, params)
+    return await conn.execute(query, *args)
@@ -1,23 +1,23 @@
-from flask import Blueprint, jsonify, request, current_app
+import logging
+from flask import Blueprint, jsonify, request, current_app, g
 import requests
 import os
 from flask_mail import Message
-import psycopg2
 from psycopg2.extras import RealDictCursor
 from config import DB_CONFIG
-from config import SupabaseConfig
-import bcrypt
+import prepared
+from conditional import conditional
+from db import get_db_connection
+from invalidation import tables_changed
+from mail_queue import MailQueueFull
+from response_cache import cached
+from passwords import hash_password, needs_rehash, verify_password
+from .sessions import issue_token, require_auth, revoke_user_tokens
 
 auth_bp = Blueprint("auth_bp", __name__, url_prefix="/api")
+log = logging.getLogger(__name__)
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**SupabaseConfig)
-        print("Database connection successful!")
-        return conn 
-    except Exception as e:
-        print(f"Database connection failed: {e}")
-        raise
+USER_BY_NAME_SQL = prepared.register("SELECT * FROM users WHERE username = %s;")
 
 
 # FOR SENDING EMAIL VIA MAILTRAP (using SMTP/Flask-Mail)
@@ -30,9 +30,9 @@ def send_welcome_email():
         if not email:
             return jsonify({"error": "Email is required"}), 400
 
-        # Get the mail instance from current app
-        mail = current_app.extensions.get('mail')
-        if not mail:
+        # Get the mail queue from current app
+        mail_queue = current_app.extensions.get('mail_queue')
+        if not mail_queue:
             return jsonify({"error": "Mail service not configured"}), 500
 
         # Create the email message
@@ -44,13 +44,15 @@ def send_welcome_email():
             html=f'<h2>Welcome to SSIS Web App!</h2><p>Your account has been created successfully.</p><p>You can now access the dashboard and manage your academic data.</p>'
         )
 
-        # Send the email
-        mail.send(message)
+        # Hand it to the background workers; delivery and retries happen there
+        mail_queue.enqueue(message)
         
-        return jsonify({"message": "Welcome email sent successfully!"})
+        return jsonify({"message": "Welcome email queued"}), 202
     
+    except MailQueueFull as e:
+        return jsonify({"error": str(e)}), 503
     except Exception as e:
-        print(f"Error sending welcome email: {e}")
+        log.exception("Error sending welcome email")
         return jsonify({"error": f"Failed to send email: {str(e)}"}), 500
 
 
@@ -64,13 +66,12 @@ def register_user():
         username = data.get("username")
         useremail = data.get("email")
         userpass = data.get("password")
-        hashed_pass = bcrypt.hashpw(userpass.encode("utf-8"), bcrypt.gensalt()).decode()
 
         if not username or not useremail or not userpass:
             return jsonify({"error": "Missing required fields"}), 400
-        
-        if not bcrypt.checkpw(userpass.encode("utf-8"), userpass["userpass"].encode("utf-8")):
-            return jsonify({"error": "Invalid password"}), 401
+
+        # Hashed in the process pool so the request thread isn't tied up
+        hashed_pass = hash_password(userpass)
 
         conn = get_db_connection()
         cur = conn.cursor()
@@ -90,28 +91,30 @@ def register_user():
         cur.close()
         conn.close()
 
-        print(f"User {username} registered successfully with ID {user_id}")
+        tables_changed("users")
+
+        log.info("User registered", extra={"username": username, "new_userid": user_id})
         return jsonify({"message": "User registered successfully!", "userid": user_id}), 201
 
     except Exception as e:
-        print(f"Error in register_user: {e}")
+        log.exception("Error in register_user")
         return jsonify({"error": str(e)}), 500
 
 
 
 # GET USERS
 @auth_bp.route("/users", methods=["GET"])
+@conditional("users")
+@cached("users")
 def get_users():
     try:
-        print("GET /api/users endpoint hit!")
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
         
         cur.execute("SELECT * FROM users;")
         users = cur.fetchall()
         
-        print(f"Found {len(users)} users")
-        print(f"Users data: {users}")
+        log.debug("Listed users", extra={"rows": len(users)})
         
         cur.close()
         conn.close()
@@ -119,7 +122,7 @@ def get_users():
         return jsonify(users), 200
         
     except Exception as e:
-        print(f"Error in get_users: {e}")
+        log.exception("Error in get_users")
         return jsonify({"error": str(e)}), 500
 
 
@@ -139,21 +142,34 @@ def login_user():
         conn = get_db_connection()
         cur = conn.cursor(cursor_factory=RealDictCursor)
 
-        cur.execute("SELECT * FROM users WHERE username = %s;", (username,))
+        prepared.execute(cur, USER_BY_NAME_SQL, (username,))
         user = cur.fetchone()
 
+        # Give the connection back before the (slow) hash check
         cur.close()
         conn.close()
 
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        if user["userpass"] != userpass:  # (plain text)
+        if not verify_password(userpass, user["userpass"]):
             return jsonify({"error": "Invalid password"}), 401
 
-        print(f"User '{username}' logged in successfully!")
+        # Plain-text rows and hashes at an old cost get upgraded on login
+        if needs_rehash(user["userpass"]):
+            new_hash = hash_password(userpass)
+            conn = get_db_connection()
+            cur = conn.cursor()
+            cur.execute("UPDATE users SET userpass = %s WHERE userid = %s;", (new_hash, user["userid"]))
+            conn.commit()
+            cur.close()
+            conn.close()
+            tables_changed("users")
+
+        log.info("User logged in", extra={"username": username})
         return jsonify({
             "message": "Login successful",
+            "token": issue_token(user),
             "user": {
                 "userid": user["userid"],
                 "username": user["username"],
@@ -162,8 +178,23 @@ def login_user():
         }), 200
 
     except Exception as e:
-        print(f"Error in login_user: {e}")
+        log.exception("Error in login_user")
         return jsonify({"error": str(e)}), 500
 
 
 
+
+# LOGOUT (revokes every session token of the caller)
+@auth_bp.route("/logout", methods=["POST"])
+@require_auth
+def logout_user():
+    try:
+        if g.userid is None:
+            return jsonify({"error": "Authentication required"}), 401
+
+        revoke_user_tokens(g.userid)
+        return jsonify({"message": "Logged out"}), 200
+
+    except Exception as e:
+        log.exception("Error in logout_user")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, g, jsonify, request
+from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
+from psycopg2 import errors
+
+import prepared
+from db import get_db_connection
+from invalidation import tables_changed
+
+
+class SessionError(Exception):
+    """Missing, malformed, expired or revoked session token."""
+
+
+#============================ VERIFICATION CACHE ============================#
+
+class VerifiedTokenCache:
+    """LRU of tokens that already passed the revocation check.
+
+    A cached token is trusted without touching the database until its
+    entry is `ttl` seconds old; then token_version is read again. Revocations
+    made in this process drop entries immediately, ones made elsewhere are
+    seen within `ttl`.
+    """
+
+    def __init__(self, max_entries=10000, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()     # token -> (userid, checked_at)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token):
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None or time.monotonic() - entry[1] > self.ttl:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, token, userid):
+        with self._lock:
+            self._entries[token] = (userid, time.monotonic())
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def drop_user(self, userid):
+        with self._lock:
+            for token in [t for t, (uid, _) in self._entries.items() if uid == userid]:
+                del self._entries[token]
+
+
+token_cache = VerifiedTokenCache()
+_token_version_available = True
+
+
+def init_app(app):
+    token_cache.max_entries = app.config.get("SESSION_CACHE_SIZE", 10000)
+    token_cache.ttl = app.config.get("SESSION_CACHE_TTL", 60)
+
+
+#============================ TOKENS ============================#
+
+def _serializer(secret_key=None):
+    return URLSafeTimedSerializer(secret_key or current_app.config["SECRET_KEY"], salt="ssis-session")
+
+
+def issue_token(user, secret_key=None):
+    return _serializer(secret_key).dumps({"uid": user["userid"], "ver": user.get("token_version", 0)})
+
+
+TOKEN_VERSION_SQL = prepared.register("SELECT token_version FROM users WHERE userid = %s;")
+
+
+def _current_version(userid):
+    global _token_version_available
+    if not _token_version_available:
+        return 0
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        prepared.execute(cur, TOKEN_VERSION_SQL, (userid,))
+        row = cur.fetchone()
+    except errors.UndefinedColumn:
+        # migrations/0004_users_token_version.sql not applied: nothing to revoke
+        conn.rollback()
+        _token_version_available = False
+        return 0
+    finally:
+        cur.close()
+        conn.close()
+    return row[0] if row else None
+
+
+def decode_token(token, secret_key=None, max_age=None):
+    """Return the payload of a signed, unexpired token, or raise SessionError.
+
+    Does not check for revocation; verify_token does.
+    """
+    if max_age is None:
+        max_age = current_app.config["SESSION_TOKEN_MAX_AGE"]
+    try:
+        return _serializer(secret_key).loads(token, max_age=max_age)
+    except SignatureExpired:
+        raise SessionError("Session expired")
+    except BadSignature:
+        raise SessionError("Invalid session token")
+
+
+def check_version(token, payload, version):
+    """Raise SessionError unless `version` is the one the token was issued with."""
+    if version is None or version != payload.get("ver", 0):
+        raise SessionError("Session revoked")
+    token_cache.put(token, payload["uid"])
+    return payload["uid"]
+
+
+def verify_token(token):
+    """Return the userid for a valid token, or raise SessionError."""
+    payload = decode_token(token)
+
+    userid = token_cache.get(token)
+    if userid is not None:
+        return userid
+
+    return check_version(token, payload, _current_version(payload["uid"]))
+
+
+REVOKE_TOKENS_SQL = "UPDATE users SET token_version = token_version + 1 WHERE userid = %s RETURNING token_version;"
+
+
+def revoke_user_tokens(userid):
+    """Invalidate every token issued to `userid` so far."""
+    conn = get_db_connection()
+    cur = conn.cursor()
+    cur.execute(REVOKE_TOKENS_SQL, (userid,))
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    conn.close()
+    token_cache.drop_user(userid)
+    tables_changed("users")
+    return row[0] if row else None
+
+
+#============================ DECORATOR ============================#
+
+def parse_bearer(header):
+    """The token from an `Authorization: Bearer <token>` header value, or None."""
+    if header and header.lower().startswith("bearer "):
+        return header[7:].strip()
+    return None
+
+
+def _bearer_token():
+    return parse_bearer(request.headers.get("Authorization", ""))
+
+
+def require_auth(view):
+    """Protect a route with the session token from `Authorization: Bearer`.
+
+    With AUTH_REQUIRED off (the default while clients migrate), requests
+    without a token still go through; a token that is sent must be valid.
+    The caller's id is available as g.userid.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = _bearer_token()
+        g.userid = None
+        if token is None:
+            if current_app.config.get("AUTH_REQUIRED"):
+                return jsonify({"error": "Authentication required"}), 401
+            return view(*args, **kwargs)
+
+        try:
+            g.userid = verify_token(token)
+        except SessionError as e:
+            return jsonify({"error": str(e)}), 401
+        return view(*args, **kwargs)
+    return wrapper
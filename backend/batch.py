@@ -0,0 +1,248 @@
+import psycopg2
+from psycopg2.extras import RealDictCursor, execute_values
+
+from schema import COLUMN_WIDTHS, INT_COLUMNS, INT_MAX, INT_MIN
+
+
+MAX_BATCH_ITEMS = 5000
+
+
+class BatchError(ValueError):
+    """Malformed batch request body (reported as a 400)."""
+
+
+# key: primary key; parent: (column, table) the FK points at;
+# child: (table, column) that references this table and is nulled on delete
+BATCH_SPECS = {
+    "students": {
+        "key": "idnum",
+        "columns": ["profile", "idnum", "firstname", "lastname", "sex", "yearlevel", "programcode"],
+        "required": ["idnum", "firstname", "lastname", "sex", "yearlevel", "programcode"],
+        "parent": ("programcode", "programs"),
+        "child": None,
+    },
+    "programs": {
+        "key": "programcode",
+        "columns": ["programcode", "programname", "collegecode"],
+        "required": ["programcode", "programname", "collegecode"],
+        "parent": ("collegecode", "colleges"),
+        "child": ("students", "programcode"),
+    },
+    "colleges": {
+        "key": "collegecode",
+        "columns": ["collegecode", "collegename"],
+        "required": ["collegecode", "collegename"],
+        "parent": None,
+        "child": ("programs", "collegecode"),
+    },
+}
+
+
+#============================ VALIDATION ============================#
+
+def _key_error(column, value):
+    # Keys end up in sets and ANY(%s) arrays, so only plain strings will do
+    if not isinstance(value, str) or not value:
+        return f"{column} must be a non-empty string"
+    return None
+
+
+def _validate(table, item):
+    spec = BATCH_SPECS[table]
+    if not isinstance(item, dict):
+        return "Item must be an object"
+    missing = [col for col in spec["required"] if item.get(col) in (None, "")]
+    if missing:
+        return f"Missing required fields: {', '.join(missing)}"
+    for column in [spec["key"]] + ([spec["parent"][0]] if spec["parent"] else []):
+        error = _key_error(column, item[column])
+        if error:
+            return error
+    for column in spec["columns"]:
+        error = _value_error(table, column, item.get(column))
+        if error:
+            return error
+    if table == "students" and item["sex"] not in ("Male", "Female", "Other"):
+        return "sex must be Male, Female or Other"
+    return None
+
+
+def _value_error(table, column, value):
+    # Anything the INSERT would reject must fail here, per item
+    if value is None:
+        return None
+    if column in INT_COLUMNS[table]:
+        if isinstance(value, bool):
+            return f"{column} must be an integer"
+        try:
+            number = int(value) if isinstance(value, (int, str)) else None
+        except ValueError:
+            number = None
+        if number is None:
+            return f"{column} must be an integer"
+        if not INT_MIN <= number <= INT_MAX:
+            return f"{column} is out of range"
+        return None
+    if not isinstance(value, str):
+        return f"{column} must be a string"
+    width = COLUMN_WIDTHS[table].get(column)
+    if width is not None and len(value) > width:
+        return f"{column} is longer than {width} characters"
+    return None
+
+
+def parse_batch(data):
+    if not isinstance(data, dict):
+        raise BatchError("Body must be a JSON object with 'upserts' and/or 'deletes'")
+    upserts = data.get("upserts") or []
+    deletes = data.get("deletes") or []
+    if not isinstance(upserts, list) or not isinstance(deletes, list):
+        raise BatchError("'upserts' and 'deletes' must be arrays")
+    if len(upserts) + len(deletes) > MAX_BATCH_ITEMS:
+        raise BatchError(f"At most {MAX_BATCH_ITEMS} items per batch")
+    if not upserts and not deletes:
+        raise BatchError("Nothing to do: 'upserts' and 'deletes' are both empty")
+    return upserts, deletes
+
+
+#============================ EXECUTION ============================#
+
+def _upsert(cur, table, items):
+    spec = BATCH_SPECS[table]
+    key, columns = spec["key"], spec["columns"]
+    updates = ", ".join(f"{col} = EXCLUDED.{col}" for col in columns if col != key)
+    # xmax = 0 only for freshly inserted rows
+    return execute_values(
+        cur,
+        f"""
+        INSERT INTO {table} ({', '.join(columns)}) VALUES %s
+        ON CONFLICT ({key}) DO UPDATE SET {updates}
+        RETURNING *, (xmax = 0) AS _inserted;
+        """,
+        [tuple(item.get(col) for col in columns) for _, item in items],
+        page_size=len(items),
+        fetch=True,
+    )
+
+
+def _upsert_each(cur, table, items, results):
+    """Upsert `items` one per savepoint; failures go into `results`.
+
+    Returns the rows written and the items that made it.
+    """
+    key = BATCH_SPECS[table]["key"]
+    rows, written = [], []
+    for i, item in items:
+        cur.execute("SAVEPOINT batch_item;")
+        try:
+            rows += _upsert(cur, table, [(i, item)])
+            cur.execute("RELEASE SAVEPOINT batch_item;")
+            written.append((i, item))
+        except psycopg2.Error as e:
+            cur.execute("ROLLBACK TO SAVEPOINT batch_item;")
+            message = (e.diag.message_primary if e.diag else None) or str(e).strip()
+            results[i] = {"key": item[key], "status": "error", "error": message}
+    return rows, written
+
+
+def run_batch(conn, table, upserts, deletes, atomic=False):
+    """Apply `upserts` then `deletes` to `table` in one transaction.
+
+    Upserts go through one multi-row INSERT ... ON CONFLICT DO UPDATE and
+    deletes through one DELETE ... WHERE key = ANY(...), whatever the batch
+    size; if the INSERT fails, the upserts are redone one by one so only the
+    offending items are reported. Returns the per-item results plus the rows written and keys
+    deleted, so the caller can update its caches.
+    """
+    spec = BATCH_SPECS[table]
+    key = spec["key"]
+
+    upsert_results = [None] * len(upserts)
+    delete_results = [None] * len(deletes)
+    valid = []      # (position, item)
+    seen = set()
+
+    for i, item in enumerate(upserts):
+        error = _validate(table, item)
+        if not error and item[key] in seen:
+            error = f"Duplicate {key} '{item[key]}' in batch"
+        if error:
+            upsert_results[i] = {"key": item.get(key) if isinstance(item, dict) else None,
+                                 "status": "error", "error": error}
+        else:
+            seen.add(item[key])
+            valid.append((i, item))
+
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    written, deleted = [], []
+    try:
+        # Foreign keys checked for the whole batch in one query
+        if spec["parent"] and valid:
+            fk, parent = spec["parent"]
+            cur.execute(
+                f"SELECT {fk} FROM {parent} WHERE {fk} = ANY(%s);",
+                (list({item[fk] for _, item in valid}),),
+            )
+            known = {row[fk] for row in cur.fetchall()}
+            still_valid = []
+            for i, item in valid:
+                if item[fk] in known:
+                    still_valid.append((i, item))
+                else:
+                    upsert_results[i] = {"key": item[key], "status": "error",
+                                         "error": f"Unknown {fk} '{item[fk]}'"}
+            valid = still_valid
+
+        if valid:
+            cur.execute("SAVEPOINT batch_upsert;")
+            try:
+                rows = _upsert(cur, table, valid)
+                cur.execute("RELEASE SAVEPOINT batch_upsert;")
+            except psycopg2.Error:
+                # Something only the database checks (e.g. a duplicate
+                # programname): redo the items one by one to find the culprits
+                cur.execute("ROLLBACK TO SAVEPOINT batch_upsert;")
+                rows, valid = _upsert_each(cur, table, valid, upsert_results)
+            by_key = {row[key]: row for row in rows}
+            for i, item in valid:
+                row = dict(by_key[item[key]])
+                inserted = row.pop("_inserted")
+                written.append(row)
+                upsert_results[i] = {"key": item[key], "status": "inserted" if inserted else "updated"}
+
+        if deletes:
+            for i, k in enumerate(deletes):
+                error = _key_error(key, k)
+                if error:
+                    delete_results[i] = {"key": k, "status": "error", "error": error}
+            keys = [k for i, k in enumerate(deletes) if delete_results[i] is None]
+            if spec["child"] and keys:
+                child, column = spec["child"]
+                cur.execute(f"UPDATE {child} SET {column} = NULL WHERE {column} = ANY(%s);", (keys,))
+            if keys:
+                cur.execute(f"DELETE FROM {table} WHERE {key} = ANY(%s) RETURNING {key};", (keys,))
+                deleted = [row[key] for row in cur.fetchall()]
+            gone = set(deleted)
+            for i, k in enumerate(deletes):
+                if delete_results[i] is None:
+                    delete_results[i] = {"key": k, "status": "deleted" if k in gone else "not_found"}
+
+        failed = sum(r["status"] == "error" for r in upsert_results + delete_results)
+        rolled_back = atomic and failed > 0
+        if rolled_back:
+            conn.rollback()
+            written, deleted = [], []
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    return {
+        "upserts": upsert_results,
+        "deletes": delete_results,
+        "failed": failed,
+        "rolled_back": rolled_back,
+    }, written, deleted
@@ -0,0 +1,330 @@
+"""HTTP load test of the /api routes against a running server.
+
+    python benchmarks/bench_api.py --url http://localhost:5000 --seconds 10 --concurrency 16
+    python benchmarks/bench_api.py --scenarios list search --compare results/<earlier>.json
+
+Expects a database filled by seed.py. Each scenario hammers one route from
+`--concurrency` client threads (one keep-alive connection each) and reports
+requests/second, p50/p95/p99 latency and errors. Results are written as JSON
+to benchmarks/results/ with the git commit and the database size, and
+--compare prints the change against an earlier file.
+
+The add, update and delete scenarios run in that order on the same ids, so a
+full run leaves the student table as it found it. GET routes are answered
+from the response cache after the first hit; --cold makes every URL unique
+to measure the uncached path.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import socket
+import random
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import BENCH_USER, FIRST_NAMES, LAST_NAMES  # noqa: E402
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+SCENARIOS = ["list", "search", "count", "add", "update", "delete", "login"]
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+#============================ CLIENT ============================#
+
+class Client:
+    """One keep-alive connection to the server under test."""
+
+    def __init__(self, url, token=None):
+        parts = urlsplit(url)
+        conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        self.conn = conn_class(parts.hostname, parts.port, timeout=30)
+        self.prefix = parts.path.rstrip("/")
+        self.headers = {"Content-Type": "application/json"}
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    def request(self, method, path, body=None):
+        # bytes so http.client sends headers and body in one segment
+        payload = json.dumps(body).encode("utf-8") if body is not None else None
+        try:
+            self._send(method, path, payload)
+            response = self.conn.getresponse()
+            data = response.read()
+        except (http.client.HTTPException, OSError):
+            # Server closed the keep-alive connection (e.g. worker recycled); retry once
+            self.conn.close()
+            self._send(method, path, payload)
+            response = self.conn.getresponse()
+            data = response.read()
+        return response.status, data
+
+    def _send(self, method, path, payload):
+        if self.conn.sock is None:
+            self.conn.connect()
+            self.conn.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.conn.request(method, self.prefix + path, body=payload, headers=self.headers)
+
+    def close(self):
+        self.conn.close()
+
+
+#============================ SCENARIOS ============================#
+# Each factory returns a function doing one request; it gets the thread's
+# client and a per-thread counter and returns the status code.
+
+class Scenarios:
+
+    def __init__(self, cold, table):
+        self.cold = cold
+        self.table = table
+        self.singular = table[:-1]
+        self._bust = itertools.count()
+        # Ids for add/update/delete: a random enrolment year far from seeded ones
+        self.year = random.randint(3000, 9999)
+        self.added = []
+        self._lock = threading.Lock()
+
+    def _url(self, path):
+        if not self.cold:
+            return path
+        sep = "&" if "?" in path else "?"
+        return f"{path}{sep}_={next(self._bust)}"
+
+    def list(self):
+        cursors = threading.local()
+
+        def run(client, n):
+            after = getattr(cursors, "after", None)
+            path = f"/api/{self.singular}_list?limit=50" + (f"&after={after}" if after else "")
+            status, body = client.request("GET", self._url(path))
+            # Walk forward page by page, then start over
+            cursors.after = json.loads(body).get("next_cursor") if status == 200 else None
+            return status
+        return run
+
+    def search(self):
+        terms = FIRST_NAMES + LAST_NAMES + ["2001", "2005-01", "santos", "com"]
+
+        def run(client, n):
+            term = quote(random.choice(terms).lower(), safe="")
+            return client.request("GET", self._url(f"/api/search_{self.singular}/{term}"))[0]
+        return run
+
+    def count(self):
+        def run(client, n):
+            return client.request("GET", self._url(f"/api/{self.singular}_count"))[0]
+        return run
+
+    def _student(self, idnum):
+        return {
+            "profile": None,
+            "idnum": idnum,
+            "firstname": random.choice(FIRST_NAMES),
+            "lastname": random.choice(LAST_NAMES),
+            "sex": random.choice(["Male", "Female"]),
+            "yearlevel": random.randint(1, 5),
+            "programcode": self.programcode,
+        }
+
+    def add(self):
+        ids = itertools.count()
+
+        def run(client, n):
+            with self._lock:
+                i = next(ids)
+            if i >= 10_000:
+                return 0
+            idnum = f"{self.year:04d}-{i:04d}"
+            status = client.request("POST", "/api/add_student", self._student(idnum))[0]
+            if status == 201:
+                with self._lock:
+                    self.added.append(idnum)
+            return status
+        return run
+
+    def update(self):
+        def run(client, n):
+            if not self.added:
+                return 0
+            idnum = random.choice(self.added)
+            return client.request("PUT", f"/api/students/{idnum}", self._student(idnum))[0]
+        return run
+
+    def delete(self):
+        def run(client, n):
+            with self._lock:
+                if not self.added:
+                    return 0
+                idnum = self.added.pop()
+            return client.request("DELETE", f"/api/delete_student{idnum}")[0]
+        return run
+
+    def login(self):
+        username, _, password = BENCH_USER
+
+        def run(client, n):
+            return client.request("POST", "/api/login", {"username": username, "password": password})[0]
+        return run
+
+
+def run_scenario(url, token, request_once, seconds, concurrency):
+    latencies = []
+    statuses = {}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker():
+        client = Client(url, token)
+        mine, codes = [], {}
+        n = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                status = request_once(client, n)
+            except Exception:
+                status = -1
+            if status == 0:
+                break  # scenario ran out of work (e.g. nothing left to delete)
+            mine.append(time.perf_counter() - started)
+            codes[status] = codes.get(status, 0) + 1
+            n += 1
+        client.close()
+        with lock:
+            latencies.extend(mine)
+            for code, count in codes.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for code, count in statuses.items() if code < 200 or code >= 400)
+    if not latencies:
+        return {"requests": 0, "errors": errors, "statuses": {str(code): count for code, count in statuses.items()}}
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(code): count for code, count in sorted(statuses.items())},
+        "per_second": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+#============================ REPORTING ============================#
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results, baseline=None):
+    print(f"{'scenario':>10} {'req/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+          + ("  vs baseline" if baseline else ""))
+    for name, r in results.items():
+        if not r["requests"]:
+            print(f"{name:>10} {'-':>10} {'-':>9} {'-':>9} {'-':>9} {r['errors']:>7}")
+            continue
+        line = (f"{name:>10} {r['per_second']:>10.1f} {r['p50_ms']:>9.2f} "
+                f"{r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['errors']:>7}")
+        old = (baseline or {}).get(name)
+        if old and old.get("requests"):
+            line += (f"  req/s {100 * (r['per_second'] / old['per_second'] - 1):+.1f}%"
+                     f"  p99 {100 * (r['p99_ms'] / old['p99_ms'] - 1):+.1f}%")
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--table", choices=["students", "programs", "colleges"], default="students",
+                        help="table for the list, search and count scenarios")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--cold", action="store_true", help="make every GET URL unique to bypass the response cache")
+    parser.add_argument("--output", help="results file (default: results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    client = Client(args.url)
+    status, body = client.request("POST", "/api/login", {"username": BENCH_USER[0], "password": BENCH_USER[2]})
+    if status != 200:
+        sys.exit(f"Login as {BENCH_USER[0]} failed ({status}); was the database seeded with seed.py?")
+    token = json.loads(body).get("token")
+    stats = json.loads(client.request("GET", "/api/stats")[1])
+    programs = json.loads(client.request("GET", "/api/program_list?limit=1")[1])["data"]
+    client.close()
+
+    scenarios = Scenarios(args.cold, args.table)
+    scenarios.programcode = programs[0]["programcode"] if programs else None
+    # Writes only make sense in this order
+    order = [name for name in SCENARIOS if name in args.scenarios]
+
+    print(f"{args.url}  concurrency={args.concurrency}  seconds={args.seconds}  "
+          f"rows={stats.get('overall')}  cold={args.cold}")
+    results = {}
+    for name in order:
+        print(f"  running {name}...")
+        results[name] = run_scenario(args.url, token, getattr(scenarios, name)(),
+                                     args.seconds, args.concurrency)
+
+    if scenarios.added:
+        # delete was not run (or ran short): remove what add created
+        cleanup = Client(args.url, token)
+        for idnum in scenarios.added:
+            cleanup.request("DELETE", f"/api/delete_student{idnum}")
+        cleanup.close()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+    print_results(results, baseline)
+
+    commit = _git_commit()
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "url": args.url,
+        "table": args.table,
+        "concurrency": args.concurrency,
+        "seconds": args.seconds,
+        "cold": args.cold,
+        "rows": stats.get("overall"),
+        "results": results,
+    }
+    output = args.output
+    if not output:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{commit or 'nogit'}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Throughput of password hashing at different bcrypt costs.
+
+    python benchmarks/bench_bcrypt.py --rounds 8 10 12 --seconds 3 --concurrency 16
+
+For every cost it reports hashes/second and latency percentiles, first
+hashing on the calling threads (what register_user used to do) and then
+through the process pool in passwords.py.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt  # noqa: E402
+
+import passwords  # noqa: E402
+from config import BcryptConfig  # noqa: E402
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def run(hash_once, seconds, concurrency):
+    latencies = []
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            hash_once()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as clients:
+        for _ in range(concurrency):
+            clients.submit(client)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "hashes": len(latencies),
+        "per_second": len(latencies) / elapsed,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, nargs="+", default=[8, 10, 12, 14])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--workers", type=int, default=BcryptConfig["workers"])
+    args = parser.parse_args()
+
+    BcryptConfig["workers"] = args.workers
+    print(f"concurrency={args.concurrency} pool_workers={args.workers} cpus={os.cpu_count()}")
+    print(f"{'cost':>4} {'mode':>8} {'hashes/s':>10} {'p50 ms':>9} {'p99 ms':>9}")
+
+    for rounds in args.rounds:
+        salt = bcrypt.gensalt(rounds)
+        inline = run(lambda: bcrypt.hashpw(b"correct horse battery", salt),
+                     args.seconds, args.concurrency)
+        pooled = run(lambda: passwords.hash_password("correct horse battery", rounds=rounds),
+                     args.seconds, args.concurrency)
+        for mode, result in (("inline", inline), ("pool", pooled)):
+            print(f"{rounds:>4} {mode:>8} {result['per_second']:>10.1f} "
+                  f"{result['p50_ms']:>9.1f} {result['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
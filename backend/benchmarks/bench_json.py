@@ -0,0 +1,99 @@
+"""Encoding and compression cost of a large student list, without a database.
+
+    python benchmarks/bench_json.py --students 100000 --repeat 5
+
+Builds N synthetic student rows shaped like the /student_list?all=true
+response (dicts with a datetime created_on) and the ?format=compact one
+(tuples), then times Flask's own JSON provider against the two in json_provider.py,
+and gzip/brotli at a few levels on the resulting body.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import zlib
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import json_provider  # noqa: E402
+from compression import brotli  # noqa: E402
+from synthetic import FIRST_NAMES, LAST_NAMES, PROGRAM_SUBJECTS, SEXES, idnum  # noqa: E402
+
+COLUMNS = ("idnum", "firstname", "lastname", "sex", "yearlevel", "programcode", "profile", "created_on")
+
+
+def students(n, seed):
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+    programs = [f"BS{i}" for i in range(len(PROGRAM_SUBJECTS))]
+    return [
+        (idnum(i), rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), rng.choice(SEXES),
+         rng.randint(1, 5), rng.choice(programs), None, start + timedelta(minutes=i // 7))
+        for i in range(n)
+    ]
+
+
+def best_of(repeat, fn):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--students", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--datetime", choices=("http", "iso"), default="http", help="JSON_DATETIME_FORMAT")
+    args = parser.parse_args()
+
+    rows = students(args.students, args.seed)
+    payloads = {
+        "objects": [dict(zip(COLUMNS, row)) for row in rows],
+        "compact": {"columns": list(COLUMNS), "rows": rows},
+    }
+
+    # Providers only hold a weak reference to their app
+    app = Flask(__name__)
+    app.config["JSON_DATETIME_FORMAT"] = args.datetime
+    providers = {"flask": DefaultJSONProvider(app)}
+    for name, provider_class in json_provider.PROVIDERS.items():
+        if name == "orjson" and json_provider.orjson is None:
+            print("orjson is not installed, skipping it")
+            continue
+        providers[name] = provider_class(app)
+
+    print(f"{args.students:,} students, best of {args.repeat}\n")
+    print(f"{'provider':>8} {'shape':>8} {'encode':>10} {'bytes':>12}")
+    body = None
+    for name, provider in providers.items():
+        for shape, payload in payloads.items():
+            elapsed, response = best_of(args.repeat, lambda: provider.response(payload))
+            data = response.get_data()
+            if shape == "objects":
+                body = data
+            print(f"{name:>8} {shape:>8} {elapsed * 1e3:>8.1f}ms {len(data):>12,}")
+
+    print(f"\nCompressing the objects body ({len(body):,} bytes)\n")
+    print(f"{'encoding':>10} {'time':>10} {'bytes':>12} {'ratio':>7}")
+    encoders = [(f"gzip-{level}", lambda level=level: zlib.compress(body, level, wbits=31)) for level in (1, 6, 9)]
+    if brotli is not None:
+        encoders += [(f"br-{quality}", lambda quality=quality: brotli.compress(body, quality=quality))
+                     for quality in (1, 4, 6, 11)]
+    else:
+        print("brotli is not installed, skipping it")
+    for label, encode in encoders:
+        elapsed, compressed = best_of(args.repeat, encode)
+        print(f"{label:>10} {elapsed * 1e3:>8.1f}ms {len(compressed):>12,} {len(body) / len(compressed):>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
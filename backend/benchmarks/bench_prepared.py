@@ -0,0 +1,106 @@
+"""Per-call latency of the hot statements, plain vs prepared.
+
+    DB_HOST=localhost DB_NAME=ssis_bench DB_SSLMODE=disable \\
+        python benchmarks/bench_prepared.py --iterations 2000
+
+Runs every statement registered in prepared.py (plus the keyset page and
+search queries) against a database filled by seed.py, first with a plain
+cursor.execute and then through prepared.execute on the same connection,
+and prints p50/p99 per call and the time saved. The UPDATE is rolled back
+after every call.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2  # noqa: E402
+
+import prepared  # noqa: E402
+from auth.routes import USER_BY_NAME_SQL  # noqa: E402
+from auth.sessions import TOKEN_VERSION_SQL  # noqa: E402
+from conditional import VERSIONS_SQL  # noqa: E402
+from config import SupabaseConfig  # noqa: E402
+from counts import SUMMARY_COUNTS_SQL  # noqa: E402
+from db import InstrumentedConnection  # noqa: E402
+from pagination import build_page_query  # noqa: E402
+from search import build_search  # noqa: E402
+from students.routes import UPDATE_STUDENT_SQL  # noqa: E402
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def scenarios():
+    first_page = build_page_query("students", "idnum", 50, None)
+    next_page = build_page_query("students", "idnum", 50, (datetime(2020, 1, 2), "2000-0200"))
+    return [
+        ("login lookup", USER_BY_NAME_SQL, ("bench",), False),
+        ("token version", TOKEN_VERSION_SQL, (1,), False),
+        ("table versions", VERSIONS_SQL, (["students", "programs", "colleges"],), False),
+        ("summary counts", SUMMARY_COUNTS_SQL, None, False),
+        ("students page 1", first_page[0], first_page[1], False),
+        ("students page n", next_page[0], next_page[1], False),
+        ("student search", *build_search("students", "santos", 20), False),
+        ("update student", UPDATE_STUDENT_SQL,
+         (None, "2000-0001", "Juan", "Santos", "Male", 2, None, "2000-0001"), True),
+    ]
+
+
+def timed(conn, run, iterations, rollback):
+    cur = conn.cursor()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        run(cur)
+        cur.fetchall()
+        latencies.append(time.perf_counter() - started)
+        if rollback:
+            conn.rollback()
+        else:
+            conn.commit()
+    cur.close()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(connection_factory=InstrumentedConnection, **SupabaseConfig)
+    print(f"{'statement':>16} {'plain p50':>10} {'prep p50':>10} {'plain p99':>10} {'prep p99':>10} {'saved/call':>11}")
+
+    for label, query, params, rollback in scenarios():
+        def plain(cur):
+            cur.execute(query, params)
+
+        def prep(cur):
+            prepared.execute(cur, query, params)
+
+        try:
+            timed(conn, plain, args.warmup, rollback)
+            timed(conn, prep, args.warmup, rollback)
+            plain_times = timed(conn, plain, args.iterations, rollback)
+            prep_times = timed(conn, prep, args.iterations, rollback)
+        except psycopg2.Error as e:
+            conn.rollback()
+            print(f"{label:>16} skipped: {str(e).strip()}")
+            continue
+
+        saved = (sum(plain_times) - sum(prep_times)) / args.iterations
+        print(f"{label:>16} {_percentile(plain_times, 50) * 1e3:>8.3f}ms {_percentile(prep_times, 50) * 1e3:>8.3f}ms "
+              f"{_percentile(plain_times, 99) * 1e3:>8.3f}ms {_percentile(prep_times, 99) * 1e3:>8.3f}ms "
+              f"{saved * 1e6:>9.1f}us")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
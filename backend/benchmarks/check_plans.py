@@ -0,0 +1,142 @@
+"""Check that the hot lookups use the indexes from migrations/0005.
+
+    DB_HOST=localhost DB_NAME=ssis_bench DB_SSLMODE=disable \\
+        python benchmarks/check_plans.py
+
+For every query below it prints the plan's scan nodes twice: "before", with
+the 0005 indexes dropped inside a transaction that is rolled back, and
+"after", as the database is. Exits 1 if an "after" plan doesn't use the
+expected index. Run it on a database filled by seed.py (--scale 100k or
+more); on a handful of rows the planner rightly prefers a sequential scan,
+so those checks are reported but not enforced.
+
+Refuses to touch a non-local host unless --force is given (DROP INDEX
+locks the tables until the rollback). tests/test_plans.py asserts the
+"after" plans as part of the test suite.
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import psycopg2  # noqa: E402
+
+from config import SupabaseConfig  # noqa: E402
+from pagination import build_page_query  # noqa: E402
+
+# Below this many rows a sequential scan is the right plan
+MIN_ROWS = 1000
+
+NEW_INDEXES = (
+    "programs_collegecode_idx",
+    "students_programcode_idx",
+    "colleges_userid_created_on_idx",
+    "students_created_on_idnum_idx",
+    "programs_created_on_programcode_idx",
+    "colleges_created_on_collegecode_idx",
+)
+
+
+def checks(cur):
+    cur.execute("SELECT programcode FROM programs ORDER BY programcode LIMIT 1;")
+    programcode = cur.fetchone()[0]
+    cur.execute("SELECT collegecode, userid FROM colleges ORDER BY collegecode LIMIT 1;")
+    collegecode, userid = cur.fetchone()
+
+    return [
+        # (label, table, query, params, expected index)
+        ("delete_program: unlink students", "students",
+         "UPDATE students SET programcode = NULL WHERE programcode = %s;", (programcode,),
+         "students_programcode_idx"),
+        ("delete_college: unlink programs", "programs",
+         "UPDATE programs SET collegecode = NULL WHERE collegecode = %s;", (collegecode,),
+         "programs_collegecode_idx"),
+        ("a user's colleges, newest first", "colleges",
+         "SELECT * FROM colleges WHERE userid = %s ORDER BY created_on DESC;", (userid,),
+         "colleges_userid_created_on_idx"),
+        ("students, first page", "students",
+         *build_page_query("students", "idnum", 50, None), "students_created_on_idnum_idx"),
+        ("students, later page", "students",
+         *build_page_query("students", "idnum", 50, (datetime(2020, 1, 2), "2000-0200")),
+         "students_created_on_idnum_idx"),
+        ("programs, first page", "programs",
+         *build_page_query("programs", "programcode", 50, None), "programs_created_on_programcode_idx"),
+        ("colleges, first page", "colleges",
+         *build_page_query("colleges", "collegecode", 50, None), "colleges_created_on_collegecode_idx"),
+    ]
+
+
+def scans(plan):
+    """'Index Scan using x', 'Seq Scan on y', 'Sort', ... for every node of the plan."""
+    node = plan["Node Type"]
+    if "Index Name" in plan:
+        found = [f"{node} using {plan['Index Name']}"]
+    elif "Relation Name" in plan:
+        found = [f"{node} on {plan['Relation Name']}"]
+    elif node in ("Sort", "Incremental Sort"):
+        found = [node]
+    else:
+        found = []
+    for child in plan.get("Plans", ()):
+        found += scans(child)
+    return found
+
+
+def table_rows(cur):
+    """Estimated rows per table, from the planner's statistics."""
+    cur.execute("SELECT relname, GREATEST(reltuples, 0)::BIGINT FROM pg_class "
+                "WHERE relname IN ('students', 'programs', 'colleges') AND relkind = 'r';")
+    return dict(cur.fetchall())
+
+
+def explain(cur, query, params):
+    cur.execute("EXPLAIN (FORMAT JSON) " + query.strip().rstrip(";"), params)
+    return scans(cur.fetchone()[0][0]["Plan"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="allow a non-local database host")
+    args = parser.parse_args()
+
+    host = SupabaseConfig["host"]
+    if host not in ("localhost", "127.0.0.1", "::1", "") and not host.startswith("/") and not args.force:
+        parser.error(f"refusing to drop indexes on {host}; set DB_HOST=localhost or pass --force")
+
+    conn = psycopg2.connect(**SupabaseConfig)
+    cur = conn.cursor()
+    rows = table_rows(cur)
+    queries = checks(cur)
+
+    after = [explain(cur, query, params) for _, _, query, params, _ in queries]
+    conn.rollback()
+
+    for index in NEW_INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {index};")
+    before = [explain(cur, query, params) for _, _, query, params, _ in queries]
+    conn.rollback()
+    cur.close()
+    conn.close()
+
+    failed = 0
+    for (label, table, _, _, index), old, new in zip(queries, before, after):
+        used = any(node.endswith(f"using {index}") for node in new)
+        enforced = rows.get(table, 0) >= MIN_ROWS
+        if used:
+            verdict = "ok"
+        elif enforced:
+            verdict = "FAIL"
+            failed += 1
+        else:
+            verdict = f"not used ({table} has {rows.get(table, 0)} rows, not enforced)"
+        print(f"{label} [{verdict}]")
+        print(f"    before: {', '.join(old)}")
+        print(f"    after:  {', '.join(new)}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
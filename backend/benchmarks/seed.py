@@ -0,0 +1,140 @@
+"""Build a benchmark database from SSIS QUERY.sql and fill it with synthetic data.
+
+    DB_HOST=localhost DB_NAME=ssis_bench DB_SSLMODE=disable \\
+        python benchmarks/seed.py --scale 100k
+
+Drops and recreates users, colleges, programs and students in the database
+the app is configured for (the DB_* variables in config.py), loads colleges,
+programs and N students with COPY, applies migrations/*.sql through
+migrate.py and analyzes.
+The same seed always produces the same rows, so results from different
+commits are comparable. A user `bench` / `bench-password` is created for
+the login and write scenarios in bench_api.py.
+
+Refuses to touch a non-local host unless --force is given.
+"""
+import argparse
+import io
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt  # noqa: E402
+import psycopg2  # noqa: E402
+
+import migrate  # noqa: E402
+from config import SupabaseConfig  # noqa: E402
+from synthetic import (BENCH_USER, COLLEGES, FIRST_NAMES, LAST_NAMES,  # noqa: E402
+                       PROGRAM_SUBJECTS, SCALES, SEXES, idnum)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _copy(cur, table, columns, rows):
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join("\\N" if v is None else str(v) for v in row) + "\n")
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", buf)
+
+
+def reset_schema(cur):
+    cur.execute("DROP TABLE IF EXISTS students, programs, colleges, users, table_counts, table_versions, schema_migrations CASCADE;")
+    with open(os.path.join(BACKEND_DIR, "SSIS QUERY.sql")) as f:
+        cur.execute(f.read())
+    # The routes read and write a profile picture URL that SSIS QUERY.sql predates
+    cur.execute("ALTER TABLE students ADD COLUMN IF NOT EXISTS profile TEXT;")
+
+
+def apply_migrations(conn):
+    for migration in migrate.migrate(conn):
+        print(f"  applied {migration.filename}")
+
+
+def seed(cur, students, rng, rounds):
+    username, email, password = BENCH_USER
+    hashed = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt(rounds)).decode("utf-8")
+    cur.execute("INSERT INTO users (username, useremail, userpass) VALUES (%s, %s, %s) RETURNING userid;",
+                (username, email, hashed))
+    userid = cur.fetchone()[0]
+
+    start = datetime(2020, 1, 1)
+    _copy(cur, "colleges", ("collegecode", "collegename", "userid", "created_on"),
+          ((code, name, userid, start) for code, name in COLLEGES))
+
+    programs = []
+    for n, subject in enumerate(PROGRAM_SUBJECTS):
+        college = COLLEGES[n % len(COLLEGES)][0]
+        for prefix, degree in (("BS", "Bachelor of Science in"), ("BA", "Bachelor of Arts in")):
+            code = prefix + "".join(word[0] for word in subject.split()).upper() + str(n)
+            programs.append((code, f"{degree} {subject}", college, start))
+    _copy(cur, "programs", ("programcode", "programname", "collegecode", "created_on"), programs)
+
+    # created_on spread over a few years, ties included, like real enrolment batches
+    def student_rows():
+        for i in range(students):
+            yield (
+                idnum(i),
+                rng.choice(FIRST_NAMES),
+                rng.choice(LAST_NAMES),
+                rng.choice(SEXES),
+                rng.randint(1, 5),
+                rng.choice(programs)[0] if rng.random() > 0.02 else None,
+                start + timedelta(minutes=i // 7),
+                None,
+            )
+
+    columns = ("idnum", "firstname", "lastname", "sex", "yearlevel", "programcode", "created_on", "profile")
+    rows = student_rows()
+    loaded = 0
+    while loaded < students:
+        chunk = [row for _, row in zip(range(50_000), rows)]
+        _copy(cur, "students", columns, chunk)
+        loaded += len(chunk)
+        print(f"  students: {loaded:,}/{students:,}", end="\r")
+    print()
+    return len(programs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=SCALES, default="10k")
+    size.add_argument("--students", type=int, help="exact number of students instead of --scale")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--bcrypt-rounds", type=int, default=12, help="cost of the bench user's password hash")
+    parser.add_argument("--no-migrations", action="store_true", help="leave out migrations/*.sql")
+    parser.add_argument("--force", action="store_true", help="allow a non-local database host")
+    args = parser.parse_args()
+
+    host = SupabaseConfig["host"]
+    if host not in ("localhost", "127.0.0.1", "::1", "") and not host.startswith("/") and not args.force:
+        parser.error(f"refusing to drop tables on {host}; set DB_HOST=localhost or pass --force")
+
+    students = args.students if args.students is not None else SCALES[args.scale]
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+
+    conn = psycopg2.connect(**SupabaseConfig)
+    cur = conn.cursor()
+    print(f"Seeding {SupabaseConfig['dbname']} on {host} with {students:,} students")
+    reset_schema(cur)
+    programs = seed(cur, students, rng, args.bcrypt_rounds)
+    conn.commit()
+    if not args.no_migrations:
+        apply_migrations(conn)
+
+    conn.autocommit = True
+    cur.execute("VACUUM ANALYZE;")
+    cur.close()
+    conn.close()
+    print(f"Done: {len(COLLEGES)} colleges, {programs} programs, {students:,} students "
+          f"in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Fixed vocabulary for the synthetic benchmark data (shared by seed.py and bench_api.py)."""
+
+SCALES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+BENCH_USER = ("bench", "bench@example.com", "bench-password")
+
+COLLEGES = [
+    ("CCS", "College of Computer Studies"),
+    ("COE", "College of Engineering"),
+    ("CSM", "College of Science and Mathematics"),
+    ("CED", "College of Education"),
+    ("CASS", "College of Arts and Social Sciences"),
+    ("CEBA", "College of Economics, Business and Accountancy"),
+    ("CON", "College of Nursing"),
+    ("CHS", "College of Health Sciences"),
+]
+
+PROGRAM_SUBJECTS = [
+    "Computer Science", "Information Technology", "Information Systems", "Civil Engineering",
+    "Electrical Engineering", "Mechanical Engineering", "Chemical Engineering", "Biology",
+    "Chemistry", "Physics", "Mathematics", "Statistics", "Elementary Education",
+    "Secondary Education", "Physical Education", "English", "Filipino", "History",
+    "Political Science", "Psychology", "Sociology", "Accountancy", "Economics", "Marketing",
+    "Entrepreneurship", "Hospitality Management", "Nursing", "Medical Technology",
+    "Pharmacy", "Nutrition",
+]
+
+FIRST_NAMES = [
+    "Juan", "Maria", "Jose", "Ana", "Mark", "Angel", "John", "Kristine", "Paolo", "Nicole",
+    "Miguel", "Andrea", "Carlo", "Patricia", "Rafael", "Camille", "Gabriel", "Jasmine",
+    "Daniel", "Bea", "Joshua", "Erika", "Christian", "Katrina", "Adrian", "Sofia", "Luis",
+    "Isabel", "Marco", "Clarisse", "Kevin", "Danica", "Ramon", "Trisha", "Vincent", "Aira",
+]
+
+LAST_NAMES = [
+    "Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Tomas",
+    "Andrada", "Castillo", "Flores", "Villanueva", "Ramos", "Castro", "Rivera", "Aquino",
+    "Navarro", "Salazar", "Mercado", "Dela Cruz", "Gonzales", "Lopez", "Hernandez", "Perez",
+    "Domingo", "Pascual", "Soriano", "Aguilar", "Valdez", "Fernandez", "Dizon", "Manalo",
+]
+
+SEXES = ["Male", "Female", "Other"]
+
+
+def idnum(i):
+    # YYYY-NNNN like the frontend expects; 10,000 students per enrolment year
+    return f"{2000 + i // 10_000:04d}-{i % 10_000:04d}"
+
@@ -1,27 +1,33 @@
+import logging
 from flask import Blueprint, jsonify, request
 from flask_cors import CORS
-import psycopg2
 from psycopg2.extras import RealDictCursor
-from config import SupabaseConfig
+from auth.sessions import require_auth
+from batch import BatchError, parse_batch, run_batch
+from conditional import conditional
+from counts import get_counts
+import prepared
+from db import get_db_connection
+from export import ExportError, export_response, parse_export_args
+from invalidation import tables_changed
+from pagination import PaginationError, fetch_page, parse_page_args, wants_all
+from projection import ProjectionError, cursor_columns, parse_projection
+from response_cache import cached
+from search import SearchError, build_search, search_limit
+from search_index import search_indexes
+from streaming import StreamFormatError, stream_format, stream_query
 
 colleges_bp = Blueprint("colleges_bp", __name__, url_prefix="/api")
 CORS(colleges_bp)
+log = logging.getLogger(__name__)
 
-    
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**SupabaseConfig)
-        print("Database connection successful")
-        return conn
-    except Exception as e:
-        print(f"Database connection failed: {e}")
-        raise
 
 
 #============================ FOR ADDING ============================#
 
 # for adding colleges
 @colleges_bp.route("/add_college", methods=["POST"])
+@require_auth
 def add_college():
     try:
         data = request.get_json()
@@ -49,51 +55,92 @@ def add_college():
             """
             INSERT INTO colleges (collegecode, collegename)
             VALUES (%s, %s)
-            RETURNING collegecode;
+            RETURNING *;
             """,
             (collegecode, collegename)
         )
 
-        new_college_code = cur.fetchone()["collegecode"]
+        college = cur.fetchone()
+        new_college_code = college["collegecode"]
         conn.commit()
 
         cur.close()
         conn.close()
 
-        print(f"College '{collegename}' added successfully!")
+        search_indexes.upsert("colleges", college)
+        tables_changed("colleges")
+
+        log.info("College added", extra={"collegecode": new_college_code})
         return jsonify({
             "message": "College registered successfully!",
             "collegecode": new_college_code
         }), 201
 
     except Exception as e:
-        print(f"Error adding college: {e}")
+        log.exception("Error adding college")
         return jsonify({"error": str(e)}), 500
 
 
 
 #============================ FOR LISTING ALL COLLEGES ============================#
 
+# one keyset page at a time (?limit=&after=), everything with ?all=true, or streamed with ?stream=json/ndjson
+# ?fields=a,b,c picks the columns, ?format=compact sends {"columns": [...], "rows": [[...], ...]}
 @colleges_bp.route("/college_list", methods=["GET"])
+@conditional("colleges")
+@cached("colleges")
 def get_colleges():
     try:
+        projection = parse_projection("colleges", request.args)
+
+        fmt = stream_format(request.args)
+        if fmt:
+            return stream_query(f"SELECT {projection.select()} FROM colleges ORDER BY created_on NULLS LAST, collegecode;", fmt=fmt)
+
+        unbounded = wants_all(request.args)
+        if not unbounded:
+            limit, after = parse_page_args(request.args)
+
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("SELECT * FROM colleges;")
-        colleges = cur.fetchall()
+        cur = conn.cursor(cursor_factory=projection.cursor_factory)
+        if unbounded:
+            cur.execute(f"SELECT {projection.select()} FROM colleges;")
+            colleges = projection.render(cur.fetchall(), cursor_columns(cur))
+        else:
+            colleges = fetch_page(cur, "colleges", "collegecode", limit, after, projection)
         cur.close()
         conn.close()
  
         return jsonify(colleges), 200
+    except (PaginationError, ProjectionError, StreamFormatError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 
 
+#============================ FOR EXPORT ============================#
+# Streams COPY output: ?format=csv|arrow|parquet, ?gzip=true (csv only),
+# ?columns=a,b,c and filters ?collegecode=
+@colleges_bp.route("/colleges/export", methods=["GET"])
+@require_auth
+def export_colleges():
+    try:
+        fmt, columns, filters, gzip = parse_export_args("colleges", request.args)
+        return export_response("colleges", fmt, columns, filters, gzip=gzip)
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error exporting colleges")
+        return jsonify({"error": str(e)}), 500
+
+
+
 #============================ FOR UPDATE ============================#
 
 @colleges_bp.route("/colleges/<string:collegecode>", methods=["PUT"])
+@require_auth
 def update_college(collegecode):
     try:
         data = request.get_json()
@@ -104,14 +151,14 @@ def update_college(collegecode):
             return jsonify({"error": "Missing required fields"}), 400
 
         conn = get_db_connection()
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
 
         # Update the record
         cur.execute("""
             UPDATE colleges
             SET collegecode = %s, collegename = %s
             WHERE collegecode = %s
-            RETURNING collegecode;
+            RETURNING *;
         """, (new_code, new_name, collegecode))
 
         updated = cur.fetchone()
@@ -122,19 +169,62 @@ def update_college(collegecode):
         if not updated:
             return jsonify({"error": "College not found"}), 404
 
-        print(f"College '{collegecode}' updated successfully to '{new_code}' / '{new_name}'")
+        search_indexes.upsert("colleges", updated, old_key=collegecode)
+        if new_code != collegecode:
+            # programs.collegecode follows through ON UPDATE CASCADE
+            search_indexes.replace_value("programs", "collegecode", collegecode, new_code)
+            tables_changed("colleges", "programs")
+        else:
+            tables_changed("colleges")
+
+        log.info("College updated", extra={"collegecode": collegecode, "new_collegecode": new_code})
         return jsonify({"message": "College updated successfully"}), 200
 
     except Exception as e:
-        print(f"Error updating college: {e}")
+        log.exception("Error updating college")
         return jsonify({"error": str(e)}), 500
 
 
 
 
+#============================ FOR BATCH WRITES ============================#
+# {"upserts": [{...}, ...], "deletes": ["key", ...]} in one transaction,
+# with a status per item; ?atomic=true rolls back if any item fails
+@colleges_bp.route("/colleges/batch", methods=["POST"])
+@require_auth
+def batch_colleges():
+    try:
+        upserts, deletes = parse_batch(request.get_json(silent=True))
+        atomic = request.args.get("atomic", "").lower() in ("1", "true", "yes")
+
+        conn = get_db_connection()
+        result, written, deleted = run_batch(conn, "colleges", upserts, deletes, atomic=atomic)
+        conn.close()
+
+        for row in written:
+            search_indexes.upsert("colleges", row)
+        for key in deleted:
+            search_indexes.replace_value("programs", "collegecode", key, None)
+            search_indexes.remove("colleges", key)
+        if deleted:
+            tables_changed("colleges", "programs")
+        elif written:
+            tables_changed("colleges")
+
+        return jsonify(result), 200
+
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error in batch_colleges")
+        return jsonify({"error": str(e)}), 500
+
+
+
 #============================ FOR DELETE ============================#
 
 @colleges_bp.route('/delete_college/<string:collegecode>', methods=['DELETE'])
+@require_auth
 def delete_college(collegecode):
     try:
         conn = get_db_connection()
@@ -153,12 +243,16 @@ def delete_college(collegecode):
         cur.close()
         conn.close()
 
+        search_indexes.replace_value("programs", "collegecode", collegecode, None)
+        search_indexes.remove("colleges", collegecode)
+        tables_changed("colleges", "programs")
+
         return jsonify({
             "message": f"College '{collegecode}' deleted successfully. Related programs now have no college."
         }), 200
 
     except Exception as e:
-        print(f"Error deleting college: {e}")
+        log.exception("Error deleting college")
         return jsonify({"error": str(e)}), 500
 
 
@@ -169,21 +263,35 @@ def delete_college(collegecode):
 #============================ FOR SEARCHING ============================#
 
 @colleges_bp.route('/search_college/<string:keyword>', methods=['GET'])
+@conditional("colleges")
+@cached("colleges")
 def search_college(keyword):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        projection = parse_projection("colleges", request.args)
+        fmt = stream_format(request.args)
+        limit = search_limit(request.args)
+
+        # Answer from the in-memory index when it is enabled and built
+        if not fmt and search_indexes.ready():
+            return jsonify(projection.render_dicts(search_indexes.search("colleges", keyword, limit))), 200
         
-        query = """ SELECT * FROM colleges WHERE collegecode ILIKE %s OR collegename ILIKE %s; """
-        search_pattern = f"%{keyword}%"
+        # Ranked trigram search, backed by the indexes in migrations/0001_search_indexes.sql
+        query, params = build_search("colleges", keyword, limit, projection.select())
 
-        cur.execute(query, (search_pattern, search_pattern))
+        if fmt:
+            return stream_query(query, params, fmt=fmt)
+
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=projection.cursor_factory)
+        prepared.execute(cur, query, params)
 
-        results = cur.fetchall()
+        results = projection.render(cur.fetchall(), cursor_columns(cur))
         cur.close()
         conn.close()
 
         return jsonify(results), 200
+    except (ProjectionError, SearchError, StreamFormatError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -192,15 +300,12 @@ def search_college(keyword):
 
 
 @colleges_bp.route('/college_count', methods=['GET'])
+@conditional("colleges")
+@cached("colleges")
 def get_college_count():
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("SELECT COUNT(*) FROM colleges;" )
-        count = cur.fetchone()[0]
-
-        cur.close()
+        count = get_counts(conn)["overall"]["colleges"]
         conn.close()
 
         return jsonify({"count": count}), 200
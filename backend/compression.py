@@ -0,0 +1,155 @@
+import zlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional, only gzip is offered without it
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "application/x-ndjson",
+    "text/csv",
+    "text/html",
+    "text/plain",
+}
+
+
+def etag_variants(etag):
+    """The ETag of every representation a response may be sent in."""
+    return [etag] + [f"{etag}-{encoding}" for encoding in ("br", "gzip")]
+
+
+#============================ ENCODERS ============================#
+
+class _Gzip:
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31: gzip container
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+#============================ RESPONSE COMPRESSION ============================#
+
+class Compression:
+    """Content-negotiated br/gzip for every response of a compressible type.
+
+    Buffered bodies are compressed once they reach `min_size` bytes. Streamed
+    bodies (?stream=, csv exports) are compressed chunk by chunk as they are
+    generated, so they stay streamed. A compressed response gets its own
+    strong ETag ("<etag>-gzip", "<etag>-br"), and @conditional accepts those
+    back in If-None-Match.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.min_size = 1024
+        self.gzip_level = 6
+        self.brotli_quality = 4
+        self.streams = True
+
+    def init_app(self, app):
+        self.enabled = app.config.get("COMPRESSION_ENABLED", True)
+        self.min_size = app.config.get("COMPRESSION_MIN_SIZE", 1024)
+        self.gzip_level = app.config.get("COMPRESSION_GZIP_LEVEL", 6)
+        self.brotli_quality = app.config.get("COMPRESSION_BROTLI_QUALITY", 4)
+        self.streams = app.config.get("COMPRESSION_STREAMS", True)
+        if self.enabled:
+            app.after_request(self._compress)
+
+    @property
+    def encodings(self):
+        return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+    def negotiate(self):
+        """The encoding to use for this request, or None for identity."""
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if encoding is None or request.accept_encodings[encoding] <= 0:
+            return None
+        return encoding
+
+    def encoder(self, encoding):
+        if encoding == "br":
+            return _Brotli(self.brotli_quality)
+        return _Gzip(self.gzip_level)
+
+    def compress(self, data, encoding):
+        encoder = self.encoder(encoding)
+        return encoder.compress(data) + encoder.finish()
+
+    def _compress_stream(self, chunks, encoding):
+        encoder = self.encoder(encoding)
+        try:
+            for chunk in chunks:
+                if isinstance(chunk, str):
+                    chunk = chunk.encode("utf-8")
+                compressed = encoder.compress(chunk)
+                if compressed:
+                    yield compressed
+            yield encoder.finish()
+        finally:
+            # A client that disconnects closes this generator; pass that on
+            close = getattr(chunks, "close", None)
+            if close is not None:
+                close()
+
+    def _compress(self, response):
+        if "Content-Encoding" in response.headers:
+            return response
+
+        if response.status_code == 304:
+            # Echo the variant the client holds, so its cache entry stays valid
+            etag, weak = response.get_etag()
+            encoding = self.negotiate()
+            if etag and encoding and request.if_none_match.contains(f"{etag}-{encoding}"):
+                response.set_etag(f"{etag}-{encoding}", weak=weak)
+            return response
+
+        if response.mimetype not in COMPRESSIBLE_TYPES:
+            return response
+        response.vary.add("Accept-Encoding")
+
+        encoding = self.negotiate()
+        if encoding is None or request.method == "HEAD":
+            return response
+        if response.status_code < 200 or response.status_code >= 300 or response.status_code == 204:
+            return response
+        if "no-transform" in (response.headers.get("Cache-Control") or "") or response.direct_passthrough:
+            return response
+
+        if response.is_streamed:
+            if not self.streams:
+                return response
+            response.response = self._compress_stream(response.response, encoding)
+            response.headers.pop("Content-Length", None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress(data, encoding))
+
+        response.headers["Content-Encoding"] = encoding
+        etag, weak = response.get_etag()
+        if etag:
+            response.set_etag(f"{etag}-{encoding}", weak=weak)
+        return response
+
+
+compression = Compression()
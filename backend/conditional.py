@@ -0,0 +1,100 @@
+import hashlib
+import logging
+from functools import wraps
+
+from flask import Response, g, make_response, request
+from psycopg2 import errors
+
+import prepared
+from compression import etag_variants
+from db import get_db_connection
+
+
+log = logging.getLogger(__name__)
+
+
+VERSIONS_SQL = prepared.register(
+    "SELECT tablename, version, modified_at FROM table_versions WHERE tablename = ANY(%s);"
+)
+
+_versions_available = True
+
+
+def table_versions(tables):
+    """Return {table: (version, modified_at)}, or None without the migration."""
+    global _versions_available
+    if not _versions_available:
+        return None
+
+    conn = get_db_connection()
+    cur = conn.cursor()
+    try:
+        prepared.execute(cur, VERSIONS_SQL, (list(tables),))
+        versions = {name: (version, modified_at) for name, version, modified_at in cur.fetchall()}
+    except errors.UndefinedTable:
+        # migrations/0003_table_versions.sql not applied: serve without validators
+        conn.rollback()
+        _versions_available = False
+        return None
+    finally:
+        cur.close()
+        conn.close()
+
+    if set(versions) != set(tables):
+        return None
+    return versions
+
+
+def _etag(versions):
+    # Same URL (path + query string) and same table versions -> same body
+    stamp = request.full_path + "|" + ",".join(
+        f"{table}:{versions[table][0]}" for table in sorted(versions)
+    )
+    return hashlib.sha1(stamp.encode("utf-8")).hexdigest()
+
+
+def conditional(*tables):
+    """Answer If-None-Match / If-Modified-Since with 304 when `tables` are unchanged.
+
+    The check costs one primary-key lookup on table_versions; the wrapped
+    view (and its query and serialisation) only runs on a miss.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = table_versions(tables)
+            except Exception as e:
+                log.warning("Version lookup failed, serving without ETag: %s", e)
+                versions = None
+            if versions is None:
+                return view(*args, **kwargs)
+
+            # Lets caches further down key their entries on the same versions
+            g.table_versions = versions
+            etag = _etag(versions)
+            last_modified = max(modified_at for _, modified_at in versions.values()).replace(microsecond=0)
+
+            if request.if_none_match:
+                # Compressed responses carry "<etag>-gzip" / "<etag>-br"
+                not_modified = any(request.if_none_match.contains(tag) for tag in etag_variants(etag))
+            elif request.if_modified_since:
+                not_modified = last_modified <= request.if_modified_since
+            else:
+                not_modified = False
+
+            if not_modified:
+                response = Response(status=304)
+            else:
+                response = view(*args, **kwargs)
+                response = make_response(response)
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            response.last_modified = last_modified
+            # Let clients cache, but revalidate every time
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
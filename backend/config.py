@@ -1,5 +1,6 @@
 from dotenv import load_dotenv
 import os
+import secrets
 import cloudinary
 import cloudinary.uploader
 
@@ -7,16 +8,59 @@ import cloudinary.uploader
 load_dotenv()
 
 
+# DB_* variables point the app at another database (e.g. a local one for benchmarks)
 SupabaseConfig = {
-    "host": "db.dynnqdaabhcmfnomebqk.supabase.co",
-    "port": 5432,
-    "dbname": "web-ssis",
-    "user": "postgres",
-    "password": "eliabado123",
-    "sslmode": "require"      
+    "host": os.getenv("DB_HOST", "db.dynnqdaabhcmfnomebqk.supabase.co"),
+    "port": int(os.getenv("DB_PORT", 5432)),
+    "dbname": os.getenv("DB_NAME", "web-ssis"),
+    "user": os.getenv("DB_USER", "postgres"),
+    "password": os.getenv("DB_PASSWORD", "eliabado123"),
+    "sslmode": os.getenv("DB_SSLMODE", "require")
 }
 
 
+# Shared connection pool (see db.py)
+PoolConfig = {
+    "minconn": int(os.getenv("DB_POOL_MIN", 1)),
+    "maxconn": int(os.getenv("DB_POOL_MAX", 10)),
+    "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 1800)),  # seconds before a connection is recycled
+    "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),  # seconds to wait when the pool is exhausted
+    "health_check_after": float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", 30)),  # idle seconds before SELECT 1 on checkout
+}
+
+# Production server (see gunicorn.conf.py)
+ServerConfig = {
+    "bind": os.getenv("SERVER_BIND", "0.0.0.0:5000"),
+    "workers": int(os.getenv("SERVER_WORKERS", 2 * (os.cpu_count() or 1) + 1)),
+    "threads": int(os.getenv("SERVER_THREADS", 4)),  # request threads per worker; keep <= DB_POOL_MAX
+    "timeout": int(os.getenv("SERVER_TIMEOUT", 60)),  # seconds before a stuck worker is killed
+    "graceful_timeout": int(os.getenv("SERVER_GRACEFUL_TIMEOUT", 30)),  # seconds to finish requests on reload/shutdown
+    "max_requests": int(os.getenv("SERVER_MAX_REQUESTS", 10000)),  # recycle a worker after this many requests, 0 never
+    "max_requests_jitter": int(os.getenv("SERVER_MAX_REQUESTS_JITTER", 1000)),  # so workers don't all restart at once
+    "health_check_timeout": float(os.getenv("SERVER_HEALTH_CHECK_TIMEOUT", 2)),  # seconds /api/health/ready waits for a connection
+}
+
+# Password hashing (see passwords.py)
+BcryptConfig = {
+    "rounds": int(os.getenv("BCRYPT_ROUNDS", 12)),  # work factor; changing it rehashes users on their next login
+    "workers": int(os.getenv("BCRYPT_WORKERS", os.cpu_count() or 1)),  # hashing processes, 0 hashes on the request thread
+    "timeout": float(os.getenv("BCRYPT_TIMEOUT", 10)),  # seconds to wait for a hash before failing the request
+}
+
+# Schema migrations (see migrate.py)
+MigrationConfig = {
+    "on_startup": os.getenv("MIGRATE_ON_STARTUP", 'False') == 'True',  # apply pending migrations when the app is imported
+    "lock_timeout_ms": int(os.getenv("MIGRATE_LOCK_TIMEOUT_MS", 5000)),  # give up instead of queueing requests behind DDL
+}
+
+# Run the hot statements as server-side prepared statements (see prepared.py).
+# Turn off behind a transaction-mode pooler (e.g. PgBouncer, Supabase port 6543)
+PREPARED_STATEMENTS = os.getenv("PREPARED_STATEMENTS", 'True') == 'True'
+
+# Seconds a cached /api/stats result is served before it is recomputed
+COUNT_CACHE_TTL = float(os.getenv("COUNT_CACHE_TTL", 30))
+
+
 cloudinary.config(
     cloud_name=os.getenv("CLOUDINARY_CLOUD_NAME"),
     api_key=os.getenv("CLOUDINARY_API_KEY"),
@@ -25,6 +69,14 @@ cloudinary.config(
 
 
 class Config:
+    # Signs session tokens. Set it in .env: the random fallback changes on every
+    # restart and differs between worker processes.
+    SECRET_KEY = os.getenv("SECRET_KEY") or secrets.token_hex(32)
+    SESSION_TOKEN_MAX_AGE = int(os.getenv("SESSION_TOKEN_MAX_AGE", 12 * 60 * 60)) # seconds
+    SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 10000)) # verified tokens kept in memory
+    SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", 60)) # seconds before a cached token is re-checked for revocation
+    AUTH_REQUIRED = os.getenv("AUTH_REQUIRED", 'False') == 'True' # reject protected requests that carry no token
+
     MAIL_SERVER = os.getenv("MAIL_SERVER")  # e.g., sandbox.smtp.mailtrap.io
     MAIL_PORT = int(os.getenv("MAIL_PORT", 2525)) # Default to Mailtrap's common port
     MAIL_USERNAME = os.getenv("MAIL_USERNAME")
@@ -32,6 +84,55 @@ class Config:
     MAIL_USE_TLS = os.getenv("MAIL_USE_TLS", 'True') == 'True' # True by default
     MAIL_USE_SSL = os.getenv("MAIL_USE_SSL", 'False') == 'True' # False by default
 
+    # Background mail delivery (see mail_queue.py)
+    MAIL_QUEUE_WORKERS = int(os.getenv("MAIL_QUEUE_WORKERS", 2)) # each keeps one SMTP connection open
+    MAIL_QUEUE_SIZE = int(os.getenv("MAIL_QUEUE_SIZE", 1000))
+    MAIL_QUEUE_BATCH_SIZE = int(os.getenv("MAIL_QUEUE_BATCH_SIZE", 20))
+    MAIL_QUEUE_MAX_ATTEMPTS = int(os.getenv("MAIL_QUEUE_MAX_ATTEMPTS", 5))
+    MAIL_QUEUE_BACKOFF = float(os.getenv("MAIL_QUEUE_BACKOFF", 2.0)) # seconds, doubled per attempt
+    MAIL_QUEUE_IDLE_TIMEOUT = float(os.getenv("MAIL_QUEUE_IDLE_TIMEOUT", 30.0)) # seconds before an idle SMTP connection is closed
+    MAIL_DEAD_LETTER_PATH = os.getenv("MAIL_DEAD_LETTER_PATH") # JSON lines file for undeliverable mail
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", 'False') == 'True' # in-memory search index, off by default
+    SEARCH_INDEX_CHECK_INTERVAL = float(os.getenv("SEARCH_INDEX_CHECK_INTERVAL", 5.0)) # seconds between table_versions checks
+    SEARCH_INDEX_MAX_AGE = float(os.getenv("SEARCH_INDEX_MAX_AGE", 300.0)) # seconds before a full reload without table_versions
+
+    # GET response cache (see response_cache.py)
+    RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", 'True') == 'True'
+    RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory") # memory or redis
+    RESPONSE_CACHE_REDIS_URL = os.getenv("RESPONSE_CACHE_REDIS_URL", "redis://localhost:6379/0")
+    RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 60)) # seconds
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1024))
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+    # Structured logging (see logs.py)
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "") # per-logger levels, e.g. "students.routes=DEBUG,db=WARNING"
+    LOG_SAMPLING = os.getenv("LOG_SAMPLING", "access=0.1") # share of INFO/DEBUG records kept per logger
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000)) # records waiting for the writer thread; more are dropped
+
+    # Slow-query log at /api/slow_queries (see slow_queries.py)
+    SLOW_QUERY_ENABLED = os.getenv("SLOW_QUERY_ENABLED", 'True') == 'True'
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200)) # statements at least this slow are logged
+    SLOW_QUERY_EXPLAIN_SAMPLE = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE", 0.1)) # share of slow statements re-run under EXPLAIN
+    SLOW_QUERY_EXPLAIN_TIMEOUT_MS = int(os.getenv("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 10000))
+    SLOW_QUERY_KEEP = int(os.getenv("SLOW_QUERY_KEEP", 200)) # recent slow statements kept for the admin endpoint
+
+    # JSON encoding (see json_provider.py)
+    JSON_PROVIDER = os.getenv("JSON_PROVIDER", "auto") # orjson when installed, else Flask's; or "orjson" / "stdlib"
+    JSON_DATETIME_FORMAT = os.getenv("JSON_DATETIME_FORMAT", "http") # http ("Wed, 01 Jan 2020 00:00:00 GMT") or iso
+
+    # Response compression (see compression.py)
+    COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", 'True') == 'True'
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024)) # bytes; smaller bodies are sent as they are
+    COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 4)) # 0-11; above ~5 costs more CPU than it saves bytes
+    COMPRESSION_STREAMS = os.getenv("COMPRESSION_STREAMS", 'True') == 'True' # also compress ?stream= and export bodies
+
+    # Prometheus metrics at /api/metrics (see metrics.py)
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", 'True') == 'True'
+    METRICS_DIR = os.getenv("METRICS_DIR") # shared snapshot directory, needed with more than one worker
+    METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5.0)) # seconds between worker snapshots
+
 
 DB_CONFIG = {
     "host": os.getenv("DATABASE_HOST"),
@@ -0,0 +1,152 @@
+import threading
+import time
+
+from flask import g
+from psycopg2 import errors
+
+import prepared
+from config import COUNT_CACHE_TTL
+from invalidation import on_tables_changed
+
+
+COUNTED_TABLES = ("students", "programs", "colleges")
+
+COUNT_MODES = ("exact", "estimate")
+
+
+class CountModeError(ValueError):
+    """Unknown ?mode= value (reported as a 400)."""
+
+
+#============================ QUERIES ============================#
+
+# One round trip for all three tables, whichever source is used
+EXACT_COUNTS_SQL = prepared.register("""
+    SELECT (SELECT COUNT(*) FROM students) AS students,
+           (SELECT COUNT(*) FROM programs) AS programs,
+           (SELECT COUNT(*) FROM colleges) AS colleges;
+""")
+
+SUMMARY_COUNTS_SQL = prepared.register("SELECT tablename, n FROM table_counts;")
+
+# Planner statistics; refreshed by (auto)vacuum/analyze, -1 if never analyzed
+ESTIMATE_COUNTS_SQL = """
+    SELECT relname, GREATEST(reltuples, 0)::BIGINT
+    FROM pg_class
+    WHERE relkind = 'r' AND relname IN ('students', 'programs', 'colleges')
+      AND relnamespace = 'public'::regnamespace;
+"""
+
+# Colleges belong to a user; programs and students through their college
+USER_COUNTS_SQL = """
+    SELECT (SELECT COUNT(*) FROM colleges c
+            WHERE c.userid = %(userid)s) AS colleges,
+           (SELECT COUNT(*) FROM programs p
+            JOIN colleges c ON c.collegecode = p.collegecode
+            WHERE c.userid = %(userid)s) AS programs,
+           (SELECT COUNT(*) FROM students s
+            JOIN programs p ON p.programcode = s.programcode
+            JOIN colleges c ON c.collegecode = p.collegecode
+            WHERE c.userid = %(userid)s) AS students;
+"""
+
+
+#============================ CACHE ============================#
+
+class CountCache:
+    """Small TTL cache for count results, cleared on any write.
+
+    Writes from other processes are only picked up once the TTL runs out.
+    """
+
+    def __init__(self, ttl=30):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            now = time.monotonic()
+            if len(self._entries) >= 256:
+                self._entries = {k: e for k, e in self._entries.items() if e[0] >= now}
+            self._entries[key] = (now + self.ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+count_cache = CountCache(ttl=COUNT_CACHE_TTL)
+_summary_available = True
+
+
+@on_tables_changed
+def _invalidate_counts(tables):
+    if tables & set(COUNTED_TABLES):
+        count_cache.clear()
+
+
+def _overall_counts(conn, mode):
+    global _summary_available
+    cur = conn.cursor()
+    try:
+        if mode == "estimate":
+            cur.execute(ESTIMATE_COUNTS_SQL)
+            return {table: 0 for table in COUNTED_TABLES} | dict(cur.fetchall())
+
+        if _summary_available:
+            try:
+                prepared.execute(cur, SUMMARY_COUNTS_SQL)
+                counts = dict(cur.fetchall())
+                if all(table in counts for table in COUNTED_TABLES):
+                    return {table: counts[table] for table in COUNTED_TABLES}
+            except errors.UndefinedTable:
+                # migrations/0002_table_counts.sql not applied yet
+                conn.rollback()
+                _summary_available = False
+
+        prepared.execute(cur, EXACT_COUNTS_SQL)
+        students, programs, colleges = cur.fetchone()
+        return {"students": students, "programs": programs, "colleges": colleges}
+    finally:
+        cur.close()
+
+
+def get_counts(conn, mode="exact", userid=None):
+    """Return {"overall": {...}} plus {"user": {...}} when `userid` is given."""
+    if mode not in COUNT_MODES:
+        raise CountModeError(f"mode must be one of: {', '.join(COUNT_MODES)}")
+
+    result = {"mode": mode}
+
+    # Under @conditional the entries are keyed on the table versions, so a
+    # write made by another process is never answered from this cache
+    versions = g.get("table_versions")
+    stamp = tuple(sorted((t, v[0]) for t, v in versions.items())) if versions else None
+
+    overall = count_cache.get(("overall", mode, stamp))
+    if overall is None:
+        overall = _overall_counts(conn, mode)
+        count_cache.set(("overall", mode, stamp), overall)
+    result["overall"] = overall
+
+    if userid is not None:
+        user = count_cache.get(("user", userid, stamp))
+        if user is None:
+            cur = conn.cursor()
+            cur.execute(USER_COUNTS_SQL, {"userid": userid})
+            colleges, programs, students = cur.fetchone()
+            cur.close()
+            user = {"students": students, "programs": programs, "colleges": colleges}
+            count_cache.set(("user", userid, stamp), user)
+        result["userid"] = userid
+        result["user"] = user
+
+    return result
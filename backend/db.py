@@ -0,0 +1,465 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import psycopg2
+from flask import g
+
+from config import SupabaseConfig, PoolConfig
+
+
+log = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+#============================ STATEMENT HOOKS ============================#
+# Every connection the pool opens hands out cursors that time their
+# statements and report them here, whatever cursor_factory the route asks
+# for (RealDictCursor, named cursors, execute_values, COPY). Metrics and the
+# slow-query log register listeners instead of wrapping each call site.
+
+_query_listeners = []
+_connect_listeners = []
+
+
+def on_query(listener):
+    """Register `listener(cursor, query, params, elapsed)`; usable as a decorator."""
+    _query_listeners.append(listener)
+    return listener
+
+
+def on_connect(listener):
+    """Register `listener(conn, elapsed)`, called after the pool opens a connection."""
+    _connect_listeners.append(listener)
+    return listener
+
+
+_reporting = threading.local()
+
+
+@contextmanager
+def report_as(query, params):
+    """Show the statements run inside to on_query listeners as `query`/`params`.
+
+    Used for EXECUTE of a prepared statement, so listeners see (and the
+    slow-query log EXPLAINs) the SQL behind it rather than its name.
+    """
+    _reporting.statement = (query, params)
+    try:
+        yield
+    finally:
+        _reporting.statement = None
+
+
+class _TimedCursor:
+    """Mixin timing execute/executemany/copy_expert on any psycopg2 cursor class."""
+
+    def _timed(self, method, query, params, *args):
+        started = time.perf_counter()
+        try:
+            return method(query, params, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            reported = getattr(_reporting, "statement", None)
+            if reported is not None:
+                query, params = reported
+            for listener in _query_listeners:
+                try:
+                    listener(self, query, params, elapsed)
+                except Exception:
+                    pass  # instrumentation must never fail the query
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+
+_timed_classes = {}
+
+
+def _timed_cursor_class(factory):
+    cls = _timed_classes.get(factory)
+    if cls is None:
+        cls = _timed_classes[factory] = type("Timed" + factory.__name__, (_TimedCursor, factory), {})
+    return cls
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get("cursor_factory") or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs["cursor_factory"] = _timed_cursor_class(factory)
+        return super().cursor(*args, **kwargs)
+
+
+#============================ POOLED CONNECTION ============================#
+
+class PooledConnection:
+    """Thin proxy around a psycopg2 connection.
+
+    Everything is forwarded to the real connection except close(), which hands
+    the connection back to the pool instead of tearing down the socket. That
+    keeps the existing `conn = get_db_connection() ... conn.close()` pattern in
+    the blueprints working unchanged.
+    """
+
+    def __init__(self, pool, raw, created_at):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Same semantics as `with psycopg2_conn:`, plus returning it to the pool
+        if not self._raw.closed:
+            if exc_type is None:
+                self._raw.commit()
+            else:
+                self._raw.rollback()
+        self.close()
+        return False
+
+    @property
+    def raw(self):
+        return self._raw
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw, self._created_at)
+
+    def discard(self):
+        # Drop the underlying connection instead of returning it to the pool
+        if self._released:
+            return
+        self._released = True
+        self._pool._release(self._raw, self._created_at, discard=True)
+
+
+#============================ CONNECTION POOL ============================#
+
+class ConnectionPool:
+    """Thread-safe psycopg2 connection pool.
+
+    - keeps between `minconn` and `maxconn` connections open
+    - checks idle connections with `SELECT 1` before handing them out
+      (only when they sat idle longer than `health_check_after` seconds)
+    - recycles connections older than `max_lifetime` seconds
+    - raises PoolTimeout when the pool stays exhausted for `timeout` seconds
+    """
+
+    def __init__(self, connect_kwargs, minconn=1, maxconn=10, max_lifetime=1800,
+                 timeout=10, health_check_after=30, connect=psycopg2.connect):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Invalid pool size: min=%s max=%s" % (minconn, maxconn))
+
+        self.connect_kwargs = dict(connect_kwargs)
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._connect = connect
+
+        self._lock = threading.Condition(threading.Lock())
+        self._idle = deque()      # (conn, created_at, last_used)
+        self._size = 0            # open connections, idle + in use
+        self._in_use = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            "checkouts": 0,
+            "connects": 0,
+            "connect_time": 0.0,
+            "recycled": 0,
+            "failed_health_checks": 0,
+            "timeouts": 0,
+            "wait_time": 0.0,
+            "max_wait_time": 0.0,
+        }
+
+    # -- opening / closing raw connections --
+
+    def _open(self):
+        started = time.perf_counter()
+        conn = self._connect(**self.connect_kwargs)
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._stats["connects"] += 1
+            self._stats["connect_time"] += elapsed
+        try:
+            for listener in _connect_listeners:
+                listener(conn, elapsed)
+        except Exception:
+            # The session may be half set up (e.g. some statements prepared,
+            # or an aborted transaction); don't let it into the pool
+            self._close_quietly(conn)
+            raise
+        return conn
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _expired(self, created_at, now):
+        return self.max_lifetime and now - created_at > self.max_lifetime
+
+    def _healthy(self, conn, last_used, now):
+        if conn.closed:
+            return False
+        if now - last_used < self.health_check_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def warm(self):
+        """Open connections until the pool holds at least `minconn`."""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.minconn:
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._size -= 1
+                    self._lock.notify()
+                raise
+            now = time.monotonic()
+            with self._lock:
+                self._idle.append((conn, now, now))
+                self._lock.notify()
+
+    # -- checkout / release --
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            conn = None
+            must_open = False
+
+            with self._lock:
+                if self._closed:
+                    raise PoolTimeout("Connection pool is closed")
+
+                while not self._idle and self._size >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            "Timed out after %.1fs waiting for a database connection "
+                            "(pool size %d)" % (timeout, self.maxconn)
+                        )
+                    self._waiting += 1
+                    try:
+                        self._lock.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, created_at, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    must_open = True
+                self._in_use += 1
+
+            now = time.monotonic()
+            if must_open:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._lock.notify()
+                    raise
+                created_at = now
+            elif self._expired(created_at, now) or not self._healthy(conn, last_used, now):
+                # Stale or broken connection: throw it away and try again
+                with self._lock:
+                    if self._expired(created_at, now):
+                        self._stats["recycled"] += 1
+                    else:
+                        self._stats["failed_health_checks"] += 1
+                    self._size -= 1
+                    self._in_use -= 1
+                    self._lock.notify()
+                self._close_quietly(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._lock:
+                self._stats["checkouts"] += 1
+                self._stats["wait_time"] += waited
+                if waited > self._stats["max_wait_time"]:
+                    self._stats["max_wait_time"] = waited
+            return PooledConnection(self, conn, created_at)
+
+    def _release(self, conn, created_at, discard=False):
+        now = time.monotonic()
+        if not discard and not conn.closed:
+            try:
+                # Never hand out a connection with an open transaction
+                if conn.status != psycopg2.extensions.STATUS_READY:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        expired = not discard and not conn.closed and self._expired(created_at, now)
+        if conn.closed or expired:
+            discard = True
+
+        with self._lock:
+            self._in_use -= 1
+            if discard or self._closed:
+                self._size -= 1
+                if expired:
+                    self._stats["recycled"] += 1
+            else:
+                self._idle.append((conn, created_at, now))
+            self._lock.notify()
+
+        if discard or self._closed:
+            self._close_quietly(conn)
+
+    def closeall(self):
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for conn, _, _ in idle:
+            self._close_quietly(conn)
+
+    # -- introspection --
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            checkouts = stats["checkouts"]
+            stats.update({
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "minconn": self.minconn,
+                "maxconn": self.maxconn,
+                "avg_wait_time": stats["wait_time"] / checkouts if checkouts else 0.0,
+            })
+        return stats
+
+
+#============================ APP-WIDE POOL ============================#
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use.
+
+    The pool remembers the pid it was created in, so a forked worker never
+    reuses sockets inherited from its parent.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = ConnectionPool(
+                dict(SupabaseConfig, connection_factory=InstrumentedConnection), **PoolConfig
+            )
+            _pool_pid = pid
+    return _pool
+
+
+def warm_pool():
+    """Open this process's `minconn` connections up front.
+
+    Called from the server's post-fork hook so a new worker does not pay
+    for connection setup on its first requests.
+    """
+    pool = get_pool()
+    pool.warm()
+    return pool
+
+
+def check_database(timeout):
+    """Run SELECT 1 on a pooled connection; raises if the database is unreachable."""
+    conn = get_pool().getconn(timeout=timeout)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT 1;")
+        cur.fetchone()
+        cur.close()
+    except Exception:
+        conn.discard()
+        raise
+    conn.close()
+
+
+def get_db_connection():
+    """Check a connection out of the shared pool.
+
+    Calling close() on the result returns it to the pool. Connections still
+    checked out when the request ends are released by the teardown handler.
+    """
+    try:
+        conn = get_pool().getconn()
+    except Exception as e:
+        log.error("Database connection failed: %s", e)
+        raise
+
+    try:
+        g.setdefault("_db_connections", []).append(conn)
+    except RuntimeError:
+        # Outside of an app context (CLI scripts, benchmarks)
+        pass
+    return conn
+
+
+def _release_request_connections(exc=None):
+    # Routes that bail out early (or raise) without closing still give back
+    # their connection; close() is a no-op for ones already returned.
+    for conn in g.pop("_db_connections", []):
+        conn.close()
+
+
+def init_app(app):
+    app.teardown_appcontext(_release_request_connections)
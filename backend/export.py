@@ -0,0 +1,313 @@
+import logging
+import queue
+import threading
+import time
+import zlib
+
+from flask import Response
+
+from db import get_pool
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # optional, only needed for the columnar formats
+    pa = None
+
+
+log = logging.getLogger(__name__)
+
+
+class ExportError(ValueError):
+    """Bad export parameters (reported as a 400)."""
+
+
+# Exportable columns per table, with the Arrow type used for columnar output.
+# Filters map a query parameter to the SQL that applies it.
+EXPORT_SPECS = {
+    "students": {
+        "columns": {
+            "idnum": "string", "firstname": "string", "lastname": "string", "sex": "string",
+            "yearlevel": "int32", "programcode": "string", "profile": "string", "created_on": "timestamp",
+        },
+        "filters": {
+            "programcode": "programcode = %s",
+            "collegecode": "programcode IN (SELECT programcode FROM programs WHERE collegecode = %s)",
+        },
+    },
+    "programs": {
+        "columns": {
+            "programcode": "string", "programname": "string", "collegecode": "string", "created_on": "timestamp",
+        },
+        "filters": {
+            "programcode": "programcode = %s",
+            "collegecode": "collegecode = %s",
+        },
+    },
+    "colleges": {
+        "columns": {
+            "collegecode": "string", "collegename": "string", "userid": "int32", "created_on": "timestamp",
+        },
+        "filters": {
+            "collegecode": "collegecode = %s",
+        },
+    },
+}
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+CHUNK_QUEUE_SIZE = 64     # COPY chunks buffered between the DB and the client
+CANCEL_TIMEOUT = 5.0      # seconds cancel() waits for the COPY worker to stop
+ARROW_BLOCK_SIZE = 1 << 20
+
+
+#============================ REQUEST PARSING ============================#
+
+def parse_export_args(table, args):
+    spec = EXPORT_SPECS[table]
+
+    fmt = args.get("format", "csv").lower()
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+    if fmt != "csv" and pa is None:
+        raise ExportError(f"format '{fmt}' needs pyarrow, which is not installed")
+
+    columns = list(spec["columns"])
+    if args.get("columns"):
+        columns = [c.strip() for c in args["columns"].split(",") if c.strip()]
+        unknown = [c for c in columns if c not in spec["columns"]]
+        if unknown or not columns:
+            raise ExportError(f"Unknown columns: {', '.join(unknown) or '(none given)'}")
+
+    filters = {name: args[name] for name in spec["filters"] if args.get(name)}
+    gzip = args.get("gzip", "").lower() in ("1", "true", "yes")
+    if gzip and fmt != "csv":
+        raise ExportError("gzip is only supported for csv")
+
+    return fmt, columns, filters, gzip
+
+
+def build_copy_sql(cur, table, columns, filters):
+    spec = EXPORT_SPECS[table]
+    where = [spec["filters"][name] for name in filters]
+    select = f"SELECT {', '.join(columns)} FROM {table}"
+    if where:
+        select += " WHERE " + " AND ".join(where)
+    # COPY can't take bind parameters, so let psycopg2 quote them inline
+    select = cur.mogrify(select, tuple(filters.values())).decode()
+    return f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)"
+
+
+#============================ COPY PIPE ============================#
+
+class _ExportCancelled(Exception):
+    pass
+
+
+class _CopyPipe:
+    """Runs COPY ... TO STDOUT on a worker thread and hands chunks over.
+
+    psycopg2 only offers COPY into a file object; this object is that file
+    for the worker thread, and an iterator of byte chunks for the response.
+    The bounded queue keeps a slow client from buffering the whole table.
+    """
+
+    _DONE = object()
+
+    def __init__(self, table, columns, filters):
+        self._args = (table, columns, filters)
+        self._queue = queue.Queue(maxsize=CHUNK_QUEUE_SIZE)
+        self._cancelled = threading.Event()
+        # Held while the worker gives its connection back, so cancel() never
+        # signals a connection that already serves another request
+        self._lock = threading.Lock()
+        self._finished = False
+        self._conn = get_pool().getconn()
+        self._thread = threading.Thread(target=self._run, name="copy-export", daemon=True)
+        self._thread.start()
+
+    # file interface, used by copy_expert on the worker thread
+    def write(self, data):
+        self._put(bytes(data) if not isinstance(data, bytes) else data)
+
+    def _put(self, item):
+        # Never block for good: nobody drains the queue once cancel() gives up
+        while True:
+            if self._cancelled.is_set():
+                raise _ExportCancelled()
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def _run(self):
+        try:
+            cur = self._conn.cursor()
+            cur.copy_expert(build_copy_sql(cur, *self._args), self)
+            cur.close()
+            with self._lock:
+                self._finished = True
+                self._conn.close()
+            result = self._DONE
+        except Exception as e:
+            # A COPY aborted half way leaves the session in an unknown state
+            with self._lock:
+                self._finished = True
+                self._conn.discard()
+            result = e
+        try:
+            self._put(result)
+        except _ExportCancelled:
+            pass
+
+    def __iter__(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._DONE:
+                    return
+                if isinstance(item, Exception):
+                    if not isinstance(item, _ExportCancelled):
+                        raise item
+                    return
+                yield item
+        finally:
+            self.cancel()
+
+    def cancel(self):
+        self._cancelled.set()
+        with self._lock:
+            if not self._finished:
+                # Stop the COPY on the server instead of waiting for it to
+                # produce (and us to discard) the rest of the table
+                try:
+                    self._conn.raw.cancel()
+                except Exception as e:
+                    log.warning("Could not cancel export COPY: %s", e)
+
+        # Unblock a worker waiting on a full queue
+        deadline = time.monotonic() + CANCEL_TIMEOUT
+        while self._thread.is_alive():
+            if time.monotonic() >= deadline:
+                log.warning("Export worker still running %.0fs after cancel", CANCEL_TIMEOUT)
+                return
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                self._thread.join(0.05)
+
+    def read(self, size=-1):
+        # file interface for pyarrow's CSV reader
+        if not hasattr(self, "_chunks"):
+            self._chunks = iter(self)
+            self._buffer = bytearray()
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    @property
+    def closed(self):
+        return False
+
+    def readable(self):
+        return True
+
+
+#============================ ENCODERS ============================#
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+class _Sink:
+    # Collects what pyarrow writes so it can be yielded chunk by chunk
+    def __init__(self):
+        self.parts = []
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def _arrow_types(table, columns):
+    mapping = {"string": pa.string(), "int32": pa.int32(), "timestamp": pa.timestamp("us")}
+    spec = EXPORT_SPECS[table]["columns"]
+    return {col: mapping[spec[col]] for col in columns}
+
+
+def _columnar(pipe, table, columns, fmt):
+    reader = pa_csv.open_csv(
+        pipe,
+        read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+        convert_options=pa_csv.ConvertOptions(
+            column_types=_arrow_types(table, columns),
+            # COPY writes NULL as an empty unquoted field and '' as ""
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+    sink = _Sink()
+    if fmt == "arrow":
+        writer = pa.ipc.new_stream(sink, reader.schema)
+    else:
+        writer = pq.ParquetWriter(sink, reader.schema)
+
+    try:
+        for batch in reader:
+            if fmt == "arrow":
+                writer.write_batch(batch)
+            else:
+                writer.write_table(pa.Table.from_batches([batch]))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+        pipe.cancel()
+    yield sink.drain()
+
+
+def export_response(table, fmt, columns, filters, gzip=False):
+    """Stream `table` as csv (optionally gzip), Arrow IPC or Parquet."""
+    pipe = _CopyPipe(table, columns, filters)
+    if fmt == "csv":
+        body = _gzip(iter(pipe)) if gzip else iter(pipe)
+    else:
+        body = _columnar(pipe, table, columns, fmt)
+
+    mimetype, extension = EXPORT_FORMATS[fmt]
+    filename = f"{table}.{extension}" + (".gz" if gzip else "")
+    response = Response(body, mimetype="application/gzip" if gzip else mimetype)
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.call_on_close(pipe.cancel)
+    return response
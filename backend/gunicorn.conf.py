@@ -0,0 +1,64 @@
+"""Production server settings.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Pre-forked workers (2 x cores + 1 by default), each with its own
+connection pool opened right after the fork. `kill -HUP <master pid>`
+reloads the code: new workers are started and warmed, old ones finish
+their in-flight requests within `graceful_timeout`. Workers are also
+recycled after `max_requests` (plus jitter) to bound memory growth.
+
+Every setting comes from ServerConfig in config.py, so SERVER_* variables
+in .env override them. Point load balancer health checks at
+/api/health/ready and process supervisors at /api/health/live.
+"""
+from config import ServerConfig
+
+bind = ServerConfig["bind"]
+workers = ServerConfig["workers"]
+worker_class = "gthread"
+threads = ServerConfig["threads"]
+timeout = ServerConfig["timeout"]
+graceful_timeout = ServerConfig["graceful_timeout"]
+max_requests = ServerConfig["max_requests"]
+max_requests_jitter = ServerConfig["max_requests_jitter"]
+
+# No preload_app: each worker imports the app itself, so `kill -HUP` brings
+# up workers running the new code. The db pool, bcrypt pool, mail workers
+# and search index start lazily per pid either way.
+
+# Requests are logged by the app itself (logs.py, "access" logger)
+accesslog = None
+errorlog = "-"
+
+
+def on_starting(server):
+    # Snapshots left by a previous run would be added to this one's counters
+    from config import Config
+    from metrics import clear_snapshots
+
+    if Config.METRICS_DIR:
+        clear_snapshots(Config.METRICS_DIR)
+
+
+def post_fork(server, worker):
+    import db
+
+    try:
+        db.warm_pool()
+    except Exception as e:
+        # Keep the worker: /api/health/ready reports 503 until the database answers
+        server.log.warning("Worker %s could not warm its connection pool: %s", worker.pid, e)
+    else:
+        server.log.info("Worker %s warmed its connection pool", worker.pid)
+
+
+def worker_exit(server, worker):
+    import db
+    from metrics import metrics
+
+    try:
+        metrics.flush()  # keep this worker's counts in the totals
+    except OSError as e:
+        server.log.warning("Worker %s could not write its metrics snapshot: %s", worker.pid, e)
+    db.get_pool().closeall()
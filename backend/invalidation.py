@@ -0,0 +1,20 @@
+# Write notifications shared by every cache in the app.
+#
+# The blueprints call tables_changed() after a successful commit with every
+# table the statement touched, cascades included (e.g. delete_program nulls
+# students.programcode, so it reports "programs" and "students"). Caches
+# register a listener instead of being called from each route.
+
+_listeners = []
+
+
+def on_tables_changed(listener):
+    """Register `listener(tables)`; usable as a decorator."""
+    _listeners.append(listener)
+    return listener
+
+
+def tables_changed(*tables):
+    changed = frozenset(tables)
+    for listener in _listeners:
+        listener(changed)
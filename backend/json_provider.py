@@ -0,0 +1,106 @@
+from datetime import date, datetime, timezone
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, Flask's json provider is used without it
+    orjson = None
+
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _http_default(o):
+    # Same text as werkzeug's http_date (naive values are taken as UTC), at a
+    # fraction of the cost: it runs once per created_on in a list response
+    if isinstance(o, date):
+        if not isinstance(o, datetime):
+            o = datetime(o.year, o.month, o.day)
+        elif o.tzinfo is not None:
+            o = o.astimezone(timezone.utc)
+        return (f"{_DAYS[o.weekday()]}, {o.day:02d} {_MONTHS[o.month - 1]} {o.year:04d} "
+                f"{o.hour:02d}:{o.minute:02d}:{o.second:02d} GMT")
+    return DefaultJSONProvider.default(o)
+
+
+def _iso_default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Flask's provider with a cheaper RFC 822 date encoder, or ISO 8601 dates."""
+
+    def __init__(self, app):
+        super().__init__(app)
+        if app.config.get("JSON_DATETIME_FORMAT") == "iso":
+            self.default = _iso_default
+        else:
+            self.default = _http_default
+
+
+class OrjsonProvider(StdlibJSONProvider):
+    """orjson for dumps and loads, with the same output as Flask's provider.
+
+    Keys are sorted and created_on is sent in the configured format ("http",
+    Flask's RFC 822 dates, or "iso"), Decimal and UUID as strings, so
+    switching providers changes nothing on the wire except that non-ASCII
+    text is sent as UTF-8 instead of \\u escapes. response() hands the bytes
+    straight to the response without a str round trip. Anything orjson
+    refuses (e.g. integers beyond 64 bits) goes through Flask's encoder.
+    """
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            self.option |= orjson.OPT_SORT_KEYS
+        if app.config.get("JSON_DATETIME_FORMAT") != "iso":
+            # orjson writes ISO 8601 itself; hand dates to `default` instead
+            self.option |= orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _dumpb(self, obj, option=0):
+        try:
+            return orjson.dumps(obj, default=self.default, option=self.option | option)
+        except orjson.JSONEncodeError:
+            return None
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            encoded = self._dumpb(obj)
+            if encoded is not None:
+                return encoded.decode("utf-8")
+        return super().dumps(obj, **kwargs)
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = (self.compact is None and self._app.debug) or self.compact is False
+        encoded = self._dumpb(obj, orjson.OPT_INDENT_2 if pretty else 0)
+        if encoded is None:
+            return super().response(obj)
+        return self._app.response_class(encoded + b"\n", mimetype=self.mimetype)
+
+
+PROVIDERS = {
+    "orjson": OrjsonProvider,
+    "stdlib": StdlibJSONProvider,
+}
+
+
+def init_app(app):
+    name = app.config.get("JSON_PROVIDER", "auto")
+    if name == "auto":
+        name = "orjson" if orjson is not None else "stdlib"
+    if name not in PROVIDERS:
+        raise ValueError(f"JSON_PROVIDER must be one of: auto, {', '.join(PROVIDERS)}")
+    if name == "orjson" and orjson is None:
+        raise RuntimeError("JSON_PROVIDER=orjson needs the orjson package, which is not installed")
+    app.json = PROVIDERS[name](app)
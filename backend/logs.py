@@ -0,0 +1,213 @@
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+from flask import g, has_request_context, request
+
+
+# Attributes every LogRecord has; anything else was passed through `extra=`
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# Longest value written for a single field, so a stray result set or request
+# body can never end up serialised into the log
+MAX_FIELD_LENGTH = 1000
+
+
+def _clip(value):
+    if isinstance(value, (bool, int, float)) or value is None:
+        return value
+    text = value if isinstance(value, str) else repr(value)
+    if len(text) > MAX_FIELD_LENGTH:
+        return text[:MAX_FIELD_LENGTH] + f"... ({len(text)} chars)"
+    return text
+
+
+#============================ FORMAT ============================#
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": _clip(record.getMessage()),
+            "pid": record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                entry[key] = _clip(value)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+#============================ FILTERS ============================#
+
+class RequestContextFilter(logging.Filter):
+    """Stamp records made while handling a request with its method and route."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.method = request.method
+            record.path = request.path
+            if getattr(g, "userid", None) is not None:
+                record.userid = g.userid
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of the records of high-frequency loggers.
+
+    `rates` maps a logger name to the share of records kept (children
+    included). Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._cache = {}
+
+    def _rate(self, name):
+        rate = self._cache.get(name)
+        if rate is None:
+            rate, parts = 1.0, name.split(".")
+            for i in range(len(parts), 0, -1):
+                prefix = ".".join(parts[:i])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        if rate >= 1.0:
+            return True
+        if rate > 0 and random.random() < rate:
+            record.sample_rate = rate
+            return True
+        return False
+
+
+#============================ QUEUE HANDLER ============================#
+
+class BackgroundHandler(logging.Handler):
+    """Hands records to a writer thread; the caller never waits on I/O.
+
+    The message and any traceback are rendered in the calling thread (they
+    may reference objects that change later); JSON encoding and the write
+    happen on the writer thread. When the queue is full the record is
+    dropped and counted rather than blocking the request. Like the other
+    background workers the thread is started per pid, so forked workers
+    get their own.
+    """
+
+    def __init__(self, target, maxsize=10000):
+        super().__init__()
+        self.target = target
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._queue = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._start_lock:
+            if self._pid == pid:
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            threading.Thread(target=self._write_loop, args=(self._queue,), name="log-writer", daemon=True).start()
+            self._pid = pid
+
+    def _write_loop(self, records):
+        while True:
+            record = records.get()
+            try:
+                self.target.handle(record)
+            except Exception:
+                self.target.handleError(record)
+
+    def emit(self, record):
+        self._ensure_started()
+        try:
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+                record.exc_info = None
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        # Best effort on shutdown: give the writer a moment to drain
+        deadline = time.monotonic() + 1.0
+        while self._queue is not None and not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+
+#============================ SETUP ============================#
+
+def _parse_pairs(spec, convert):
+    # "students.routes=DEBUG,db=WARNING" -> {"students.routes": "DEBUG", "db": "WARNING"}
+    pairs = {}
+    for item in filter(None, (part.strip() for part in (spec or "").split(","))):
+        name, _, value = item.partition("=")
+        pairs[name.strip()] = convert(value.strip())
+    return pairs
+
+
+background_handler = None
+
+
+def init_app(app):
+    """Route every logger (ours, Flask's, libraries') through the background JSON handler."""
+    global background_handler
+
+    stream = logging.StreamHandler(sys.stdout)
+    stream.setFormatter(JsonFormatter())
+
+    background_handler = BackgroundHandler(stream, maxsize=app.config.get("LOG_QUEUE_SIZE", 10000))
+    # Sample first so dropped records cost as little as possible
+    background_handler.addFilter(SamplingFilter(_parse_pairs(app.config.get("LOG_SAMPLING"), float)))
+    background_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [background_handler]
+    root.setLevel(app.config.get("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_pairs(app.config.get("LOG_LEVELS"), str.upper).items():
+        logging.getLogger(name).setLevel(level)
+
+    # Flask's own handler would print tracebacks a second time
+    app.logger.handlers.clear()
+    app.logger.propagate = True
+
+    app.after_request(_log_request)
+
+
+_access_log = logging.getLogger("access")
+
+
+def _log_request(response):
+    # One line per request on the "access" logger, sampled through LOG_SAMPLING;
+    # server errors are logged as warnings so sampling never drops them
+    level = logging.WARNING if response.status_code >= 500 else logging.INFO
+    _access_log.log(
+        level, "%s %s %s", request.method, request.full_path.rstrip("?"), response.status_code,
+        extra={"status": response.status_code, "bytes": response.content_length},
+    )
+    return response
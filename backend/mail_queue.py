@@ -0,0 +1,190 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+
+log = logging.getLogger(__name__)
+
+
+class MailQueueFull(Exception):
+    """The outgoing queue is at capacity (reported as a 503)."""
+
+
+class _Job:
+    def __init__(self, message):
+        self.message = message
+        self.attempts = 0
+        self.last_error = None
+        self.queued_at = time.time()
+
+
+class MailQueue:
+    """Background mail delivery for Flask-Mail messages.
+
+    enqueue() only puts the message on a bounded queue. A small pool of
+    worker threads each keeps one SMTP connection open, sends whatever has
+    queued up (up to `batch_size` messages) over it, and drops the
+    connection after `idle_timeout` seconds without work. Failed messages
+    are retried with exponential backoff; after `max_attempts` they go to a
+    dead-letter store (kept in memory, and appended to
+    MAIL_DEAD_LETTER_PATH as JSON lines when set).
+
+    To try it locally without a real server, run an SMTP stand-in such as
+    `python -m aiosmtpd -n -l localhost:1025` and set MAIL_SERVER=localhost,
+    MAIL_PORT=1025, MAIL_USE_TLS=False.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.mail = None
+        self._lock = threading.Lock()
+        self._pid = None
+        self._workers = []
+        self._queue = None
+        self.dead_letters = deque(maxlen=1000)
+        self.counters = {"queued": 0, "sent": 0, "retried": 0, "dead": 0, "batches": 0}
+
+    def init_app(self, app, mail):
+        self.app = app
+        self.mail = mail
+        self.workers = app.config.get("MAIL_QUEUE_WORKERS", 2)
+        self.maxsize = app.config.get("MAIL_QUEUE_SIZE", 1000)
+        self.batch_size = app.config.get("MAIL_QUEUE_BATCH_SIZE", 20)
+        self.max_attempts = app.config.get("MAIL_QUEUE_MAX_ATTEMPTS", 5)
+        self.backoff = app.config.get("MAIL_QUEUE_BACKOFF", 2.0)
+        self.idle_timeout = app.config.get("MAIL_QUEUE_IDLE_TIMEOUT", 30.0)
+        self.dead_letter_path = app.config.get("MAIL_DEAD_LETTER_PATH")
+        app.extensions["mail_queue"] = self
+
+    # -- workers --
+
+    def _ensure_started(self):
+        # Started lazily, and again in each forked worker process
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._queue = queue.Queue(maxsize=self.maxsize)
+            self._workers = [
+                threading.Thread(target=self._work, name=f"mail-worker-{i}", daemon=True)
+                for i in range(self.workers)
+            ]
+            for worker in self._workers:
+                worker.start()
+            self._pid = pid
+
+    def _next_batch(self, timeout):
+        batch = [self._queue.get(timeout=timeout)]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _work(self):
+        with self.app.app_context():
+            connection = None
+            while True:
+                try:
+                    batch = self._next_batch(self.idle_timeout if connection else None)
+                except queue.Empty:
+                    # Idle: let the server-side connection go
+                    self._disconnect(connection)
+                    connection = None
+                    continue
+
+                self._count("batches")
+                for job in batch:
+                    job.attempts += 1
+                    try:
+                        if connection is None:
+                            connection = self.mail.connect()
+                            connection.__enter__()
+                        connection.send(job.message)
+                        self._count("sent")
+                    except Exception as e:
+                        job.last_error = str(e)
+                        self._disconnect(connection)
+                        connection = None
+                        self._retry_or_bury(job)
+                    finally:
+                        self._queue.task_done()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @staticmethod
+    def _disconnect(connection):
+        if connection is None:
+            return
+        try:
+            connection.__exit__(None, None, None)
+        except Exception:
+            pass
+
+    def _retry_or_bury(self, job):
+        if job.attempts >= self.max_attempts:
+            self._bury(job)
+            return
+        self._count("retried")
+        delay = self.backoff * (2 ** (job.attempts - 1))
+        timer = threading.Timer(delay, self._requeue, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, job):
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            job.last_error = "Queue full on retry"
+            self._bury(job)
+
+    def _bury(self, job):
+        self._count("dead")
+        record = {
+            "subject": job.message.subject,
+            "recipients": list(job.message.recipients),
+            "attempts": job.attempts,
+            "error": job.last_error,
+            "queued_at": job.queued_at,
+            "failed_at": time.time(),
+        }
+        self.dead_letters.append(record)
+        log.error("Mail moved to dead letters: %s", job.last_error,
+                  extra={"recipients": record["recipients"], "attempts": job.attempts})
+        if self.dead_letter_path:
+            try:
+                with open(self.dead_letter_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+            except OSError as e:
+                log.error("Could not write dead letter: %s", e)
+
+    # -- public API --
+
+    def enqueue(self, message):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(_Job(message))
+        except queue.Full:
+            raise MailQueueFull("Mail queue is full, try again later")
+        self._count("queued")
+
+    def status(self):
+        return {
+            "workers": len(self._workers) if self._pid == os.getpid() else 0,
+            "pending": self._queue.qsize() if self._queue is not None and self._pid == os.getpid() else 0,
+            "maxsize": self.maxsize,
+            **self.counters,
+            "dead_letters": list(self.dead_letters)[-50:],
+        }
+
+
+mail_queue = MailQueue()
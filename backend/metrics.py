@@ -0,0 +1,285 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from bisect import bisect_left
+
+from flask import g, has_request_context, request
+
+import db
+
+
+log = logging.getLogger(__name__)
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+ROW_BUCKETS = (0, 1, 10, 50, 100, 500, 1000, 5000, 10000, 100000)
+BYTE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+#============================ REGISTRY ============================#
+# Counters and histograms keyed by a tuple of label values. One lock for the
+# whole registry: an observation is a dict lookup and a few additions, so
+# contention stays far below the cost of the request being measured.
+
+class Registry:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}        # name -> {"type", "help", "labels", "buckets", "series"}
+
+    def counter(self, name, help, labels=()):
+        return self._add(name, "counter", help, labels, None)
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(name, "histogram", help, labels, tuple(buckets))
+
+    def _add(self, name, kind, help, labels, buckets):
+        self._metrics[name] = {"type": kind, "help": help, "labels": list(labels),
+                               "buckets": buckets, "series": {}}
+        return name
+
+    def inc(self, name, *labels, amount=1):
+        series = self._metrics[name]["series"]
+        with self._lock:
+            series[labels] = series.get(labels, 0) + amount
+
+    def observe(self, name, value, *labels):
+        metric = self._metrics[name]
+        buckets = metric["buckets"]
+        with self._lock:
+            values = metric["series"].get(labels)
+            if values is None:
+                # one slot per bucket (non-cumulative), then sum and count
+                values = metric["series"][labels] = [0] * (len(buckets) + 2)
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                name: {**metric,
+                       "series": [[list(labels), list(v) if isinstance(v, list) else v]
+                                  for labels, v in metric["series"].items()]}
+                for name, metric in self._metrics.items()
+            }
+
+
+def merge_snapshots(snapshots):
+    merged = {}
+    for snapshot in snapshots:
+        for name, metric in snapshot.items():
+            target = merged.setdefault(name, {**metric, "series": {}})
+            for labels, values in metric["series"]:
+                key = tuple(labels)
+                if metric["type"] == "counter":
+                    target["series"][key] = target["series"].get(key, 0) + values
+                else:
+                    current = target["series"].setdefault(key, [0] * len(values))
+                    for i, v in enumerate(values):
+                        current[i] += v
+    return merged
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(names, values, extra=""):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def render(merged):
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name, metric in sorted(merged.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        labels = metric["labels"]
+        for values_key, values in sorted(metric["series"].items()):
+            if metric["type"] == "counter":
+                lines.append(f"{name}{_label_text(labels, values_key)} {values}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric["buckets"], values):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{name}_bucket{_label_text(labels, values_key, le)} {cumulative}")
+            le = 'le="+Inf"'
+            lines.append(f"{name}_bucket{_label_text(labels, values_key, le)} {values[-1]}")
+            lines.append(f"{name}_sum{_label_text(labels, values_key)} {values[-2]}")
+            lines.append(f"{name}_count{_label_text(labels, values_key)} {values[-1]}")
+    return "\n".join(lines) + "\n"
+
+
+#============================ SNAPSHOT FILES ============================#
+
+# "<pid>.json", and the "<pid>.json.tmp" a flush writes first
+_SNAPSHOT_FILE = re.compile(r"^\d+\.json(\.tmp)?$")
+
+
+def clear_snapshots(directory):
+    """Delete the per-worker snapshots in `directory`, creating it if missing.
+
+    Only files named like the ones flush() writes are removed; anything else
+    an operator keeps in METRICS_DIR is left alone.
+    """
+    os.makedirs(directory, exist_ok=True)
+    for name in os.listdir(directory):
+        if _SNAPSHOT_FILE.match(name):
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+#============================ APP METRICS ============================#
+
+class Metrics:
+    """Per-route request and database metrics, served at /api/metrics.
+
+    Each process keeps its own registry. With pre-forked workers set
+    METRICS_DIR: every worker then writes its snapshot there every
+    METRICS_FLUSH_INTERVAL seconds and a scrape, whichever worker answers
+    it, adds up all of them (files of exited workers included, so counters
+    never go backwards).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.directory = None
+        self.flush_interval = 5.0
+        self.registry = Registry()
+        self._flusher_pid = None
+        self._lock = threading.Lock()
+
+        r = self.registry
+        self.requests = r.counter("ssis_http_requests_total", "HTTP requests by route and status code.",
+                                  ("endpoint", "method", "status"))
+        self.latency = r.histogram("ssis_http_request_duration_seconds", "Time to produce the response.",
+                                   ("endpoint", "method"), LATENCY_BUCKETS)
+        self.response_bytes = r.histogram("ssis_http_response_bytes", "Response body size (unstreamed responses).",
+                                          ("endpoint",), BYTE_BUCKETS)
+        self.rows = r.histogram("ssis_http_db_rows", "Rows returned by the database per request.",
+                                ("endpoint",), ROW_BUCKETS)
+        self.request_db_time = r.histogram("ssis_http_db_duration_seconds", "Database time per request.",
+                                           ("endpoint",), LATENCY_BUCKETS)
+        self.query_time = r.histogram("ssis_db_query_duration_seconds", "Duration of single statements.",
+                                      ("endpoint",), QUERY_BUCKETS)
+        self.connect_time = r.histogram("ssis_db_connect_duration_seconds", "Time to open a database connection.",
+                                        (), LATENCY_BUCKETS)
+
+    def init_app(self, app):
+        self.enabled = app.config.get("METRICS_ENABLED", True)
+        self.directory = app.config.get("METRICS_DIR")
+        self.flush_interval = app.config.get("METRICS_FLUSH_INTERVAL", 5.0)
+        if not self.enabled:
+            return
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        db.on_query(self._observe_query)
+        db.on_connect(self._observe_connect)
+
+    # -- hooks --
+
+    @staticmethod
+    def _endpoint():
+        rule = request.url_rule
+        return rule.rule if rule is not None else "<unmatched>"
+
+    def _before_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_rows = 0
+        g._metrics_db_time = 0.0
+
+    def _after_request(self, response):
+        started = g.get("_metrics_started")
+        if started is None:
+            return response
+        endpoint = self._endpoint()
+        r = self.registry
+        r.inc(self.requests, endpoint, request.method, str(response.status_code))
+        r.observe(self.latency, time.perf_counter() - started, endpoint, request.method)
+        r.observe(self.rows, g._metrics_rows, endpoint)
+        r.observe(self.request_db_time, g._metrics_db_time, endpoint)
+        if not response.is_streamed and response.content_length is not None:
+            r.observe(self.response_bytes, response.content_length, endpoint)
+
+        if self.directory:
+            self._ensure_flusher()
+        return response
+
+    def _observe_query(self, cursor, query, params, elapsed):
+        if not has_request_context():
+            self.registry.observe(self.query_time, elapsed, "<background>")
+            return
+        self.registry.observe(self.query_time, elapsed, self._endpoint())
+        if "_metrics_db_time" in g:
+            g._metrics_db_time += elapsed
+            if cursor.description is not None and cursor.rowcount > 0:
+                g._metrics_rows += cursor.rowcount
+
+    def _observe_connect(self, conn, elapsed):
+        self.registry.observe(self.connect_time, elapsed)
+
+    # -- multi-process snapshots --
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def _ensure_flusher(self):
+        pid = os.getpid()
+        if self._flusher_pid == pid:
+            return
+        with self._lock:
+            if self._flusher_pid == pid:
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True).start()
+            self._flusher_pid = pid
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError as e:
+                log.warning("Could not write metrics snapshot: %s", e)
+
+    def flush(self):
+        """Write this process's snapshot to METRICS_DIR (atomically)."""
+        if not self.directory:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(os.getpid())
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp, path)
+
+    def render(self):
+        snapshots = [self.registry.snapshot()]
+        if self.directory and os.path.isdir(self.directory):
+            own = f"{os.getpid()}.json"
+            for name in os.listdir(self.directory):
+                if not name.endswith(".json") or name == own:
+                    continue
+                try:
+                    with open(os.path.join(self.directory, name)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue  # being replaced right now; picked up on the next scrape
+        return render(merge_snapshots(snapshots))
+
+
+metrics = Metrics()
@@ -0,0 +1,226 @@
+"""Versioned schema migrations from migrations/NNNN_name.sql.
+
+    python migrate.py            apply everything pending
+    python migrate.py status     list applied and pending migrations
+
+Applied versions are recorded in schema_migrations, so every file runs once
+per database. Each file runs in its own transaction unless it contains the
+line `-- migrate: no-transaction` (needed for CREATE INDEX CONCURRENTLY);
+those are run statement by statement and must be safe to re-run, since a
+failure leaves the earlier statements applied. A session advisory lock
+keeps two runners (e.g. two deploys) from applying the same file.
+
+With MIGRATE_ON_STARTUP=True the app runs this itself when it is imported,
+which under gunicorn's preload_app is once, in the master.
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+import sys
+import time
+
+import psycopg2
+
+from config import MigrationConfig, SupabaseConfig
+
+
+log = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+NO_TRANSACTION = "-- migrate: no-transaction"
+
+# pg_advisory_lock key shared by every runner of this schema
+LOCK_KEY = int(hashlib.sha1(b"schema_migrations").hexdigest()[:15], 16)
+
+_FILENAME = re.compile(r"^(\d+)_(\w+)\.sql$")
+_STATEMENT_END = re.compile(r";[ \t]*$", re.MULTILINE)
+
+TRACKING_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version     INT PRIMARY KEY,
+        name        TEXT NOT NULL,
+        checksum    TEXT NOT NULL,
+        applied_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+        duration_ms INT NOT NULL
+    );
+"""
+
+
+class MigrationError(Exception):
+    """A migration file is malformed or failed to apply."""
+
+
+class Migration:
+
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding="utf-8") as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode("utf-8")).hexdigest()
+        self.transactional = NO_TRANSACTION not in (line.strip() for line in self.sql.splitlines())
+
+    @property
+    def filename(self):
+        return os.path.basename(self.path)
+
+    def statements(self):
+        """Split on semicolons that end a line (no function bodies in these files)."""
+        for chunk in _STATEMENT_END.split(self.sql):
+            code = "\n".join(line for line in chunk.splitlines() if not line.strip().startswith("--"))
+            if code.strip():
+                yield chunk.strip()
+
+
+def discover(directory=MIGRATIONS_DIR):
+    """Every migration file in `directory`, ordered by version."""
+    migrations = {}
+    for filename in os.listdir(directory):
+        if not filename.endswith(".sql"):
+            continue
+        match = _FILENAME.match(filename)
+        if match is None:
+            raise MigrationError(f"{filename}: expected NNNN_name.sql")
+        version = int(match.group(1))
+        if version in migrations:
+            raise MigrationError(f"{filename}: version {version} is used by {migrations[version].filename} too")
+        migrations[version] = Migration(version, match.group(2), os.path.join(directory, filename))
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def _connect():
+    return psycopg2.connect(**SupabaseConfig)
+
+
+def _applied(cur):
+    cur.execute(TRACKING_SQL)
+    cur.execute("SELECT version, name, checksum, applied_at FROM schema_migrations ORDER BY version;")
+    return {version: (name, checksum, applied_at) for version, name, checksum, applied_at in cur.fetchall()}
+
+
+#============================ STATUS ============================#
+
+def status(conn=None, directory=MIGRATIONS_DIR):
+    """[(migration, applied_at or None, changed_since_applied)] for every file."""
+    own = conn is None
+    conn = conn or _connect()
+    try:
+        cur = conn.cursor()
+        applied = _applied(cur)
+        conn.commit()
+        cur.close()
+    finally:
+        if own:
+            conn.close()
+
+    rows = []
+    for migration in discover(directory):
+        entry = applied.get(migration.version)
+        if entry is None:
+            rows.append((migration, None, False))
+        else:
+            rows.append((migration, entry[2], entry[1] != migration.checksum))
+    return rows
+
+
+#============================ APPLY ============================#
+
+def _apply(cur, migration):
+    started = time.perf_counter()
+    if not migration.transactional:
+        for statement in migration.statements():
+            cur.execute(statement)
+
+    cur.execute("BEGIN;")
+    try:
+        if migration.transactional:
+            cur.execute(migration.sql)
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        cur.execute("""
+            INSERT INTO schema_migrations (version, name, checksum, duration_ms)
+            VALUES (%s, %s, %s, %s);
+        """, (migration.version, migration.name, migration.checksum, duration_ms))
+    except Exception:
+        cur.execute("ROLLBACK;")
+        raise
+    cur.execute("COMMIT;")
+    return duration_ms
+
+
+def migrate(conn=None, directory=MIGRATIONS_DIR, target=None):
+    """Apply every pending migration up to `target` (all by default).
+
+    Runs on its own autocommit connection unless one is passed in. Returns
+    the migrations applied; raises MigrationError on the first failure,
+    with everything before it kept.
+    """
+    migrations = discover(directory)
+    own = conn is None
+    conn = conn or _connect()
+    conn.autocommit = True
+    cur = conn.cursor()
+    done = []
+    try:
+        # Blocks while another runner works; what it applied is skipped below
+        cur.execute("SELECT pg_advisory_lock(%s);", (LOCK_KEY,))
+        try:
+            # DDL waiting on a busy table would queue every request behind it
+            cur.execute("SET lock_timeout = %s;", (MigrationConfig["lock_timeout_ms"],))
+            applied = _applied(cur)
+            for migration in migrations:
+                if target is not None and migration.version > target:
+                    break
+                if migration.version in applied:
+                    if applied[migration.version][1] != migration.checksum:
+                        log.warning("%s was changed after it was applied", migration.filename)
+                    continue
+                try:
+                    duration_ms = _apply(cur, migration)
+                except psycopg2.Error as e:
+                    raise MigrationError(f"{migration.filename}: {str(e).strip()}") from e
+                log.info("Applied %s in %d ms", migration.filename, duration_ms)
+                done.append(migration)
+        finally:
+            cur.execute("SELECT pg_advisory_unlock(%s);", (LOCK_KEY,))
+    finally:
+        cur.close()
+        if own:
+            conn.close()
+    return done
+
+
+def init_app(app):
+    if not MigrationConfig["on_startup"]:
+        return
+    applied = migrate()
+    log.info("Schema is up to date (%d migration(s) applied)", len(applied))
+
+
+#============================ CLI ============================#
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or list schema migrations.")
+    parser.add_argument("command", nargs="?", choices=("up", "status"), default="up")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.command == "status":
+        for migration, applied_at, changed in status():
+            state = f"applied {applied_at:%Y-%m-%d %H:%M}" if applied_at else "pending"
+            print(f"{migration.filename:<40} {state}{'  (changed since)' if changed else ''}")
+        return
+
+    try:
+        applied = migrate(target=args.target)
+    except MigrationError as e:
+        sys.exit(f"Migration failed: {e}")
+    print(f"{len(applied)} migration(s) applied" if applied else "Nothing to apply")
+
+
+if __name__ == "__main__":
+    main()
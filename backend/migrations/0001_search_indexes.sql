@@ -0,0 +1,24 @@
+-- Index-backed search for /search_student, /search_program and /search_college.
+-- The expressions below must stay identical to the SEARCH_SPECS in search.py,
+-- otherwise the planner won't match the query to the index.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Trigram indexes: back the ILIKE '%kw%' substring match and the fuzzy <% match
+CREATE INDEX IF NOT EXISTS students_search_trgm_idx ON students USING gin (
+    (lower(idnum || ' ' || firstname || ' ' || lastname || ' ' || sex || ' '
+           || yearlevel::text || ' ' || COALESCE(programcode, ''))) gin_trgm_ops
+);
+
+CREATE INDEX IF NOT EXISTS programs_search_trgm_idx ON programs USING gin (
+    (lower(programcode || ' ' || programname || ' ' || COALESCE(collegecode, ''))) gin_trgm_ops
+);
+
+CREATE INDEX IF NOT EXISTS colleges_search_trgm_idx ON colleges USING gin (
+    (lower(collegecode || ' ' || collegename)) gin_trgm_ops
+);
+
+-- B-tree indexes for prefix matches on the primary keys (LIKE 'kw%')
+CREATE INDEX IF NOT EXISTS students_idnum_prefix_idx ON students (lower(idnum) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS programs_programcode_prefix_idx ON programs (lower(programcode) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS colleges_collegecode_prefix_idx ON colleges (lower(collegecode) text_pattern_ops);
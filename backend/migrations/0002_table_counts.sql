@@ -0,0 +1,53 @@
+-- Row counts for /api/stats and the *_count endpoints, kept up to date by
+-- statement-level triggers so reading them never scans the tables.
+
+CREATE TABLE IF NOT EXISTS table_counts (
+    tablename   TEXT PRIMARY KEY,
+    n           BIGINT NOT NULL
+);
+
+CREATE OR REPLACE FUNCTION table_counts_insert() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_counts SET n = n + (SELECT count(*) FROM new_rows) WHERE tablename = TG_TABLE_NAME;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION table_counts_delete() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_counts SET n = n - (SELECT count(*) FROM old_rows) WHERE tablename = TG_TABLE_NAME;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION table_counts_truncate() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_counts SET n = 0 WHERE tablename = TG_TABLE_NAME;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['students', 'programs', 'colleges'] LOOP
+        -- Block writers while seeding so the count and the triggers agree
+        EXECUTE format('LOCK TABLE %I IN SHARE ROW EXCLUSIVE MODE', t);
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_count_insert', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_count_delete', t);
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_count_truncate', t);
+
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT ON %I REFERENCING NEW TABLE AS new_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION table_counts_insert()', t || '_count_insert', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER DELETE ON %I REFERENCING OLD TABLE AS old_rows '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION table_counts_delete()', t || '_count_delete', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION table_counts_truncate()', t || '_count_truncate', t);
+
+        EXECUTE format('INSERT INTO table_counts (tablename, n) SELECT %L, count(*) FROM %I '
+                       'ON CONFLICT (tablename) DO UPDATE SET n = EXCLUDED.n', t, t);
+    END LOOP;
+END
+$$;
@@ -0,0 +1,31 @@
+-- Per-table version stamps for conditional GETs (ETag / Last-Modified).
+-- Every write statement bumps the version of the table it touched; cascades
+-- (ON UPDATE CASCADE, ON DELETE SET NULL) fire the child table's trigger too.
+
+CREATE TABLE IF NOT EXISTS table_versions (
+    tablename   TEXT PRIMARY KEY,
+    version     BIGINT NOT NULL DEFAULT 0,
+    modified_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION table_versions_bump() RETURNS trigger AS $$
+BEGIN
+    UPDATE table_versions SET version = version + 1, modified_at = now()
+    WHERE tablename = TG_TABLE_NAME;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['students', 'programs', 'colleges'] LOOP
+        INSERT INTO table_versions (tablename) VALUES (t) ON CONFLICT (tablename) DO NOTHING;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', t || '_version_bump', t);
+        EXECUTE format('CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+                       'FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump()', t || '_version_bump', t);
+    END LOOP;
+END
+$$;
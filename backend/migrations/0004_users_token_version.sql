@@ -0,0 +1,4 @@
+-- Revocation stamp for session tokens: every token carries the version it
+-- was issued under, and bumping the column invalidates all of them.
+
+ALTER TABLE users ADD COLUMN IF NOT EXISTS token_version INT NOT NULL DEFAULT 0;
@@ -0,0 +1,20 @@
+-- migrate: no-transaction
+-- Indexes on the foreign-key columns and on the list ordering.
+--
+-- Built CONCURRENTLY so writes keep going while they build. If one fails it
+-- is left INVALID and IF NOT EXISTS would skip it: DROP INDEX it and rerun.
+
+-- delete_college sets programs.collegecode to NULL, delete_program does the
+-- same for students.programcode, and ON UPDATE CASCADE / ON DELETE SET NULL
+-- look the children up by these columns; without an index each is a full scan
+CREATE INDEX CONCURRENTLY IF NOT EXISTS programs_collegecode_idx ON programs (collegecode);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS students_programcode_idx ON students (programcode);
+
+-- A user's colleges, newest first (read backwards): also covers the userid FK
+CREATE INDEX CONCURRENTLY IF NOT EXISTS colleges_userid_created_on_idx ON colleges (userid, created_on);
+
+-- ORDER BY created_on NULLS LAST, <key> in pagination.py and the exports.
+-- Ascending B-trees sort NULLs last, so the index order matches the query's
+CREATE INDEX CONCURRENTLY IF NOT EXISTS students_created_on_idnum_idx ON students (created_on, idnum);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS programs_created_on_programcode_idx ON programs (created_on, programcode);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS colleges_created_on_collegecode_idx ON colleges (created_on, collegecode);
@@ -0,0 +1,11 @@
+-- Students with their program and college resolved, for /api/students/expanded.
+-- A plain view, so Postgres inlines it: the filters and the keyset ORDER BY
+-- still reach the students indexes from 0005, and the joins are dropped
+-- altogether when a query reads only student columns.
+
+CREATE OR REPLACE VIEW students_expanded AS
+SELECT s.idnum, s.firstname, s.lastname, s.sex, s.yearlevel, s.programcode, s.profile, s.created_on,
+       p.programname, p.collegecode, c.collegename
+FROM students s
+LEFT JOIN programs p ON p.programcode = s.programcode
+LEFT JOIN colleges c ON c.collegecode = p.collegecode;
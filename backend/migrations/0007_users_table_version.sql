@@ -0,0 +1,10 @@
+-- Version stamp for the users table, so /api/users can be served under
+-- @conditional and its cached body is checked against writes made by other
+-- processes (signup, password rehash on login, logout). Reuses the
+-- table_versions_bump() trigger function from 0003.
+
+INSERT INTO table_versions (tablename) VALUES ('users') ON CONFLICT (tablename) DO NOTHING;
+
+DROP TRIGGER IF EXISTS users_version_bump ON users;
+CREATE TRIGGER users_version_bump AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON users
+    FOR EACH STATEMENT EXECUTE FUNCTION table_versions_bump();
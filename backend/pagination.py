@@ -0,0 +1,154 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+import prepared
+from projection import Projection, cursor_columns
+
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+
+class PaginationError(ValueError):
+    """Bad `limit` / `after` query parameters (reported as a 400)."""
+
+
+#============================ CURSOR TOKENS ============================#
+# A cursor is the sort key of the last row on a page: (created_on, primary key),
+# packed as url-safe base64 JSON so the client can pass it back untouched.
+
+def encode_cursor(created_on, key):
+    if isinstance(created_on, datetime):
+        created_on = created_on.isoformat()
+    raw = json.dumps([created_on, key], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(token):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        created_on, key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if created_on is not None:
+            created_on = datetime.fromisoformat(created_on)
+    except (binascii.Error, ValueError, TypeError, UnicodeError):
+        raise PaginationError("Invalid cursor")
+    # Keys are text or integer columns; anything else would reach the SQL as a bad parameter
+    if isinstance(key, bool) or not isinstance(key, (str, int)):
+        raise PaginationError("Invalid cursor")
+    return created_on, key
+
+
+#============================ REQUEST ARGS ============================#
+
+def wants_all(args):
+    # Explicit opt-in to the old unbounded listing
+    return args.get("all", "").lower() in ("1", "true", "yes")
+
+
+def parse_page_args(args):
+    raw_limit = args.get("limit")
+    if raw_limit is None:
+        limit = DEFAULT_LIMIT
+    else:
+        try:
+            limit = int(raw_limit)
+        except ValueError:
+            raise PaginationError("limit must be an integer")
+        if limit < 1 or limit > MAX_LIMIT:
+            raise PaginationError(f"limit must be between 1 and {MAX_LIMIT}")
+
+    after = args.get("after")
+    return limit, decode_cursor(after) if after else None
+
+
+#============================ KEYSET QUERY ============================#
+
+def keyset_clause(key, after):
+    """WHERE fragment selecting rows strictly after the cursor.
+
+    Rows are ordered by (created_on, key) with NULL created_on sorted last,
+    so a NULL in the cursor means we are already in that tail.
+    """
+    if after is None:
+        return "TRUE", ()
+
+    created_on, last_key = after
+    if created_on is None:
+        return f"created_on IS NULL AND {key} > %s", (last_key,)
+    return (
+        f"((created_on, {key}) > (%s, %s) OR created_on IS NULL)",
+        (created_on, last_key),
+    )
+
+
+def build_page_query(table, key, limit, after, columns="*", filters=()):
+    """Return (query, params) for one keyset page of `table`.
+
+    `table`, `key` and `columns` come from the route code, never from the
+    request, so they are safe to format into the statement, as are the SQL
+    fragments of `filters`, a list of (fragment, value) pairs ANDed into the
+    WHERE clause. One extra row is fetched to tell whether another page
+    follows.
+    """
+    conditions = "".join(f" AND {fragment}" for fragment, _ in filters)
+    values = tuple(value for _, value in filters)
+
+    if after is not None and after[0] is not None:
+        # "(created_on, key) > cursor OR created_on IS NULL" can't be an index
+        # range, so the two parts are read separately from the
+        # (created_on, key) index and merged
+        query = f"""
+            SELECT * FROM (
+                (SELECT {columns} FROM {table}
+                 WHERE (created_on, {key}) > (%s, %s){conditions}
+                 ORDER BY created_on ASC, {key} ASC
+                 LIMIT %s)
+                UNION ALL
+                (SELECT {columns} FROM {table}
+                 WHERE created_on IS NULL{conditions}
+                 ORDER BY {key} ASC
+                 LIMIT %s)
+            ) page
+            ORDER BY created_on ASC NULLS LAST, {key} ASC
+            LIMIT %s;
+        """
+        return query, tuple(after) + values + (limit + 1,) + values + (limit + 1,) * 2
+
+    where, params = keyset_clause(key, after)
+    query = f"""
+        SELECT {columns} FROM {table}
+        WHERE {where}{conditions}
+        ORDER BY created_on ASC NULLS LAST, {key} ASC
+        LIMIT %s;
+    """
+    return query, params + values + (limit + 1,)
+
+
+def render_page(rows, names, key, limit, projection):
+    """Response body for the `limit + 1` rows of a page query; `names` are their columns.
+
+    A compact page is {"columns", "rows", "next_cursor", "limit"}.
+    """
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = dict(zip(names, rows[-1])) if projection.compact else rows[-1]
+        next_cursor = encode_cursor(last["created_on"], last[key])
+
+    body = projection.render(rows, names)
+    if projection.compact:
+        return dict(body, next_cursor=next_cursor, limit=limit)
+    return {"data": body, "next_cursor": next_cursor, "limit": limit}
+
+
+def fetch_page(cur, table, key, limit, after, projection=None, filters=()):
+    """Run one keyset page against `table` and return the response body.
+
+    The cursor must come from `projection.cursor_factory`.
+    """
+    projection = projection or Projection()
+    columns = projection.select("created_on", key)
+    prepared.execute(cur, *build_page_query(table, key, limit, after, columns, filters))
+    return render_page(cur.fetchall(), cursor_columns(cur), key, limit, projection)
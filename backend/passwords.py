@@ -0,0 +1,77 @@
+import hmac
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import bcrypt
+
+from config import BcryptConfig
+
+
+BCRYPT_PREFIXES = ("$2a$", "$2b$", "$2y$")
+
+
+#============================ WORKER FUNCTIONS ============================#
+# Run inside the pool processes, so they must stay module-level and picklable
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds)).decode("ascii")
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+#============================ HASHING SERVICE ============================#
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    # One pool per process; a forked worker must not reuse its parent's
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _executor_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ProcessPoolExecutor(max_workers=BcryptConfig["workers"])
+                _executor_pid = pid
+    return _executor
+
+
+def _run(fn, *args):
+    if BcryptConfig["workers"] <= 0:
+        return fn(*args)
+    return _get_executor().submit(fn, *args).result(timeout=BcryptConfig["timeout"])
+
+
+def is_bcrypt_hash(stored):
+    return stored.startswith(BCRYPT_PREFIXES)
+
+
+def hash_password(password, rounds=None):
+    """bcrypt-hash `password` in the process pool at the configured cost."""
+    return _run(_hash, password.encode("utf-8"), rounds or BcryptConfig["rounds"])
+
+
+def verify_password(password, stored):
+    """Check `password` against a stored hash.
+
+    Rows created before passwords were hashed still hold the plain text;
+    those are compared in constant time and flagged by needs_rehash().
+    """
+    if not is_bcrypt_hash(stored):
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    return _run(_check, password.encode("utf-8"), stored.encode("ascii"))
+
+
+def needs_rehash(stored):
+    """True for plain-text rows and hashes made with a different cost."""
+    if not is_bcrypt_hash(stored):
+        return True
+    try:
+        return int(stored.split("$")[2]) != BcryptConfig["rounds"]
+    except (IndexError, ValueError):
+        return True
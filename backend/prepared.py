@@ -0,0 +1,178 @@
+import hashlib
+import logging
+import re
+import threading
+
+from psycopg2 import errors, extensions
+
+import db
+from config import PREPARED_STATEMENTS
+
+
+log = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+
+# Statements prepared per connection at most; anything beyond runs unprepared
+MAX_PER_CONNECTION = 100
+
+# Plain executions of a statement whose PREPARE failed before it is tried again
+RETRY_PREPARE_AFTER = 100
+
+
+class Statement:
+    """A psycopg2-style query rewritten for PREPARE ($1, $2, ...)."""
+
+    def __init__(self, query):
+        self.query = query
+        self.name = "ps_" + hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+        self.names = []           # %(name)s placeholders, in $n order
+        self.positional = 0       # number of %s placeholders
+
+        def replace(match):
+            if match.group(0) == "%%":
+                return "%"
+            name = match.group(1)
+            if name is None:
+                self.positional += 1
+                return f"${self.positional}"
+            if name not in self.names:
+                self.names.append(name)
+            return f"${self.names.index(name) + 1}"
+
+        self.sql = _PLACEHOLDER.sub(replace, query).strip().rstrip(";")
+        if self.names and self.positional:
+            raise ValueError("Mixed %s and %(name)s placeholders can't be prepared")
+
+    def args(self, params):
+        if self.names:
+            return [params[name] for name in self.names]
+        return list(params or ())
+
+
+#============================ REGISTRY ============================#
+# Statements registered at import time are prepared on every new connection
+# (db.on_connect); others are prepared the first time they run on a
+# connection. Each connection remembers what it has prepared under which
+# name, and for statements whose PREPARE failed, how many more plain
+# executions to run before trying again (a missing table may be created later).
+
+_lock = threading.Lock()
+_statements = {}      # query -> Statement
+_known = []           # registered up front
+
+
+def _statement(query):
+    stmt = _statements.get(query)
+    if stmt is None:
+        with _lock:
+            stmt = _statements.setdefault(query, Statement(query))
+    return stmt
+
+
+def register(query):
+    """Prepare `query` on every pooled connection; returns the query unchanged."""
+    stmt = _statement(query)
+    if stmt not in _known:
+        _known.append(stmt)
+    return query
+
+
+def _prepared(conn):
+    state = getattr(conn, "_prepared", None)
+    if state is None:
+        state = conn._prepared = {"names": {}, "failed": {}, "generation": 0}
+    return state
+
+
+def _prepare(conn, stmt):
+    """PREPARE on an idle connection; returns the statement's name or False."""
+    state = _prepared(conn)
+    if len(state["names"]) >= MAX_PER_CONNECTION:
+        return False
+
+    # After a failed EXECUTE the old name may still exist; use a fresh one
+    name = stmt.name if not state["generation"] else f"{stmt.name}_{state['generation']}"
+    cur = conn.cursor()
+    try:
+        cur.execute(f"PREPARE {name} AS {stmt.sql}")
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        log.info("Could not prepare statement, running it unprepared: %s", e, extra={"statement": stmt.name})
+        state["failed"][stmt.query] = RETRY_PREPARE_AFTER
+        return False
+    finally:
+        cur.close()
+    state["failed"].pop(stmt.query, None)
+    state["names"][stmt.query] = name
+    return name
+
+
+@db.on_connect
+def prepare_known(conn, elapsed=None):
+    """Prepare every registered statement on a freshly opened connection."""
+    if not PREPARED_STATEMENTS:
+        return
+    for stmt in list(_known):
+        _prepare(conn, stmt)
+
+
+def _idle(conn):
+    return conn.info.transaction_status == extensions.TRANSACTION_STATUS_IDLE
+
+
+def _run(cur, stmt, name, params):
+    args = stmt.args(params)
+    with db.report_as(stmt.query, params):
+        if args:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(args))})", args)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+
+def execute(cur, query, params=None):
+    """cur.execute(query, params), through a prepared statement when possible.
+
+    Falls back to a plain execute when prepared statements are disabled, the
+    statement could not be prepared (tried again after
+    RETRY_PREPARE_AFTER plain runs), or it isn't prepared yet and the
+    connection is inside a transaction (a failing PREPARE would abort it).
+    When the server dropped or invalidated the statement (e.g. a column was
+    added under a SELECT *) it is prepared again under a new name and the
+    call retried, provided no earlier statement of the transaction is lost.
+    """
+    if not PREPARED_STATEMENTS:
+        return cur.execute(query, params)
+
+    conn = cur.connection
+    stmt = _statement(query)
+    state = _prepared(conn)
+    name = state["names"].get(query)
+    if name is None:
+        failed = state["failed"]
+        if failed.get(query):
+            # PREPARE failed on this connection; run plain until the retry is due
+            failed[query] -= 1
+            name = False
+        else:
+            # Not prepared on this connection yet; retried later if we're mid-transaction
+            name = _prepare(conn, stmt) if _idle(conn) else False
+    if name is False:
+        return cur.execute(query, params)
+
+    started_idle = _idle(conn)
+    try:
+        return _run(cur, stmt, name, params)
+    except (errors.InvalidSqlStatementName, errors.FeatureNotSupported) as e:
+        # "prepared statement does not exist" / "cached plan must not change result type"
+        log.info("Re-preparing statement after: %s", e, extra={"statement": stmt.name})
+        state["names"].pop(query, None)
+        state["generation"] += 1
+        conn.rollback()
+        if not started_idle:
+            raise
+        name = _prepare(conn, stmt)
+        if name is False:
+            return cur.execute(query, params)
+        return _run(cur, stmt, name, params)
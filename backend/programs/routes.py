@@ -1,25 +1,31 @@
+import logging
 from flask import Blueprint, jsonify, request
 from flask_cors import CORS
-import psycopg2
 from psycopg2.extras import RealDictCursor
-from config import SupabaseConfig
+from auth.sessions import require_auth
+from batch import BatchError, parse_batch, run_batch
+from conditional import conditional
+from counts import get_counts
+import prepared
+from db import get_db_connection
+from export import ExportError, export_response, parse_export_args
+from invalidation import tables_changed
+from pagination import PaginationError, fetch_page, parse_page_args, wants_all
+from projection import ProjectionError, cursor_columns, parse_projection
+from response_cache import cached
+from search import SearchError, build_search, search_limit
+from search_index import search_indexes
+from streaming import StreamFormatError, stream_format, stream_query
 
 programs_bp = Blueprint("programs_bp", __name__, url_prefix="/api")
 CORS(programs_bp)
-
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**SupabaseConfig)
-        print("Database connection successful")
-        return conn
-    except Exception as e:
-        print (f"Database connection failed: {e}")
-        raise
+log = logging.getLogger(__name__)
 
 
 #============================ FOR ADDING ============================#
 # for adding programs
 @programs_bp.route("/add_program", methods=["POST"])
+@require_auth
 def add_program():
     try:
         data = request.get_json()
@@ -31,54 +37,93 @@ def add_program():
             return jsonify({"error": "Missing required fields"}), 400
 
         conn = get_db_connection()
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
         cur.execute("""
             INSERT INTO programs (collegecode, programcode, programname)
             VALUES (%s, %s, %s)
-            RETURNING programcode;
+            RETURNING *;
         """, (collegecode, programcode, programname))
+        program = cur.fetchone()
         conn.commit()
         cur.close()
         conn.close()
 
+        search_indexes.upsert("programs", program)
+        tables_changed("programs")
+
         return jsonify({"message": "Program added successfully!"}), 201
     except Exception as e:
-        print("Error in add_program:", e)
+        log.exception("Error in add_program")
         return jsonify({"error": str(e)}), 500
 
 
 
 #============================ FOR LISTING ALL PROGRAMS ============================#
-# list programs
+# list programs, one keyset page at a time (?limit=&after=), everything with ?all=true, or streamed with ?stream=json/ndjson
+# ?fields=a,b,c picks the columns, ?format=compact sends {"columns": [...], "rows": [[...], ...]}
 @programs_bp.route("/program_list", methods=['GET'])
+@conditional("programs")
+@cached("programs")
 def get_programs():
     try:
-        print("GET /api/program_list endpoint hit!")
+        projection = parse_projection("programs", request.args)
+
+        fmt = stream_format(request.args)
+        if fmt:
+            return stream_query(f"SELECT {projection.select()} FROM programs ORDER BY created_on NULLS LAST, programcode;", fmt=fmt)
+
+        unbounded = wants_all(request.args)
+        if not unbounded:
+            limit, after = parse_page_args(request.args)
+
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor(cursor_factory=projection.cursor_factory)
         
-        cur.execute("SELECT * FROM programs;")
-        programs = cur.fetchall()
+        if unbounded:
+            cur.execute(f"SELECT {projection.select()} FROM programs;")
+            programs = projection.render(cur.fetchall(), cursor_columns(cur))
+        else:
+            programs = fetch_page(cur, "programs", "programcode", limit, after, projection)
         
-        print(f"Found {len(programs)} prorgams")
-        print(f"Users data: {programs}")
+        rows = programs["rows"] if projection.compact else programs if unbounded else programs["data"]
+        log.debug("Listed programs", extra={"rows": len(rows)})
         
         cur.close()
         conn.close()
         
         return jsonify(programs), 200
         
+    except (PaginationError, ProjectionError, StreamFormatError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in get_programs: {e}")
+        log.exception("Error in get_programs")
         return jsonify({"error": str(e)}), 500
      
 
 
 
 
+#============================ FOR EXPORT ============================#
+# Streams COPY output: ?format=csv|arrow|parquet, ?gzip=true (csv only),
+# ?columns=a,b,c and filters ?programcode=, ?collegecode=
+@programs_bp.route("/programs/export", methods=["GET"])
+@require_auth
+def export_programs():
+    try:
+        fmt, columns, filters, gzip = parse_export_args("programs", request.args)
+        return export_response("programs", fmt, columns, filters, gzip=gzip)
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error exporting programs")
+        return jsonify({"error": str(e)}), 500
+
+
+
 #============================ FOR UPDATE ============================#
 
 @programs_bp.route("/programs/<string:programcode>", methods=["PUT"])
+@require_auth
 def update_college(programcode):
     try:
         data = request.get_json()
@@ -90,14 +135,14 @@ def update_college(programcode):
             return jsonify({"error": "Missing required fields"}), 400
 
         conn = get_db_connection()
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
 
         # Update the record
         cur.execute("""
             UPDATE programs
             SET collegecode = %s, programcode = %s, programname = %s
             WHERE programcode = %s
-            RETURNING programcode;
+            RETURNING *;
         """, (new_college, new_code, new_name, programcode))
 
         updated = cur.fetchone()
@@ -108,17 +153,60 @@ def update_college(programcode):
         if not updated:
             return jsonify({"error": "Program not found"}), 404
 
-        print(f"Program '{programcode}' updated successfully to '{new_college} / {new_code}' / '{new_name}'")
+        search_indexes.upsert("programs", updated, old_key=programcode)
+        if new_code != programcode:
+            # students.programcode follows through ON UPDATE CASCADE
+            search_indexes.replace_value("students", "programcode", programcode, new_code)
+            tables_changed("programs", "students")
+        else:
+            tables_changed("programs")
+
+        log.info("Program updated", extra={"programcode": programcode, "new_programcode": new_code, "collegecode": new_college})
         return jsonify({"message": "Program updated successfully"}), 200
 
     except Exception as e:
-        print(f"Error updating program: {e}")
+        log.exception("Error updating program")
+        return jsonify({"error": str(e)}), 500
+
+
+
+#============================ FOR BATCH WRITES ============================#
+# {"upserts": [{...}, ...], "deletes": ["key", ...]} in one transaction,
+# with a status per item; ?atomic=true rolls back if any item fails
+@programs_bp.route("/programs/batch", methods=["POST"])
+@require_auth
+def batch_programs():
+    try:
+        upserts, deletes = parse_batch(request.get_json(silent=True))
+        atomic = request.args.get("atomic", "").lower() in ("1", "true", "yes")
+
+        conn = get_db_connection()
+        result, written, deleted = run_batch(conn, "programs", upserts, deletes, atomic=atomic)
+        conn.close()
+
+        for row in written:
+            search_indexes.upsert("programs", row)
+        for key in deleted:
+            search_indexes.replace_value("students", "programcode", key, None)
+            search_indexes.remove("programs", key)
+        if deleted:
+            tables_changed("programs", "students")
+        elif written:
+            tables_changed("programs")
+
+        return jsonify(result), 200
+
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error in batch_programs")
         return jsonify({"error": str(e)}), 500
 
 
 
 #============================ FOR DELETE ============================#
 @programs_bp.route('/delete_program/<string:programcode>', methods=['DELETE'])
+@require_auth
 def delete_program(programcode):
     try:
         conn = get_db_connection()
@@ -137,12 +225,16 @@ def delete_program(programcode):
         cur.close()
         conn.close()
 
+        search_indexes.replace_value("students", "programcode", programcode, None)
+        search_indexes.remove("programs", programcode)
+        tables_changed("programs", "students")
+
         return jsonify({
             "message": f"Program '{programcode}' deleted successfully."
         }), 200
 
     except Exception as e:
-        print(f"Error deleting program: {e}")
+        log.exception("Error deleting program")
         return jsonify({"error": str(e)}), 500
 
 
@@ -151,35 +243,46 @@ def delete_program(programcode):
 #============================ FOR SEARCHING ============================#
 
 @programs_bp.route('/search_program/<string:keyword>', methods=['GET'])
+@conditional("programs")
+@cached("programs")
 def search_program(keyword):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        projection = parse_projection("programs", request.args)
+        fmt = stream_format(request.args)
+        limit = search_limit(request.args)
+
+        # Answer from the in-memory index when it is enabled and built
+        if not fmt and search_indexes.ready():
+            return jsonify(projection.render_dicts(search_indexes.search("programs", keyword, limit))), 200
         
-        query = """ SELECT * FROM programs WHERE collegecode ILIKE %s OR programcode ILIKE %s OR programname ILIKE %s; """
-        search_pattern = f"%{keyword}%"
+        # Ranked trigram search, backed by the indexes in migrations/0001_search_indexes.sql
+        query, params = build_search("programs", keyword, limit, projection.select())
+
+        if fmt:
+            return stream_query(query, params, fmt=fmt)
 
-        cur.execute(query, (search_pattern, search_pattern, search_pattern))
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=projection.cursor_factory)
+        prepared.execute(cur, query, params)
 
-        results = cur.fetchall()
+        results = projection.render(cur.fetchall(), cursor_columns(cur))
         cur.close()
         conn.close()
 
         return jsonify(results), 200
+    except (ProjectionError, SearchError, StreamFormatError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @programs_bp.route('/program_count', methods=['GET'])
+@conditional("programs")
+@cached("programs")
 def get_program_count():
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("SELECT COUNT(*) FROM programs;" )
-        count = cur.fetchone()[0]
-
-        cur.close()
+        count = get_counts(conn)["overall"]["programs"]
         conn.close()
 
         return jsonify({"count": count}), 200
@@ -0,0 +1,87 @@
+from psycopg2.extras import RealDictCursor
+
+
+class ProjectionError(ValueError):
+    """Bad ?fields= / ?format= value (reported as a 400)."""
+
+
+# Columns a client can ask for with ?fields=, in the order they are returned
+FIELD_SPECS = {
+    "students": ("idnum", "firstname", "lastname", "sex", "yearlevel", "programcode", "profile", "created_on"),
+    "students_expanded": ("idnum", "firstname", "lastname", "sex", "yearlevel", "programcode", "profile",
+                          "created_on", "programname", "collegecode", "collegename"),
+    "programs": ("programcode", "programname", "collegecode", "created_on"),
+    "colleges": ("collegecode", "collegename", "userid", "created_on"),
+}
+
+RESPONSE_FORMATS = ("objects", "compact")
+
+
+class Projection:
+    """The columns of a list response (?fields=) and its shape (?format=).
+
+    "objects" is a JSON object per row. "compact" sends the column names once,
+    {"columns": [...], "rows": [[...], ...]}, and is read from a plain tuple
+    cursor, so no dict is built per row either.
+    """
+
+    def __init__(self, fields=None, compact=False):
+        self.fields = fields      # None = every column
+        self.compact = compact
+
+    @property
+    def cursor_factory(self):
+        return None if self.compact else RealDictCursor
+
+    def select(self, *needed):
+        """SELECT list: the requested fields plus `needed` (e.g. the page's sort key)."""
+        if self.fields is None:
+            return "*"
+        return ", ".join(self.fields + [c for c in needed if c not in self.fields])
+
+    def render(self, rows, columns):
+        """Shape rows fetched through `cursor_factory`; `columns` are their names."""
+        keep = columns if self.fields is None else self.fields
+        if self.compact:
+            if keep != columns:
+                positions = [columns.index(c) for c in keep]
+                rows = [[row[i] for i in positions] for row in rows]
+            return {"columns": keep, "rows": rows}
+        if keep != columns:
+            rows = [{c: row[c] for c in keep} for row in rows]
+        return rows
+
+    def render_dicts(self, rows):
+        """Shape rows that are already dicts (the in-memory search index)."""
+        columns = self.fields or (list(rows[0]) if rows else [])
+        if self.compact:
+            return {"columns": columns, "rows": [[row.get(c) for c in columns] for row in rows]}
+        if self.fields is not None:
+            return [{c: row.get(c) for c in columns} for row in rows]
+        return rows
+
+
+def cursor_columns(cur):
+    return [column[0] for column in cur.description]
+
+
+def parse_projection(table, args):
+    """Projection for ?fields=a,b,c and ?format=objects|compact."""
+    allowed = FIELD_SPECS[table]
+
+    fields = None
+    if args.get("fields"):
+        wanted = {f.strip() for f in args["fields"].split(",") if f.strip()}
+        unknown = sorted(wanted - set(allowed))
+        if unknown or not wanted:
+            raise ProjectionError(f"Unknown fields: {', '.join(unknown) or '(none given)'}")
+        # Table order, so each set of fields is one statement (and one prepared plan)
+        fields = [f for f in allowed if f in wanted]
+
+    shape = args.get("format", "objects").lower()
+    if shape not in RESPONSE_FORMATS:
+        raise ProjectionError(f"format must be one of: {', '.join(RESPONSE_FORMATS)}")
+    if shape == "compact" and args.get("stream"):
+        raise ProjectionError("format=compact can't be combined with stream")
+
+    return Projection(fields, compact=shape == "compact")
@@ -0,0 +1,206 @@
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, g, make_response, request
+
+from invalidation import on_tables_changed
+
+try:
+    import redis
+except ImportError:  # optional, only needed for the shared backend
+    redis = None
+
+
+#============================ BACKENDS ============================#
+# A backend stores opaque values with a TTL and keeps integer counters
+# (incr/get_counter) used as per-table generations. Any key-value store
+# with those two features can be plugged in.
+
+class MemoryBackend:
+    """In-process LRU bounded by entry count and total body size, with TTLs."""
+
+    def __init__(self, max_entries=1024, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()     # key -> (expires_at, size, value)
+        self._counters = {}
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] < time.monotonic():
+                self._drop(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, key, value, ttl, size=0):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, size, value)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+            return self._counters[name]
+
+    def get_counters(self, names):
+        with self._lock:
+            return [self._counters.get(name, 0) for name in names]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class RedisBackend:
+    """Shared backend: every worker sees the same entries and generations."""
+
+    def __init__(self, url, prefix="ssis:cache:"):
+        if redis is None:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND=redis needs the redis package")
+        self._client = redis.Redis.from_url(url)
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        return pickle.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl, size=0):
+        self._client.set(self._prefix + key, pickle.dumps(value), ex=max(1, int(ttl)))
+
+    def incr(self, name):
+        return self._client.incr(self._prefix + "gen:" + name)
+
+    def get_counters(self, names):
+        values = self._client.mget([self._prefix + "gen:" + name for name in names])
+        return [int(v) if v is not None else 0 for v in values]
+
+    def clear(self):
+        for key in self._client.scan_iter(self._prefix + "*"):
+            if b":gen:" not in key:
+                self._client.delete(key)
+
+    def stats(self):
+        return {"backend": "redis"}
+
+
+#============================ RESPONSE CACHE ============================#
+
+class ResponseCache:
+    """Caches successful GET responses per URL.
+
+    Each cached route declares the tables its body is built from. The key
+    embeds a generation per table, and tables_changed() bumps those
+    generations, so a write orphans every dependent entry at once (they then
+    age out of the LRU). Routes under @conditional also key on the database
+    table versions, which covers writes made by other processes when the
+    in-memory backend is used.
+    """
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.default_ttl = 60
+        self.enabled = True
+
+    def init_app(self, app):
+        self.enabled = app.config.get("RESPONSE_CACHE_ENABLED", True)
+        self.default_ttl = app.config.get("RESPONSE_CACHE_TTL", 60)
+        if app.config.get("RESPONSE_CACHE_BACKEND", "memory") == "redis":
+            self.backend = RedisBackend(app.config["RESPONSE_CACHE_REDIS_URL"])
+        else:
+            self.backend = MemoryBackend(
+                max_entries=app.config.get("RESPONSE_CACHE_MAX_ENTRIES", 1024),
+                max_bytes=app.config.get("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024),
+            )
+
+    def invalidate(self, tables):
+        for table in tables:
+            self.backend.incr(table)
+
+    def _key(self, tables):
+        generations = self.backend.get_counters(tables)
+        parts = [f"{t}={gen}" for t, gen in zip(tables, generations)]
+        versions = g.get("table_versions")
+        if versions:
+            parts += [f"{t}@{versions[t][0]}" for t in tables if t in versions]
+        return request.full_path + "|" + ",".join(parts)
+
+    def cached(self, *tables, ttl=None):
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if not self.enabled or request.method != "GET":
+                    return view(*args, **kwargs)
+
+                key = self._key(tables)
+                hit = self.backend.get(key)
+                if hit is not None:
+                    body, status, mimetype = hit
+                    response = Response(body, status=status, mimetype=mimetype)
+                    response.headers["X-Cache"] = "HIT"
+                    return response
+
+                response = make_response(view(*args, **kwargs))
+                # Streams and errors are never stored
+                if response.status_code == 200 and not response.is_streamed:
+                    body = response.get_data()
+                    self.backend.set(key, (body, 200, response.mimetype),
+                                     ttl or self.default_ttl, size=len(body))
+                    response.headers["X-Cache"] = "MISS"
+                return response
+            return wrapper
+        return decorator
+
+    def stats(self):
+        stats = self.backend.stats()
+        stats["enabled"] = self.enabled
+        stats["default_ttl"] = self.default_ttl
+        return stats
+
+
+response_cache = ResponseCache()
+cached = response_cache.cached
+
+
+@on_tables_changed
+def _invalidate_responses(tables):
+    response_cache.invalidate(tables)
@@ -0,0 +1,19 @@
+# Column limits of the tables in "SSIS QUERY.sql", checked before rows are
+# written so one bad value is reported on its own instead of failing a whole
+# COPY or multi-row INSERT.
+
+# VARCHAR widths per table
+COLUMN_WIDTHS = {
+    "students": {"idnum": 9, "firstname": 100, "lastname": 100, "sex": 10, "programcode": 50},
+    "programs": {"programcode": 50, "programname": 200, "collegecode": 50},
+    "colleges": {"collegecode": 50, "collegename": 200},
+}
+
+# INT columns per table
+INT_COLUMNS = {
+    "students": {"yearlevel"},
+    "programs": set(),
+    "colleges": set(),
+}
+
+INT_MIN, INT_MAX = -2**31, 2**31 - 1
@@ -0,0 +1,75 @@
+from pagination import DEFAULT_LIMIT, MAX_LIMIT
+
+
+class SearchError(ValueError):
+    """Bad search parameters (reported as a 400)."""
+
+
+# Searchable text per table. These expressions are indexed with gin_trgm_ops
+# in migrations/0001_search_indexes.sql and must match it character for character.
+SEARCH_SPECS = {
+    "students": {
+        "key": "idnum",
+        "text": "lower(idnum || ' ' || firstname || ' ' || lastname || ' ' || sex || ' ' "
+                "|| yearlevel::text || ' ' || COALESCE(programcode, ''))",
+    },
+    "programs": {
+        "key": "programcode",
+        "text": "lower(programcode || ' ' || programname || ' ' || COALESCE(collegecode, ''))",
+    },
+    "colleges": {
+        "key": "collegecode",
+        "text": "lower(collegecode || ' ' || collegename)",
+    },
+}
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def search_limit(args):
+    raw = args.get("limit")
+    if raw is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(raw)
+    except ValueError:
+        raise SearchError("limit must be an integer")
+    if limit < 1 or limit > MAX_LIMIT:
+        raise SearchError(f"limit must be between 1 and {MAX_LIMIT}")
+    return limit
+
+
+def build_search(table, keyword, limit, columns="*"):
+    """Return (query, params) for a ranked search over `table`.
+
+    A row matches when its key starts with the keyword, its search text
+    contains the keyword, or a word in it is a close trigram match (typos).
+    Key-prefix hits rank first, then rows by word similarity.
+    """
+    spec = SEARCH_SPECS[table]
+    key, text = spec["key"], spec["text"]
+
+    term = keyword.strip().lower()
+    if not term:
+        raise SearchError("Search keyword is empty")
+    escaped = _escape_like(term)
+
+    query = f"""
+        SELECT {columns} FROM {table}
+        WHERE lower({key}) LIKE %(prefix)s
+           OR {text} LIKE %(contains)s
+           OR %(term)s <%% {text}
+        ORDER BY lower({key}) LIKE %(prefix)s DESC,
+                 word_similarity(%(term)s, {text}) DESC,
+                 {key}
+        LIMIT %(limit)s;
+    """
+    params = {
+        "prefix": escaped + "%",
+        "contains": "%" + escaped + "%",
+        "term": term,
+        "limit": limit,
+    }
+    return query, params
@@ -0,0 +1,435 @@
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from collections import Counter
+
+from psycopg2.extras import RealDictCursor
+
+from conditional import table_versions
+from db import get_pool
+from search import SearchError
+
+
+log = logging.getLogger(__name__)
+
+
+# Columns that make up the searchable text of each table (same fields as
+# SEARCH_SPECS in search.py, so both backends find the same rows).
+INDEXED_TABLES = {
+    "students": ("idnum", ["idnum", "firstname", "lastname", "sex", "yearlevel", "programcode"]),
+    "programs": ("programcode", ["programcode", "programname", "collegecode"]),
+    "colleges": ("collegecode", ["collegecode", "collegename"]),
+}
+
+
+# pg_trgm.word_similarity_threshold (PostgreSQL's default), used by the <% in build_search
+WORD_SIMILARITY_THRESHOLD = 0.6
+
+_WORD = re.compile(r"[^\W_]+")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+#============================ PG_TRGM ============================#
+
+def _pg_trigrams(text):
+    """pg_trgm's trigrams of lowercased `text` in order: each word padded as '  word '."""
+    grams = []
+    for word in _WORD.findall(text):
+        padded = f"  {word} "
+        grams.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def _similarity(count, len1, len2):
+    # pg_trgm computes this in float4; round the same way so ties and the
+    # threshold come out as they do in the database
+    return struct.unpack("f", struct.pack("f", count / (len1 + len2 - count)))[0]
+
+
+def word_similarity(term_grams, text_grams):
+    """pg_trgm's word_similarity(term, text), given both trigram lists.
+
+    A port of iterate_word_similarity() in contrib/pg_trgm/trgm_op.c: the
+    best similarity between the term's trigram set and an extent of the
+    text's trigrams, with the same greedy choice of extents.
+    """
+    wanted = set(term_grams)
+    found = [gram in wanted for gram in text_grams]
+    lastpos = {}
+    lower = -1
+    count = ulen2 = 0
+    best = 0.0
+    for i, gram in enumerate(text_grams):
+        if lower >= 0 or found[i]:
+            if lastpos.get(gram, -1) < 0:
+                ulen2 += 1
+                if found[i]:
+                    count += 1
+            lastpos[gram] = i
+        if not found[i]:
+            continue
+
+        if lower == -1:
+            lower = i
+            ulen2 = 1
+        current = _similarity(count, len(wanted), ulen2)
+
+        # Try moving the lower bound of the extent up for a better score
+        tmp_count, tmp_ulen2, prev_lower = count, ulen2, lower
+        for tmp_lower in range(lower, i + 1):
+            tmp = _similarity(tmp_count, len(wanted), tmp_ulen2)
+            if tmp > current:
+                current, ulen2, lower, count = tmp, tmp_ulen2, tmp_lower, tmp_count
+            if lastpos.get(text_grams[tmp_lower]) == tmp_lower:
+                tmp_ulen2 -= 1
+                if found[tmp_lower]:
+                    tmp_count -= 1
+        best = max(best, current)
+
+        for tmp_lower in range(prev_lower, lower):
+            if lastpos.get(text_grams[tmp_lower]) == tmp_lower:
+                lastpos[text_grams[tmp_lower]] = -1
+    return best
+
+
+#============================ TRIGRAM INDEX ============================#
+
+class TrigramIndex:
+    """In-memory trigram inverted index over the rows of one table.
+
+    Each row gets an integer doc id; postings are `array('I')` lists of doc
+    ids, appended in increasing order. Updates and deletes tombstone the old
+    doc id and the postings are compacted once tombstones pile up.
+
+    Two postings maps are kept: raw trigrams of the text find substring
+    matches, pg_trgm's padded word trigrams find fuzzy ones. search()
+    returns the rows build_search would, in the same order.
+    """
+
+    def __init__(self, key, fields):
+        self.key = key
+        self.fields = fields
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self):
+        self._docs = {}         # doc id -> (lowercased text, row)
+        self._by_key = {}       # primary key -> doc id
+        self._postings = {}     # trigram -> array('I') of doc ids
+        self._word_postings = {}  # pg_trgm trigram -> array('I') of doc ids
+        self._next_id = 0
+        self._dead = 0
+
+    def _text(self, row):
+        # Nullable columns are COALESCE'd to '' in SEARCH_SPECS
+        return " ".join("" if row.get(f) is None else str(row[f]) for f in self.fields).lower()
+
+    @staticmethod
+    def _post(postings, grams, doc_id):
+        for gram in grams:
+            ids = postings.get(gram)
+            if ids is None:
+                ids = postings[gram] = array("I")
+            ids.append(doc_id)
+
+    def _add(self, row):
+        doc_id = self._next_id
+        self._next_id += 1
+        text = self._text(row)
+        self._docs[doc_id] = (text, row)
+        self._by_key[row[self.key]] = doc_id
+        self._post(self._postings, _trigrams(text), doc_id)
+        self._post(self._word_postings, set(_pg_trigrams(text)), doc_id)
+
+    def _remove(self, key):
+        doc_id = self._by_key.pop(key, None)
+        if doc_id is None:
+            return False
+        del self._docs[doc_id]
+        self._dead += 1
+        return True
+
+    def _maybe_compact(self):
+        if self._dead <= max(1000, len(self._docs)):
+            return
+        rows = [row for _, row in self._docs.values()]
+        self._reset()
+        for row in rows:
+            self._add(row)
+
+    # -- public API --
+
+    def load(self, rows):
+        with self._lock:
+            self._reset()
+            for row in rows:
+                self._add(dict(row))
+
+    def upsert(self, row, old_key=None):
+        with self._lock:
+            self._remove(row[self.key] if old_key is None else old_key)
+            self._remove(row[self.key])
+            self._add(dict(row))
+            self._maybe_compact()
+
+    def remove(self, key):
+        with self._lock:
+            if self._remove(key):
+                self._maybe_compact()
+
+    def replace_value(self, field, old, new):
+        # Mirrors cascades like ON UPDATE CASCADE / SET NULL in the database
+        with self._lock:
+            rows = [row for _, row in self._docs.values() if row.get(field) == old]
+            for row in rows:
+                changed = dict(row)
+                changed[field] = new
+                self._remove(row[self.key])
+                self._add(changed)
+            self._maybe_compact()
+
+    def keys(self):
+        with self._lock:
+            return set(self._by_key)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _substring_candidates(self, term):
+        grams = _trigrams(term)
+        if not grams:
+            # Too short for trigrams: check every row
+            return set(self._docs)
+        lists = [self._postings.get(gram) for gram in grams]
+        if any(postings is None for postings in lists):
+            return set()
+        lists.sort(key=len)
+        candidates = set(lists[0])
+        for postings in lists[1:]:
+            candidates.intersection_update(postings)
+            if not candidates:
+                break
+        return candidates
+
+    def search(self, term, limit):
+        """Same matches and order as build_search: key prefix, substring or term <% text.
+
+        Ties on similarity are broken by the key in code point order, which
+        can differ from the database collation for keys with punctuation.
+        """
+        term = term.strip().lower()
+        if not term:
+            raise SearchError("Search keyword is empty")
+        term_grams = _pg_trigrams(term)
+        with self._lock:
+            # word_similarity can't reach the threshold unless at least that
+            # share of the term's trigrams occur in the text
+            shared = Counter()
+            for gram in set(term_grams):
+                shared.update(self._word_postings.get(gram, ()))
+            needed = WORD_SIMILARITY_THRESHOLD * len(set(term_grams)) - 1e-6
+            candidates = self._substring_candidates(term)
+            candidates.update(doc_id for doc_id, n in shared.items() if n >= needed)
+
+            hits = []
+            for doc_id in candidates:
+                doc = self._docs.get(doc_id)
+                if doc is None:
+                    continue
+                text, row = doc
+                prefix = str(row[self.key]).lower().startswith(term)
+                score = word_similarity(term_grams, _pg_trigrams(text)) if shared[doc_id] else 0.0
+                if prefix or term in text or score >= WORD_SIMILARITY_THRESHOLD:
+                    hits.append((not prefix, -score, row[self.key], row))
+
+        hits.sort(key=lambda hit: hit[:3])
+        return [hit[3] for hit in hits[:limit]]
+
+
+#============================ REGISTRY ============================#
+
+class SearchIndexes:
+    """Per-process set of trigram indexes, one per searchable table.
+
+    Indexes are built in a background thread on first use in each process,
+    so forked workers build their own. Writes that arrive while a build is
+    running are replayed once it finishes.
+
+    A process applies its own writes as they happen. Writes from other
+    workers, or made directly in the database, are picked up by comparing
+    the table_versions stamps every `check_interval` seconds and reloading
+    the tables whose stamp moved; searches go to the database meanwhile.
+    Without migrations/0003_table_versions.sql, every table is reloaded
+    once the index is `max_age` seconds old.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.check_interval = 5.0
+        self.max_age = 300.0
+        self._lock = threading.Lock()
+        self._indexes = {t: TrigramIndex(k, f) for t, (k, f) in INDEXED_TABLES.items()}
+        self._pid = None
+        self._ready = False
+        self._building = False
+        self._pending = []
+        self._versions = {}     # table -> table_versions stamp it was loaded at
+        self._checked_at = 0.0
+        self.built_at = None
+        self.build_time = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get("SEARCH_INDEX_ENABLED", False)
+        self.check_interval = app.config.get("SEARCH_INDEX_CHECK_INTERVAL", 5.0)
+        self.max_age = app.config.get("SEARCH_INDEX_MAX_AGE", 300.0)
+
+    def _start_build(self, force=False, tables=None):
+        with self._lock:
+            pid = os.getpid()
+            if self._pid == pid and (self._building or (self._ready and not force)):
+                return
+            if self._pid != pid:
+                tables = None
+            self._pid = pid
+            self._ready = False
+            self._building = True
+            self._pending = []
+        tables = list(self._indexes) if tables is None else list(tables)
+        threading.Thread(target=self._build, args=(tables,), name="search-index-build", daemon=True).start()
+
+    def rebuild(self):
+        """Reload every index from the database in the background."""
+        if self.enabled:
+            self._start_build(force=True)
+
+    def _build(self, tables):
+        started = time.perf_counter()
+        conn = None
+        try:
+            # Stamps first: a write landing in between only causes another reload
+            versions = table_versions(tables)
+            conn = get_pool().getconn()
+            cur = conn.cursor(cursor_factory=RealDictCursor)
+            for table in tables:
+                cur.execute(f"SELECT * FROM {table};")
+                self._indexes[table].load(cur.fetchall())
+            cur.close()
+        except Exception as e:
+            log.exception("Search index build failed")
+            with self._lock:
+                self._building = False
+                self._pid = None
+            return
+        finally:
+            if conn is not None:
+                conn.close()
+
+        with self._lock:
+            for op in self._pending:
+                op()
+            self._pending = []
+            for table in tables:
+                self._versions[table] = versions[table][0] if versions else None
+            self._checked_at = time.monotonic()
+            self._building = False
+            self._ready = True
+            if len(tables) == len(self._indexes):
+                self.built_at = time.time()
+            self.build_time = time.perf_counter() - started
+
+    def _stale_tables(self):
+        """Tables changed in the database since they were loaded, checked at most every check_interval."""
+        now = time.monotonic()
+        with self._lock:
+            if now - self._checked_at < self.check_interval:
+                return []
+            self._checked_at = now
+
+        try:
+            versions = table_versions(list(self._indexes))
+        except Exception:
+            log.exception("Search index freshness check failed")
+            return []
+        if versions is None:
+            if self.built_at is not None and time.time() - self.built_at > self.max_age:
+                return list(self._indexes)
+            return []
+        return [table for table in self._indexes if versions[table][0] != self._versions.get(table)]
+
+    def ready(self):
+        if not self.enabled:
+            return False
+        if self._pid != os.getpid() or not (self._ready or self._building):
+            self._start_build()
+        elif self._ready:
+            stale = self._stale_tables()
+            if stale:
+                self._start_build(force=True, tables=stale)
+        return self._ready and self._pid == os.getpid()
+
+    def _apply(self, op):
+        if not self.enabled:
+            return
+        with self._lock:
+            if self._building:
+                self._pending.append(op)
+                return
+            if not self._ready:
+                return
+        op()
+
+    # -- write-through hooks used by the blueprints --
+
+    def upsert(self, table, row, old_key=None):
+        row = dict(row)
+        self._apply(lambda: self._indexes[table].upsert(row, old_key))
+
+    def remove(self, table, key):
+        self._apply(lambda: self._indexes[table].remove(key))
+
+    def replace_value(self, table, field, old, new):
+        self._apply(lambda: self._indexes[table].replace_value(field, old, new))
+
+    # -- reads --
+
+    def search(self, table, term, limit):
+        return self._indexes[table].search(term, limit)
+
+    def check(self, conn):
+        """Compare each index with its table; returns per-table drift."""
+        report = {}
+        cur = conn.cursor()
+        for table, index in self._indexes.items():
+            cur.execute(f"SELECT {index.key} FROM {table};")
+            db_keys = {row[0] for row in cur.fetchall()}
+            mem_keys = index.keys()
+            report[table] = {
+                "db_rows": len(db_keys),
+                "indexed_rows": len(mem_keys),
+                "missing": sorted(db_keys - mem_keys)[:50],
+                "stale": sorted(mem_keys - db_keys)[:50],
+                "consistent": db_keys == mem_keys,
+            }
+        cur.close()
+        return report
+
+    def status(self):
+        return {
+            "enabled": self.enabled,
+            "ready": self._ready and self._pid == os.getpid(),
+            "building": self._building,
+            "built_at": self.built_at,
+            "build_time": self.build_time,
+            "versions": dict(self._versions),
+            "rows": {table: len(index) for table, index in self._indexes.items()},
+        }
+
+
+search_indexes = SearchIndexes()
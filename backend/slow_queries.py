@@ -0,0 +1,207 @@
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+
+from flask import has_request_context, request
+
+import db
+
+
+log = logging.getLogger(__name__)
+
+# String literals inside the statement text (execute_values and mogrify inline
+# the values), replaced before anything is stored or logged
+_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_SPACES = re.compile(r"\s+")
+
+MAX_QUERY_LENGTH = 2000
+
+EXPLAINABLE = ("SELECT", "WITH", "VALUES", "TABLE", "INSERT", "UPDATE", "DELETE")
+
+
+def redact_params(params):
+    """Keep the shape of the parameters, never their values."""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _placeholder(value) for key, value in params.items()}
+    if isinstance(params, (list, tuple)):
+        return [_placeholder(value) for value in params]
+    return "<stream>"  # copy_expert's file object
+
+
+def _placeholder(value):
+    if value is None:
+        return None
+    if isinstance(value, (str, bytes)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    if isinstance(value, (list, tuple)):
+        return f"<{type(value).__name__}:{len(value)}>"
+    return f"<{type(value).__name__}>"
+
+
+def normalize_query(query):
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    elif not isinstance(query, str):
+        query = str(query)  # psycopg2.sql.Composed
+    text = _SPACES.sub(" ", _LITERAL.sub("'?'", query)).strip()
+    return text[:MAX_QUERY_LENGTH] + ("..." if len(text) > MAX_QUERY_LENGTH else "")
+
+
+#============================ SLOW-QUERY LOG ============================#
+
+class SlowQueryLog:
+    """Log statements slower than a threshold and EXPLAIN a sample of them.
+
+    Fed by the statement hook in db.py, so every cursor in every blueprint is
+    covered. Each slow statement is logged (text with literals stripped,
+    parameter types only, rows, route) and kept in a ring buffer. A fraction
+    of them is re-run by a background thread under
+    EXPLAIN (ANALYZE, BUFFERS) inside a rolled-back transaction. Only
+    read-only statements get ANALYZE; writes get a plain EXPLAIN so nothing is
+    executed twice. The buffer is per process.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.threshold = 0.2
+        self.explain_sample = 0.1
+        self.explain_timeout_ms = 10000
+        self.entries = deque(maxlen=200)
+        self.counters = {"slow": 0, "explained": 0, "explain_failed": 0, "explain_skipped": 0}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._queue = None
+        self._pid = None
+
+    def init_app(self, app):
+        self.enabled = app.config.get("SLOW_QUERY_ENABLED", True)
+        self.threshold = app.config.get("SLOW_QUERY_MS", 200) / 1000.0
+        self.explain_sample = app.config.get("SLOW_QUERY_EXPLAIN_SAMPLE", 0.1)
+        self.explain_timeout_ms = app.config.get("SLOW_QUERY_EXPLAIN_TIMEOUT_MS", 10000)
+        self.entries = deque(maxlen=app.config.get("SLOW_QUERY_KEEP", 200))
+        if self.enabled:
+            db.on_query(self._observe)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    # -- statement hook --
+
+    def _observe(self, cursor, query, params, elapsed):
+        if elapsed < self.threshold or getattr(self._local, "explaining", False):
+            return
+
+        entry = {
+            "at": time.time(),
+            "duration_ms": round(elapsed * 1000, 2),
+            "query": normalize_query(query),
+            "params": redact_params(params),
+            "rows": cursor.rowcount,
+            "route": None,
+            "method": None,
+            "plan": None,
+        }
+        if has_request_context():
+            rule = request.url_rule
+            entry["route"] = rule.rule if rule is not None else request.path
+            entry["method"] = request.method
+
+        self._count("slow")
+        log.warning("Slow query (%.0f ms) on %s", entry["duration_ms"], entry["route"] or "<background>",
+                    extra={"query": entry["query"], "params": entry["params"], "rows": entry["rows"]})
+        with self._lock:
+            self.entries.append(entry)
+
+        if self.explain_sample > 0 and random.random() < self.explain_sample:
+            self._submit_explain(cursor, query, params, entry)
+
+    def _submit_explain(self, cursor, query, params, entry):
+        if not isinstance(params, (dict, list, tuple, type(None))):
+            return  # COPY: nothing to explain
+        if normalize_query(query).split(" ", 1)[0].upper() not in EXPLAINABLE:
+            return
+        try:
+            # Bound while the cursor is still valid; the values never leave this object
+            statement = cursor.mogrify(query, params)
+        except Exception:
+            return
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((statement, entry))
+        except queue.Full:
+            self._count("explain_skipped")
+
+    # -- background EXPLAIN --
+
+    def _ensure_started(self):
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        with self._lock:
+            if self._pid == pid:
+                return
+            self._queue = queue.Queue(maxsize=16)
+            threading.Thread(target=self._explain_loop, args=(self._queue,), name="slow-query-explain",
+                             daemon=True).start()
+            self._pid = pid
+
+    def _explain_loop(self, jobs):
+        self._local.explaining = True
+        while True:
+            statement, entry = jobs.get()
+            try:
+                entry["plan"] = self.explain(statement)
+                self._count("explained")
+            except Exception as e:
+                entry["plan_error"] = str(e)
+                self._count("explain_failed")
+
+    def explain(self, statement):
+        text = statement.decode("utf-8", "replace") if isinstance(statement, bytes) else statement
+        read_only = text.lstrip().split(None, 1)[0].upper() in ("SELECT", "WITH", "VALUES", "TABLE")
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if read_only else "FORMAT JSON"
+
+        conn = db.get_pool().getconn()
+        try:
+            cur = conn.cursor()
+            if read_only:
+                cur.execute("SET TRANSACTION READ ONLY;")
+            cur.execute("SET LOCAL statement_timeout = %s;", (self.explain_timeout_ms,))
+            cur.execute(f"EXPLAIN ({options}) {text.rstrip().rstrip(';')}")
+            plan = cur.fetchone()[0]
+            cur.close()
+        finally:
+            conn.rollback()
+            conn.close()
+        return plan
+
+    # -- admin --
+
+    def status(self, limit=50):
+        with self._lock:
+            entries = list(self.entries)[-limit:][::-1]
+            counters = dict(self.counters)
+        return {
+            "enabled": self.enabled,
+            "threshold_ms": self.threshold * 1000,
+            "explain_sample": self.explain_sample,
+            "pid": os.getpid(),
+            **counters,
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+slow_queries = SlowQueryLog()
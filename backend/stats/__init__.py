@@ -0,0 +1 @@
+from .routes import stats_bp
\ No newline at end of file
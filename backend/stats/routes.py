@@ -0,0 +1,35 @@
+import logging
+from flask import Blueprint, jsonify, request
+from flask_cors import CORS
+from conditional import conditional
+from counts import CountModeError, get_counts
+from db import get_db_connection
+from response_cache import cached
+
+stats_bp = Blueprint("stats_bp", __name__, url_prefix="/api")
+CORS(stats_bp)
+log = logging.getLogger(__name__)
+
+
+#============================ DASHBOARD COUNTS ============================#
+
+# All counts in one call: ?userid= adds that user's counts, ?mode=estimate
+# reads planner statistics instead of exact counts (for very large tables)
+@stats_bp.route("/stats", methods=["GET"])
+@conditional("students", "programs", "colleges")
+@cached("students", "programs", "colleges")
+def get_stats():
+    try:
+        mode = request.args.get("mode", "exact").lower()
+        userid = request.args.get("userid", type=int)
+
+        conn = get_db_connection()
+        stats = get_counts(conn, mode=mode, userid=userid)
+        conn.close()
+
+        return jsonify(stats), 200
+    except CountModeError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error in get_stats")
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,89 @@
+import uuid
+
+from flask import Response, current_app
+from psycopg2.extras import RealDictCursor
+
+from db import get_pool
+
+
+BATCH_SIZE = 2000
+
+class StreamFormatError(ValueError):
+    """Unknown ?stream= value (reported as a 400)."""
+
+
+STREAM_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def stream_format(args):
+    """Return the requested stream format (?stream=json|ndjson) or None."""
+    fmt = args.get("stream")
+    if not fmt:
+        return None
+    fmt = fmt.lower()
+    if fmt not in STREAM_FORMATS:
+        raise StreamFormatError(f"stream must be one of: {', '.join(STREAM_FORMATS)}")
+    return fmt
+
+
+def _open_cursor(query, params):
+    # The connection is checked out here rather than through
+    # get_db_connection(): the request context is gone by the time the
+    # body is generated, so the teardown handler can't be the one to release it.
+    conn = get_pool().getconn()
+    try:
+        # Named cursor = server-side cursor, only one batch in memory at a time
+        cur = conn.cursor(name=f"stream_{uuid.uuid4().hex}", cursor_factory=RealDictCursor)
+        cur.execute(query.strip().rstrip(";"), params)
+    except Exception:
+        conn.close()
+        raise
+    return conn, cur
+
+
+def _iter_rows(conn, cur, batch_size):
+    try:
+        while True:
+            rows = cur.fetchmany(batch_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _encode(rows, fmt, dumps):
+    if fmt == "ndjson":
+        for row in rows:
+            yield dumps(row) + "\n"
+        return
+
+    yield "["
+    first = True
+    for row in rows:
+        if first:
+            first = False
+            yield dumps(row)
+        else:
+            yield "," + dumps(row)
+    yield "]"
+
+
+def stream_query(query, params=(), fmt="json", batch_size=BATCH_SIZE):
+    """Stream the result of `query` as a JSON array or NDJSON.
+
+    Rows go from the server-side cursor to the socket one batch at a time,
+    so peak memory does not depend on the size of the result.
+    """
+    # Executed before the response starts, so a bad query is still a 500
+    conn, cur = _open_cursor(query, params)
+    dumps = current_app.json.dumps
+    body = _encode(_iter_rows(conn, cur, batch_size), fmt, dumps)
+    response = Response(body, mimetype=STREAM_FORMATS[fmt])
+    # Covers clients that disconnect before the body is ever iterated
+    response.call_on_close(conn.close)
+    return response
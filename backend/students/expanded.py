@@ -0,0 +1,47 @@
+from .importer import VALID_SEX
+
+
+# The students_expanded view from migrations/0006_students_expanded.sql
+EXPANDED_VIEW = "students_expanded"
+
+# Query parameter -> (SQL applied in the view, value parser)
+EXPANDED_FILTERS = {
+    "programcode": ("programcode = %s", str),
+    "collegecode": ("collegecode = %s", str),
+    "yearlevel": ("yearlevel = %s", int),
+    "sex": ("sex = %s", str),
+}
+
+
+class StudentFilterError(ValueError):
+    """Bad filter parameters (reported as a 400)."""
+
+
+def parse_filters(args):
+    """[(fragment, value)] for every filter given in the query string.
+
+    `program` and `college` are accepted as short forms of `programcode`
+    and `collegecode`.
+    """
+    filters = []
+    for name, (fragment, parse) in EXPANDED_FILTERS.items():
+        raw = args.get(name) or args.get(name.replace("code", ""))
+        if not raw:
+            continue
+        try:
+            value = parse(raw.strip())
+        except ValueError:
+            raise StudentFilterError(f"{name} must be an integer")
+        if name == "sex" and value not in VALID_SEX:
+            raise StudentFilterError("sex must be Male, Female or Other")
+        filters.append((fragment, value))
+    return filters
+
+
+def build_expanded_query(filters, columns="*"):
+    """(query, params) for every matching student, in listing order."""
+    query = f"SELECT {columns} FROM {EXPANDED_VIEW}"
+    if filters:
+        query += " WHERE " + " AND ".join(fragment for fragment, _ in filters)
+    query += " ORDER BY created_on NULLS LAST, idnum;"
+    return query, tuple(value for _, value in filters)
@@ -0,0 +1,172 @@
+import csv
+import io
+
+from schema import COLUMN_WIDTHS as TABLE_WIDTHS, INT_MAX, INT_MIN
+
+
+IMPORT_COLUMNS = ["profile", "idnum", "firstname", "lastname", "sex", "yearlevel", "programcode"]
+REQUIRED_COLUMNS = ["idnum", "firstname", "lastname", "sex", "yearlevel", "programcode"]
+VALID_SEX = {"Male", "Female", "Other"}
+
+# Same widths as students_import below; a longer value would abort the COPY
+COLUMN_WIDTHS = TABLE_WIDTHS["students"]
+
+BATCH_SIZE = 5000
+MAX_REPORTED_ERRORS = 1000
+
+
+class ImportFormatError(ValueError):
+    """The upload is not a usable CSV (reported as a 400)."""
+
+
+#============================ VALIDATION ============================#
+
+def _validate(row, program_codes, seen):
+    """Return (clean_row, None) or (None, error message)."""
+    values = {col: (row.get(col) or "").strip() for col in IMPORT_COLUMNS}
+
+    missing = [col for col in REQUIRED_COLUMNS if not values[col]]
+    if missing:
+        return None, f"Missing required fields: {', '.join(missing)}"
+
+    for col, width in COLUMN_WIDTHS.items():
+        if len(values[col]) > width:
+            return None, f"{col} is longer than {width} characters"
+    if values["idnum"] in seen:
+        return None, f"Duplicate idnum '{values['idnum']}' in file"
+    if values["sex"] not in VALID_SEX:
+        return None, "sex must be Male, Female or Other"
+    try:
+        values["yearlevel"] = int(values["yearlevel"])
+    except ValueError:
+        return None, "yearlevel must be an integer"
+    if not INT_MIN <= values["yearlevel"] <= INT_MAX:
+        return None, "yearlevel is out of range"
+    if values["programcode"] not in program_codes:
+        return None, f"Unknown programcode '{values['programcode']}'"
+
+    values["profile"] = values["profile"] or None
+    return values, None
+
+
+#============================ COPY ============================#
+
+def _copy_batch(cur, batch):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for line, values in batch:
+        writer.writerow([line] + [
+            r"\N" if values[col] is None else values[col] for col in IMPORT_COLUMNS
+        ])
+    buf.seek(0)
+    cur.copy_expert(
+        f"COPY students_import (line, {', '.join(IMPORT_COLUMNS)}) "
+        r"FROM STDIN WITH (FORMAT csv, NULL '\N')",
+        buf,
+    )
+
+
+def import_students(conn, stream, atomic=False):
+    """Load a students CSV from `stream` (bytes) through COPY.
+
+    Rows are validated in batches of BATCH_SIZE and copied into a temporary
+    staging table; one INSERT ... SELECT then moves them into `students`,
+    skipping ids that already exist. Everything runs in one transaction.
+    With `atomic`, any bad row rolls the whole import back.
+
+    Line numbers in the report count the header as line 1.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.DictReader(text)
+    if not reader.fieldnames:
+        raise ImportFormatError("CSV file is empty")
+    header = [name.strip() for name in reader.fieldnames]
+    missing = [col for col in REQUIRED_COLUMNS if col not in header]
+    if missing:
+        raise ImportFormatError(f"CSV header is missing columns: {', '.join(missing)}")
+    reader.fieldnames = header
+
+    errors = []
+    error_count = 0
+
+    def report(line, idnum, message):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "idnum": idnum, "error": message})
+
+    cur = conn.cursor()
+    try:
+        # Every program code in one query, checked in memory afterwards
+        cur.execute("SELECT programcode FROM programs;")
+        program_codes = {code for (code,) in cur.fetchall()}
+
+        cur.execute("""
+            CREATE TEMP TABLE students_import (
+                line        INT NOT NULL,
+                profile     TEXT,
+                idnum       VARCHAR(9) NOT NULL,
+                firstname   VARCHAR(100) NOT NULL,
+                lastname    VARCHAR(100) NOT NULL,
+                sex         VARCHAR(10) NOT NULL,
+                yearlevel   INT NOT NULL,
+                programcode VARCHAR(50)
+            ) ON COMMIT DROP;
+        """)
+
+        seen = set()
+        batch = []
+        total = 0
+        try:
+            for line, row in enumerate(reader, start=2):
+                total += 1
+                values, error = _validate(row, program_codes, seen)
+                if error:
+                    report(line, (row.get("idnum") or "").strip() or None, error)
+                    continue
+                seen.add(values["idnum"])
+                batch.append((line, values))
+                if len(batch) >= BATCH_SIZE:
+                    _copy_batch(cur, batch)
+                    batch = []
+        except (csv.Error, UnicodeDecodeError) as e:
+            raise ImportFormatError(f"Malformed CSV near line {reader.line_num}: {e}")
+        if batch:
+            _copy_batch(cur, batch)
+
+        # Ids that already exist in the table are reported, not loaded
+        cur.execute("""
+            SELECT i.line, i.idnum FROM students_import i
+            JOIN students s ON s.idnum = i.idnum
+            ORDER BY i.line;
+        """)
+        for line, idnum in cur.fetchall():
+            report(line, idnum, f"Student '{idnum}' already exists")
+
+        cur.execute(f"""
+            INSERT INTO students ({', '.join(IMPORT_COLUMNS)})
+            SELECT {', '.join(IMPORT_COLUMNS)} FROM students_import
+            ON CONFLICT (idnum) DO NOTHING;
+        """)
+        imported = cur.rowcount
+
+        if atomic and error_count:
+            conn.rollback()
+            imported = 0
+        else:
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+
+    errors.sort(key=lambda e: e["line"])
+    return {
+        "rows": total,
+        "imported": imported,
+        "failed": error_count,
+        "errors": errors,
+        "errors_truncated": error_count > len(errors),
+        "rolled_back": bool(atomic and error_count),
+    }
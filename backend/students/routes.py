@@ -1,25 +1,40 @@
+import logging
 from flask import Blueprint, jsonify, request
 from flask_cors import CORS
-import psycopg2
 from psycopg2.extras import RealDictCursor
-from config import SupabaseConfig
+from auth.sessions import require_auth
+from batch import BatchError, parse_batch, run_batch
+from conditional import conditional
+from counts import get_counts
+import prepared
+from db import get_db_connection
+from export import ExportError, export_response, parse_export_args
+from invalidation import tables_changed
+from pagination import PaginationError, fetch_page, parse_page_args, wants_all
+from projection import ProjectionError, cursor_columns, parse_projection
+from response_cache import cached
+from search import SearchError, build_search, search_limit
+from search_index import search_indexes
+from streaming import StreamFormatError, stream_format, stream_query
+from .expanded import EXPANDED_VIEW, StudentFilterError, build_expanded_query, parse_filters
+from .importer import ImportFormatError, import_students
 
 students_bp = Blueprint("students_bp", __name__, url_prefix="/api")
 CORS(students_bp)
+log = logging.getLogger(__name__)
 
+UPDATE_STUDENT_SQL = prepared.register("""
+    UPDATE students
+    SET profile = %s, idnum = %s, firstname = %s, lastname = %s, sex = %s, yearlevel = %s, programcode = %s
+    WHERE idnum = %s
+    RETURNING *;
+""")
 
-def get_db_connection():
-    try:
-        conn = psycopg2.connect(**SupabaseConfig)
-        print("Database connection successful")
-        return conn
-    except Exception as e:
-        print (f"Database connection failed: {e}")
-        raise
 
 
 #============================ FOR ADDING ============================#
 @students_bp.route("/add_student", methods=["POST"])
+@require_auth
 def add_student():
     data = request.get_json()
 
@@ -36,40 +51,155 @@ def add_student():
 
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
         cur.execute("""
             INSERT INTO students (profile, idnum, firstname, lastname, sex, yearlevel, programcode)
             VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING *;
         """, (profile, idnum, firstname, lastname, sex, yearlevel, programcode))
+        student = cur.fetchone()
         conn.commit()
         cur.close()
         conn.close()
 
+        search_indexes.upsert("students", student)
+        tables_changed("students")
+
         return jsonify({"message": "Student added successfully"}), 201
     except Exception as e:
-        print("Error adding student:", e)
+        log.exception("Error adding student")
+        return jsonify({"error": str(e)}), 500
+
+
+
+#============================ FOR BULK IMPORT ============================#
+# CSV with a header row (profile is optional), sent either as the raw request
+# body (Content-Type: text/csv) or as a multipart "file" field.
+# ?atomic=true rolls everything back if any row is rejected.
+@students_bp.route("/students/import", methods=["POST"])
+@require_auth
+def import_students_csv():
+    try:
+        if "file" in request.files:
+            stream = request.files["file"].stream
+        else:
+            stream = request.stream
+
+        atomic = request.args.get("atomic", "").lower() in ("1", "true", "yes")
+
+        conn = get_db_connection()
+        report = import_students(conn, stream, atomic=atomic)
+        conn.close()
+
+        if report["imported"]:
+            search_indexes.rebuild()
+            tables_changed("students")
+
+        return jsonify(report), 200
+
+    except ImportFormatError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error importing students")
         return jsonify({"error": str(e)}), 500
 
 
 
 #============================ FOR LISTING ALL STUDENTS ============================#
-# list stuenst
+# list stuenst, one keyset page at a time (?limit=&after=), everything with ?all=true, or streamed with ?stream=json/ndjson
+# ?fields=a,b,c picks the columns, ?format=compact sends {"columns": [...], "rows": [[...], ...]}
 @students_bp.route("/student_list", methods=['GET'])
+@conditional("students")
+@cached("students")
 def get_students():
     try:
+        projection = parse_projection("students", request.args)
+
+        fmt = stream_format(request.args)
+        if fmt:
+            return stream_query(f"SELECT {projection.select()} FROM students ORDER BY created_on NULLS LAST, idnum;", fmt=fmt)
+
+        unbounded = wants_all(request.args)
+        if not unbounded:
+            limit, after = parse_page_args(request.args)
+
         conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        cur = conn.cursor(cursor_factory=projection.cursor_factory)
         
-        cur.execute("SELECT * FROM students;")
-        users = cur.fetchall()
+        if unbounded:
+            cur.execute(f"SELECT {projection.select()} FROM students;")
+            result = projection.render(cur.fetchall(), cursor_columns(cur))
+        else:
+            result = fetch_page(cur, "students", "idnum", limit, after, projection)
         
         cur.close()
         conn.close()
         
-        return jsonify(users), 200
+        return jsonify(result), 200
         
+    except (PaginationError, ProjectionError, StreamFormatError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in get_students: {e}")
+        log.exception("Error in get_students")
+        return jsonify({"error": str(e)}), 500
+
+
+
+#============================ FOR LISTING WITH PROGRAM AND COLLEGE ============================#
+# students with programname, collegecode and collegename joined in, filtered by
+# ?programcode= (or ?program=), ?collegecode= (or ?college=), ?yearlevel=, ?sex=;
+# paging, ?all=true, ?stream=, ?fields= and ?format=compact work as in /student_list
+@students_bp.route("/students/expanded", methods=["GET"])
+@conditional("students", "programs", "colleges")
+@cached("students", "programs", "colleges")
+def get_students_expanded():
+    try:
+        filters = parse_filters(request.args)
+        projection = parse_projection(EXPANDED_VIEW, request.args)
+
+        fmt = stream_format(request.args)
+        if fmt:
+            return stream_query(*build_expanded_query(filters, projection.select()), fmt=fmt)
+
+        unbounded = wants_all(request.args)
+        if not unbounded:
+            limit, after = parse_page_args(request.args)
+
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=projection.cursor_factory)
+
+        if unbounded:
+            cur.execute(*build_expanded_query(filters, projection.select()))
+            result = projection.render(cur.fetchall(), cursor_columns(cur))
+        else:
+            result = fetch_page(cur, EXPANDED_VIEW, "idnum", limit, after, projection, filters)
+
+        cur.close()
+        conn.close()
+
+        return jsonify(result), 200
+
+    except (StudentFilterError, PaginationError, ProjectionError, StreamFormatError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error in get_students_expanded")
+        return jsonify({"error": str(e)}), 500
+
+
+
+#============================ FOR EXPORT ============================#
+# Streams COPY output: ?format=csv|arrow|parquet, ?gzip=true (csv only),
+# ?columns=a,b,c and filters ?programcode=, ?collegecode=
+@students_bp.route("/students/export", methods=["GET"])
+@require_auth
+def export_students():
+    try:
+        fmt, columns, filters, gzip = parse_export_args("students", request.args)
+        return export_response("students", fmt, columns, filters, gzip=gzip)
+    except ExportError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error exporting students")
         return jsonify({"error": str(e)}), 500
 
 
@@ -77,6 +207,7 @@ def get_students():
 #============================ FOR UPDATE ============================#
 
 @students_bp.route("/students/<string:idnum>", methods=["PUT"])
+@require_auth
 def update_student(idnum):
     try:
         data = request.get_json()
@@ -92,15 +223,10 @@ def update_student(idnum):
             return jsonify({"error": "Missing required fields"}), 400
 
         conn = get_db_connection()
-        cur = conn.cursor()
+        cur = conn.cursor(cursor_factory=RealDictCursor)
 
         # Update the record
-        cur.execute("""
-            UPDATE students
-            SET profile = %s, idnum = %s, firstname = %s, lastname = %s, sex = %s, yearlevel = %s, programcode = %s
-            WHERE idnum = %s
-            RETURNING idnum;
-        """, (new_profile, new_idnum, new_firstname, new_lastname,new_sex ,new_yearlevel, new_programcode, idnum))
+        prepared.execute(cur, UPDATE_STUDENT_SQL, (new_profile, new_idnum, new_firstname, new_lastname,new_sex ,new_yearlevel, new_programcode, idnum))
 
         updated = cur.fetchone()
         conn.commit()
@@ -110,16 +236,51 @@ def update_student(idnum):
         if not updated:
             return jsonify({"error": "Student not found"}), 404
 
-        print(f"Student '{idnum}' updated successfully to '{new_idnum}")
+        search_indexes.upsert("students", updated, old_key=idnum)
+        tables_changed("students")
+
+        log.info("Student updated", extra={"idnum": idnum, "new_idnum": new_idnum})
         return jsonify({"message": "Student updated successfully"}), 200
 
     except Exception as e:
-        print(f"Error updating student: {e}")
+        log.exception("Error updating student")
         return jsonify({"error": str(e)}), 500
 
 
+#============================ FOR BATCH WRITES ============================#
+# {"upserts": [{...}, ...], "deletes": ["key", ...]} in one transaction,
+# with a status per item; ?atomic=true rolls back if any item fails
+@students_bp.route("/students/batch", methods=["POST"])
+@require_auth
+def batch_students():
+    try:
+        upserts, deletes = parse_batch(request.get_json(silent=True))
+        atomic = request.args.get("atomic", "").lower() in ("1", "true", "yes")
+
+        conn = get_db_connection()
+        result, written, deleted = run_batch(conn, "students", upserts, deletes, atomic=atomic)
+        conn.close()
+
+        for row in written:
+            search_indexes.upsert("students", row)
+        for key in deleted:
+            search_indexes.remove("students", key)
+        if written or deleted:
+            tables_changed("students")
+
+        return jsonify(result), 200
+
+    except BatchError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error in batch_students")
+        return jsonify({"error": str(e)}), 500
+
+
+
 #============================ FOR DELETE ============================#
 @students_bp.route('/delete_student<string:idnum>', methods=['DELETE'])
+@require_auth
 def delete_student(idnum):
     try:
         conn = get_db_connection()
@@ -131,9 +292,12 @@ def delete_student(idnum):
         cur.close()
         conn.close()
 
+        search_indexes.remove("students", idnum)
+        tables_changed("students")
+
         return jsonify({"message": f"Student '{idnum}' deleted successfully."}), 200
     except Exception as e:
-        print(f"Error deleting student: {e}")
+        log.exception("Error deleting student")
         return jsonify({"error": str(e)}), 500
 
 
@@ -142,51 +306,49 @@ def delete_student(idnum):
 #============================ FOR SEARCHING ============================#
 
 @students_bp.route('/search_student/<string:keyword>', methods=['GET'])
+@conditional("students")
+@cached("students")
 def search_student(keyword):
     try:
-        conn = get_db_connection()
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        projection = parse_projection("students", request.args)
+        fmt = stream_format(request.args)
+        limit = search_limit(request.args)
 
-        # Use COALESCE so that NULL fields don't break the ILIKE comparison
-        query = """
-            SELECT * FROM students
-            WHERE COALESCE(profile, '') ILIKE %s
-               OR COALESCE(idnum, '') ILIKE %s
-               OR COALESCE(firstname, '') ILIKE %s
-               OR COALESCE(lastname, '') ILIKE %s
-               OR COALESCE(sex, '') ILIKE %s
-               OR COALESCE(yearlevel::TEXT, '') ILIKE %s
-               OR COALESCE(programcode, '') ILIKE %s
-               OR COALESCE(collegecode, '') ILIKE %s;
-        """
-
-        search_pattern = f"%{keyword}%"
-        params = (search_pattern,) * 6
-
-        cur.execute(query, params)
-        results = cur.fetchall()
+        # Answer from the in-memory index when it is enabled and built
+        if not fmt and search_indexes.ready():
+            return jsonify(projection.render_dicts(search_indexes.search("students", keyword, limit))), 200
+
+        # Ranked trigram search, backed by the indexes in migrations/0001_search_indexes.sql
+        query, params = build_search("students", keyword, limit, projection.select())
+
+        if fmt:
+            return stream_query(query, params, fmt=fmt)
+
+        conn = get_db_connection()
+        cur = conn.cursor(cursor_factory=projection.cursor_factory)
+        prepared.execute(cur, query, params)
+        results = projection.render(cur.fetchall(), cursor_columns(cur))
 
         cur.close()
         conn.close()
 
         return jsonify(results), 200
 
+    except (ProjectionError, SearchError, StreamFormatError) as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print("Error in search_student:", e)
+        log.exception("Error in search_student")
         return jsonify({"error": str(e)}), 500
 
 
 
 @students_bp.route('/student_count', methods=['GET'])
+@conditional("students")
+@cached("students")
 def get_student_count():
     try:
         conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("SELECT COUNT(*) FROM students;" )
-        count = cur.fetchone()[0]
-
-        cur.close()
+        count = get_counts(conn)["overall"]["students"]
         conn.close()
 
         return jsonify({"count": count}), 200
@@ -0,0 +1 @@
+from .routes import system_bp
\ No newline at end of file
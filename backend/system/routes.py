@@ -0,0 +1,136 @@
+import logging
+from flask import Blueprint, Response, jsonify, request
+from flask_cors import CORS
+from auth.sessions import require_auth
+import os
+import time
+from config import ServerConfig
+from db import check_database, get_db_connection, get_pool
+from mail_queue import mail_queue
+from metrics import metrics
+from response_cache import response_cache
+from search_index import search_indexes
+from slow_queries import slow_queries
+
+system_bp = Blueprint("system_bp", __name__, url_prefix="/api")
+CORS(system_bp)
+log = logging.getLogger(__name__)
+
+
+#============================ HEALTH CHECKS ============================#
+
+# Liveness: the worker is up and answering requests. No database check, so a
+# database outage does not get every worker restarted by the orchestrator.
+@system_bp.route("/health/live", methods=["GET"])
+def liveness():
+    return jsonify({"status": "alive", "pid": os.getpid()}), 200
+
+
+# Readiness: this worker can reach the database through its own pool.
+# A cold or cut-off worker answers 503 so the load balancer routes around it.
+@system_bp.route("/health/ready", methods=["GET"])
+def readiness():
+    started = time.perf_counter()
+    try:
+        check_database(ServerConfig["health_check_timeout"])
+    except Exception as e:
+        log.warning("Readiness check failed: %s", e)
+        return jsonify({"status": "unavailable", "pid": os.getpid(), "error": str(e)}), 503
+
+    pool = get_pool().stats()
+    return jsonify({
+        "status": "ready",
+        "pid": os.getpid(),
+        "db_latency_ms": round((time.perf_counter() - started) * 1000, 2),
+        "pool": {"size": pool["size"], "idle": pool["idle"], "in_use": pool["in_use"]},
+    }), 200
+
+
+
+#============================ METRICS ============================#
+
+# Prometheus scrape target; left open like the health checks since scrapers
+# can't renew session tokens
+@system_bp.route("/metrics", methods=["GET"])
+def get_metrics():
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+
+#============================ POOL STATISTICS ============================#
+
+@system_bp.route("/pool_stats", methods=["GET"])
+@require_auth
+def get_pool_stats():
+    return jsonify(get_pool().stats()), 200
+
+
+
+#============================ MAIL QUEUE ============================#
+
+@system_bp.route("/mail_queue", methods=["GET"])
+@require_auth
+def get_mail_queue_status():
+    return jsonify(mail_queue.status()), 200
+
+
+
+#============================ RESPONSE CACHE ============================#
+
+@system_bp.route("/cache_stats", methods=["GET"])
+@require_auth
+def get_cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+
+
+#============================ SLOW QUERIES ============================#
+
+# Recent statements over SLOW_QUERY_MS in this worker, newest first, with the
+# EXPLAIN plan when one was captured; ?limit= (default 50), ?clear=true empties it
+@system_bp.route("/slow_queries", methods=["GET"])
+@require_auth
+def get_slow_queries():
+    try:
+        limit = request.args.get("limit", 50, type=int)
+        report = slow_queries.status(limit=max(1, min(limit, 1000)))
+        if request.args.get("clear", "").lower() in ("1", "true", "yes"):
+            slow_queries.clear()
+        return jsonify(report), 200
+    except Exception as e:
+        log.exception("Error in get_slow_queries")
+        return jsonify({"error": str(e)}), 500
+
+
+
+#============================ IN-MEMORY SEARCH INDEX ============================#
+
+@system_bp.route("/search_index/status", methods=["GET"])
+@require_auth
+def get_search_index_status():
+    return jsonify(search_indexes.status()), 200
+
+
+# Compare the in-memory index with the database; ?repair=true rebuilds it on drift
+@system_bp.route("/search_index/check", methods=["GET"])
+@require_auth
+def check_search_index():
+    if not search_indexes.ready():
+        return jsonify({"error": "Search index is not enabled or still building", **search_indexes.status()}), 503
+
+    try:
+        conn = get_db_connection()
+        report = search_indexes.check(conn)
+        conn.close()
+
+        consistent = all(table["consistent"] for table in report.values())
+        repairing = not consistent and request.args.get("repair", "").lower() in ("1", "true", "yes")
+        if repairing:
+            search_indexes.rebuild()
+
+        return jsonify({"consistent": consistent, "repairing": repairing, "tables": report}), 200
+    except Exception as e:
+        log.exception("Error checking search index")
+        return jsonify({"error": str(e)}), 500
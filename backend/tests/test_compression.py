@@ -0,0 +1,81 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify
+
+from compression import Compression, brotli, etag_variants
+
+
+@pytest.fixture
+def client():
+    app = Flask(__name__)
+    app.config.update(COMPRESSION_MIN_SIZE=100)
+    Compression().init_app(app)
+
+    @app.route("/big")
+    def big():
+        response = jsonify([{"idnum": f"2024-{i:04d}", "firstname": "Juan"} for i in range(200)])
+        response.set_etag("abc")
+        return response
+
+    @app.route("/small")
+    def small():
+        return jsonify({"ok": True})
+
+    @app.route("/stream")
+    def stream():
+        return Response((f"{i},row\n" for i in range(500)), mimetype="text/csv")
+
+    @app.route("/image")
+    def image():
+        return Response(b"\x89PNG" * 100, mimetype="image/png")
+
+    return app.test_client()
+
+
+def test_gzip_when_accepted(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert response.headers["ETag"] == '"abc-gzip"'
+    body = json.loads(gzip.decompress(response.get_data()))
+    assert len(body) == 200
+
+
+@pytest.mark.skipif(brotli is None, reason="brotli is not installed")
+def test_brotli_preferred(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "br"
+    assert len(json.loads(brotli.decompress(response.get_data()))) == 200
+
+
+def test_identity_without_accept_encoding(client):
+    response = client.get("/big")
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers["Vary"]
+
+
+def test_refused_encoding_is_not_used(client):
+    response = client.get("/big", headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_small_bodies_are_left_alone(client):
+    response = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_other_types_are_left_alone(client):
+    response = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "Content-Encoding" not in response.headers
+
+
+def test_streams_are_compressed_chunk_by_chunk(client):
+    response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.get_data()).decode().splitlines()[-1] == "499,row"
+
+
+def test_etag_variants():
+    assert etag_variants("abc") == ["abc", "abc-br", "abc-gzip"]
@@ -0,0 +1,125 @@
+import time
+
+import psycopg2
+import pytest
+
+import db
+from db import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    """Just enough of a psycopg2 connection for the pool."""
+
+    def __init__(self):
+        self.closed = 0
+        self.status = psycopg2.extensions.STATUS_READY
+        self.rollbacks = 0
+
+    def close(self):
+        self.closed = 1
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.status = psycopg2.extensions.STATUS_READY
+
+
+@pytest.fixture(autouse=True)
+def no_listeners(monkeypatch):
+    # Other modules (prepared, metrics) register listeners when imported
+    monkeypatch.setattr(db, "_connect_listeners", [])
+    monkeypatch.setattr(db, "_query_listeners", [])
+
+
+def make_pool(**kwargs):
+    opened = []
+
+    def connect(**_):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    kwargs.setdefault("health_check_after", 3600)
+    return ConnectionPool({}, connect=connect, **kwargs), opened
+
+
+def test_warm_opens_minconn():
+    pool, opened = make_pool(minconn=3, maxconn=5)
+    pool.warm()
+    assert len(opened) == 3
+    assert pool.stats()["idle"] == 3
+
+
+def test_close_returns_the_connection_to_the_pool():
+    pool, opened = make_pool(minconn=0, maxconn=2)
+    conn = pool.getconn()
+    conn.close()
+    again = pool.getconn()
+    assert again.raw is conn.raw
+    assert len(opened) == 1
+    stats = pool.stats()
+    assert stats["checkouts"] == 2 and stats["in_use"] == 1
+
+
+def test_release_rolls_back_an_open_transaction():
+    pool, _ = make_pool(minconn=0, maxconn=1)
+    conn = pool.getconn()
+    conn.raw.status = psycopg2.extensions.STATUS_IN_TRANSACTION
+    conn.close()
+    assert conn.raw.rollbacks == 1
+    assert pool.stats()["idle"] == 1
+
+
+def test_exhausted_pool_times_out():
+    pool, _ = make_pool(minconn=0, maxconn=1, timeout=0.05)
+    pool.getconn()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert pool.stats()["timeouts"] == 1
+
+
+def test_discard_closes_the_connection():
+    pool, _ = make_pool(minconn=0, maxconn=1)
+    conn = pool.getconn()
+    conn.discard()
+    assert conn.raw.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_expired_idle_connection_is_replaced_on_checkout():
+    pool, opened = make_pool(minconn=0, maxconn=1, max_lifetime=0.05)
+    pool.getconn().close()
+    time.sleep(0.1)
+    conn = pool.getconn()
+    assert conn.raw is opened[1]
+    assert opened[0].closed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_connection_expiring_while_checked_out_is_recycled_on_release():
+    pool, _ = make_pool(minconn=0, maxconn=1, max_lifetime=0.05)
+    conn = pool.getconn()
+    time.sleep(0.1)
+    conn.close()
+    assert conn.raw.closed
+    stats = pool.stats()
+    assert stats["recycled"] == 1 and stats["size"] == 0
+
+
+def test_discarded_connection_is_not_counted_as_recycled():
+    pool, _ = make_pool(minconn=0, maxconn=1, max_lifetime=0.05)
+    conn = pool.getconn()
+    time.sleep(0.1)
+    conn.discard()
+    assert pool.stats()["recycled"] == 0
+
+
+def test_failing_connect_listener_closes_the_connection(monkeypatch):
+    def broken(conn, elapsed):
+        raise RuntimeError("listener failed")
+
+    monkeypatch.setattr(db, "_connect_listeners", [broken])
+    pool, opened = make_pool(minconn=0, maxconn=1)
+    with pytest.raises(RuntimeError):
+        pool.getconn()
+    assert opened[0].closed
+    assert pool.stats()["size"] == 0 and pool.stats()["in_use"] == 0
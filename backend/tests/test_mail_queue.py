@@ -0,0 +1,104 @@
+import smtplib
+import time
+
+import pytest
+from flask import Flask
+from flask_mail import Mail, Message
+
+from mail_queue import MailQueue
+
+
+class StubSMTP:
+    """In-process stand-in for smtplib.SMTP; the first `failures` sends raise."""
+
+    failures = 0
+    delivered = []
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+
+    def set_debuglevel(self, level):
+        pass
+
+    def sendmail(self, sender, recipients, body, mail_options=(), rcpt_options=()):
+        if StubSMTP.failures:
+            StubSMTP.failures -= 1
+            raise smtplib.SMTPServerDisconnected("connection dropped")
+        StubSMTP.delivered.append((sender, recipients, body))
+
+    def quit(self):
+        pass
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    monkeypatch.setattr(smtplib, "SMTP", StubSMTP)
+    monkeypatch.setattr(StubSMTP, "failures", 0)
+    monkeypatch.setattr(StubSMTP, "delivered", [])
+    return StubSMTP
+
+
+def make_queue(tmp_path, **config):
+    app = Flask(__name__)
+    app.config.update(
+        MAIL_SERVER="localhost",
+        MAIL_PORT=1025,
+        MAIL_USE_TLS=False,
+        MAIL_DEFAULT_SENDER="noreply@example.com",
+        MAIL_QUEUE_WORKERS=1,
+        MAIL_QUEUE_BACKOFF=0.01,
+        MAIL_QUEUE_IDLE_TIMEOUT=0.5,
+        MAIL_DEAD_LETTER_PATH=str(tmp_path / "dead.jsonl"),
+        **config,
+    )
+    mail_queue = MailQueue()
+    mail_queue.init_app(app, Mail(app))
+    return mail_queue
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("timed out waiting for the mail queue")
+        time.sleep(0.01)
+
+
+def send(mail_queue, *recipients):
+    # Message() reads MAIL_DEFAULT_SENDER from the app, as it does inside a route
+    with mail_queue.app.app_context():
+        for to in recipients or ("student@example.com",):
+            mail_queue.enqueue(Message(subject="Reset your password", recipients=[to], body="hello"))
+
+
+def test_delivers_queued_messages(smtp, tmp_path):
+    mail_queue = make_queue(tmp_path)
+    send(mail_queue, "a@example.com", "b@example.com")
+    wait_for(lambda: mail_queue.counters["sent"] == 2)
+    assert [recipients for _, recipients, _ in smtp.delivered] == [["a@example.com"], ["b@example.com"]]
+    assert b"Reset your password" in smtp.delivered[0][2]
+    assert mail_queue.counters["retried"] == 0
+
+
+def test_retries_after_a_transient_failure(smtp, tmp_path):
+    smtp.failures = 1
+    mail_queue = make_queue(tmp_path)
+    send(mail_queue)
+    wait_for(lambda: mail_queue.counters["sent"] == 1)
+    assert len(smtp.delivered) == 1
+    assert mail_queue.counters["retried"] == 1
+    assert not mail_queue.dead_letters
+
+
+def test_dead_letters_after_max_attempts(smtp, tmp_path):
+    smtp.failures = 100
+    mail_queue = make_queue(tmp_path, MAIL_QUEUE_MAX_ATTEMPTS=3)
+    send(mail_queue)
+    wait_for(lambda: mail_queue.counters["dead"] == 1)
+    assert not smtp.delivered
+    assert mail_queue.counters["retried"] == 2
+    record = mail_queue.dead_letters[0]
+    assert record["attempts"] == 3
+    assert record["recipients"] == ["student@example.com"]
+    assert "connection dropped" in record["error"]
+    assert (tmp_path / "dead.jsonl").read_text().count("\n") == 1
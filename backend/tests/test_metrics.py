@@ -0,0 +1,16 @@
+import os
+
+from metrics import clear_snapshots
+
+
+def test_clear_snapshots_only_removes_worker_files(tmp_path):
+    for name in ("123.json", "456.json.tmp", "notes.txt", "config.json", "7.json.bak"):
+        (tmp_path / name).write_text("{}")
+    clear_snapshots(str(tmp_path))
+    assert sorted(os.listdir(tmp_path)) == ["7.json.bak", "config.json", "notes.txt"]
+
+
+def test_clear_snapshots_creates_the_directory(tmp_path):
+    directory = tmp_path / "metrics"
+    clear_snapshots(str(directory))
+    assert directory.is_dir()
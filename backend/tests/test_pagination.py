@@ -0,0 +1,52 @@
+from datetime import datetime
+
+import pytest
+
+from pagination import (MAX_LIMIT, PaginationError, build_page_query, decode_cursor, encode_cursor,
+                        parse_page_args)
+
+
+@pytest.mark.parametrize("created_on, key", [
+    (datetime(2024, 5, 1, 12, 30, 15, 123456), "2024-0001"),
+    (None, "BSCS"),
+    (datetime(2020, 1, 1), 42),
+])
+def test_cursor_round_trip(created_on, key):
+    assert decode_cursor(encode_cursor(created_on, key)) == (created_on, key)
+
+
+def test_cursor_is_url_safe():
+    token = encode_cursor(datetime(2024, 5, 1), "a/b+c?")
+    assert "=" not in token and "+" not in token and "/" not in token
+
+
+@pytest.mark.parametrize("token", ["", "not-base64!", encode_cursor(None, "x")[:-3], "WzFd"])
+def test_malformed_cursor_is_rejected(token):
+    with pytest.raises(PaginationError):
+        decode_cursor(token)
+
+
+@pytest.mark.parametrize("key", [[1], {"a": 1}, None, True, 1.5])
+def test_cursor_key_must_be_str_or_int(key):
+    with pytest.raises(PaginationError):
+        decode_cursor(encode_cursor(None, key))
+
+
+def test_cursor_with_bad_timestamp_is_rejected():
+    with pytest.raises(PaginationError):
+        decode_cursor(encode_cursor("yesterday", "x"))
+
+
+def test_page_args():
+    assert parse_page_args({}) == (50, None)
+    assert parse_page_args({"limit": "10", "after": encode_cursor(None, "x")}) == (10, (None, "x"))
+    for limit in ("0", str(MAX_LIMIT + 1), "ten"):
+        with pytest.raises(PaginationError):
+            parse_page_args({"limit": limit})
+
+
+@pytest.mark.parametrize("after", [None, (None, "x"), (datetime(2024, 1, 1), "x")])
+def test_page_query_params_match_placeholders(after):
+    query, params = build_page_query("students", "idnum", 50, after, filters=[("sex = %s", "Male")])
+    assert query.count("%s") == len(params)
+    assert params[-1] == 51
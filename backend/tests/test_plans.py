@@ -0,0 +1,45 @@
+"""Index plans of the hot lookups (benchmarks/check_plans.py) on a real database.
+
+Skipped unless DB_HOST is set. EXPLAIN only, nothing is written; run the
+migrations and seed.py (--scale 100k or more) first, since on small tables
+the planner rightly prefers a sequential scan and those checks are skipped.
+"""
+import os
+import sys
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.getenv("DB_HOST"), reason="no database configured (DB_HOST)")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+
+@pytest.fixture(scope="module")
+def cur():
+    import psycopg2
+    from config import SupabaseConfig
+
+    conn = psycopg2.connect(**SupabaseConfig)
+    cursor = conn.cursor()
+    yield cursor
+    conn.rollback()
+    cursor.close()
+    conn.close()
+
+
+def test_hot_lookups_use_their_indexes(cur):
+    import check_plans
+
+    rows = check_plans.table_rows(cur)
+    failures, enforced = [], 0
+    for label, table, query, params, index in check_plans.checks(cur):
+        if rows.get(table, 0) < check_plans.MIN_ROWS:
+            continue
+        enforced += 1
+        plan = check_plans.explain(cur, query, params)
+        if not any(node.endswith(f"using {index}") for node in plan):
+            failures.append(f"{label}: expected {index}, got {', '.join(plan)}")
+
+    if not enforced:
+        pytest.skip(f"tables have fewer than {check_plans.MIN_ROWS} rows; run benchmarks/seed.py")
+    assert not failures, "\n".join(failures)
@@ -0,0 +1,84 @@
+from types import SimpleNamespace
+
+import psycopg2
+import pytest
+from psycopg2 import extensions
+
+import prepared
+from prepared import Statement
+
+
+class FakeCursor:
+
+    def __init__(self, conn):
+        self.connection = conn
+
+    def execute(self, query, params=None):
+        self.connection.executed.append(query.split()[0])
+        if query.startswith("PREPARE") and self.connection.prepare_failures:
+            self.connection.prepare_failures -= 1
+            raise psycopg2.ProgrammingError('relation "students" does not exist')
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """Records the first word of every statement run on it."""
+
+    def __init__(self, prepare_failures=0):
+        self.prepare_failures = prepare_failures
+        self.executed = []
+        self.info = SimpleNamespace(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+def test_positional_placeholders_are_numbered():
+    stmt = Statement("SELECT * FROM students WHERE idnum = %s AND sex = %s;")
+    assert stmt.sql == "SELECT * FROM students WHERE idnum = $1 AND sex = $2"
+    assert stmt.args(("1", "Male")) == ["1", "Male"]
+
+
+def test_named_placeholders_are_numbered_once_each():
+    stmt = Statement("SELECT %(term)s, %(limit)s, %(term)s")
+    assert stmt.sql == "SELECT $1, $2, $1"
+    assert stmt.args({"limit": 5, "term": "x"}) == ["x", 5]
+
+
+def test_escaped_percent_is_unescaped():
+    stmt = Statement("SELECT * FROM students WHERE firstname LIKE 'a%%' AND idnum = %s")
+    assert stmt.sql == "SELECT * FROM students WHERE firstname LIKE 'a%' AND idnum = $1"
+
+
+def test_no_placeholders():
+    stmt = Statement("SELECT 1;")
+    assert stmt.sql == "SELECT 1"
+    assert stmt.args(None) == []
+
+
+def test_mixed_placeholders_are_refused():
+    with pytest.raises(ValueError):
+        Statement("SELECT %s, %(name)s")
+
+
+def test_name_depends_only_on_the_query():
+    assert Statement("SELECT 1").name == Statement("SELECT 1").name
+    assert Statement("SELECT 1").name != Statement("SELECT 2").name
+
+
+def test_failed_prepare_is_retried_after_plain_runs(monkeypatch):
+    monkeypatch.setattr(prepared, "PREPARED_STATEMENTS", True)
+    monkeypatch.setattr(prepared, "RETRY_PREPARE_AFTER", 2)
+    conn = FakeConnection(prepare_failures=1)
+    cur = conn.cursor()
+    for _ in range(4):
+        prepared.execute(cur, "SELECT * FROM students WHERE idnum = %s;", ("1",))
+    assert conn.executed == ["PREPARE", "SELECT", "SELECT", "SELECT", "PREPARE", "EXECUTE"]
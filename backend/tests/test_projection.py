@@ -0,0 +1,49 @@
+import pytest
+
+from projection import FIELD_SPECS, ProjectionError, parse_projection
+
+
+def test_defaults_to_every_column_as_objects():
+    projection = parse_projection("students", {})
+    assert projection.fields is None and not projection.compact
+    assert projection.select("created_on", "idnum") == "*"
+
+
+def test_fields_come_back_in_table_order():
+    projection = parse_projection("students", {"fields": "lastname, idnum"})
+    assert projection.fields == ["idnum", "lastname"]
+    assert projection.select("created_on", "idnum") == "idnum, lastname, created_on"
+
+
+@pytest.mark.parametrize("args", [
+    {"fields": "idnum,password"},
+    {"fields": " , "},
+    {"format": "xml"},
+    {"format": "compact", "stream": "ndjson"},
+])
+def test_bad_arguments(args):
+    with pytest.raises(ProjectionError):
+        parse_projection("students", args)
+
+
+def test_render_objects_drops_unrequested_columns():
+    projection = parse_projection("programs", {"fields": "programcode"})
+    rows = [{"programcode": "BSCS", "created_on": None}]
+    assert projection.render(rows, ["programcode", "created_on"]) == [{"programcode": "BSCS"}]
+
+
+def test_render_compact():
+    projection = parse_projection("programs", {"fields": "programname,programcode", "format": "compact"})
+    body = projection.render([("BSCS", "Computer Science", None)], ["programcode", "programname", "created_on"])
+    assert body == {"columns": ["programcode", "programname"], "rows": [["BSCS", "Computer Science"]]}
+
+
+def test_render_dicts_compact_uses_every_column():
+    projection = parse_projection("colleges", {"format": "compact"})
+    body = projection.render_dicts([{"collegecode": "CCS", "collegename": "Computing"}])
+    assert body == {"columns": ["collegecode", "collegename"], "rows": [["CCS", "Computing"]]}
+
+
+def test_every_table_has_created_on():
+    for fields in FIELD_SPECS.values():
+        assert "created_on" in fields
@@ -0,0 +1,86 @@
+import pytest
+
+from search import SearchError
+from search_index import INDEXED_TABLES, TrigramIndex, _pg_trigrams, word_similarity
+
+
+def sim(term, text):
+    return word_similarity(_pg_trigrams(term), _pg_trigrams(text))
+
+
+def test_pg_trigrams_pad_each_word():
+    assert _pg_trigrams("ab c") == ["  a", " ab", "ab ", "  c", " c "]
+    assert _pg_trigrams("bs-cs") == ["  b", " bs", "bs ", "  c", " cs", "cs "]
+    assert _pg_trigrams("--") == []
+
+
+# Values as returned by PostgreSQL's pg_trgm, e.g. SELECT word_similarity('word', 'two words')
+@pytest.mark.parametrize("term, text, expected", [
+    ("word", "two words", 0.8),
+    ("two", "two words", 1.0),
+    ("wrd", "two words", 0.25),
+    ("word", "word", 1.0),
+    ("xyz", "two words", 0.0),
+    ("", "two words", 0.0),
+])
+def test_word_similarity_matches_pg_trgm(term, text, expected):
+    assert sim(term, text) == pytest.approx(expected, abs=1e-6)
+
+
+def test_word_similarity_is_rounded_like_float4():
+    # 3/5 in float4 is 0.6000000238..., which is what the <% threshold sees
+    assert sim("2021", "2022-0003") > 0.6
+
+
+@pytest.fixture
+def students():
+    key, fields = INDEXED_TABLES["students"]
+    index = TrigramIndex(key, fields)
+    index.load([
+        {"idnum": "2021-0001", "firstname": "Jonathan", "lastname": "Smith", "sex": "Male",
+         "yearlevel": 2, "programcode": "BSCS"},
+        {"idnum": "2021-0002", "firstname": "Jon", "lastname": "Smyth", "sex": "Male",
+         "yearlevel": 1, "programcode": None},
+        {"idnum": "2022-0003", "firstname": "Maria", "lastname": "Clara", "sex": "Female",
+         "yearlevel": 3, "programcode": "BSIT"},
+    ])
+    return index
+
+
+def keys(rows):
+    return [row["idnum"] for row in rows]
+
+
+def test_substring_match(students):
+    assert keys(students.search("clara", 10)) == ["2022-0003"]
+
+
+def test_fuzzy_match_on_a_typo(students):
+    assert keys(students.search("jonathon", 10)) == ["2021-0001"]
+
+
+def test_key_prefix_ranks_first(students):
+    assert keys(students.search("2021", 10))[:2] == ["2021-0001", "2021-0002"]
+
+
+def test_null_columns_are_empty_text(students):
+    # COALESCE(programcode, '') in SEARCH_SPECS: the row is still searchable
+    assert "2021-0002" in keys(students.search("smyth", 10))
+
+
+def test_limit(students):
+    assert len(students.search("male", 2)) == 2
+
+
+def test_upsert_and_remove(students):
+    students.upsert({"idnum": "2023-0004", "firstname": "Pedro", "lastname": "Penduko", "sex": "Male",
+                     "yearlevel": 1, "programcode": "BSCS"})
+    assert keys(students.search("penduko", 10)) == ["2023-0004"]
+    students.remove("2023-0004")
+    assert students.search("penduko", 10) == []
+
+
+@pytest.mark.parametrize("term", ["", "   "])
+def test_empty_keyword_is_an_error_like_build_search(students, term):
+    with pytest.raises(SearchError):
+        students.search(term, 10)